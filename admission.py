@@ -0,0 +1,228 @@
+"""
+Admission control for upstream-bound work - per-source concurrency limits,
+bounded wait queues, deadlines and fast 503s with Retry-After
+Configure with ADMISSION_LIMITS="statarea=2:8:5:20,soccerapi=1:4" (concurrency:queue:wait:deadline)
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from fastapi import HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from metrics import Counter, Gauge, Histogram
+
+DEFAULT_CONCURRENCY = 2
+DEFAULT_QUEUE = 8
+DEFAULT_WAIT = 5.0
+DEFAULT_DEADLINE = 30.0
+
+# Odds/bookmaker sources spend quota or get rate limited: keep them tighter
+DEFAULT_LIMITS = {
+    "soccerapi": {"concurrency": 1, "queue": 4},
+    "odds_api": {"concurrency": 1, "queue": 4},
+    "bet365": {"concurrency": 1, "queue": 4},
+}
+
+ADMISSION_ACTIVE = Gauge("admission_active", "Upstream calls running, by source", ["source"])
+ADMISSION_QUEUED = Gauge("admission_queued", "Requests waiting for an upstream slot, by source", ["source"])
+ADMISSION_REJECTED = Counter(
+    "admission_rejected_total", "Requests turned away (queue_full, wait_timeout, deadline)", ["source", "reason"]
+)
+ADMISSION_WAIT_SECONDS = Histogram("admission_wait_seconds", "Time spent queued for an upstream slot", ["source"])
+
+
+class Overloaded(HTTPException):
+    """503 (or 504 past the deadline) with Retry-After, raised instead of starting more upstream work"""
+
+    def __init__(self, source: str, reason: str, retry_after: float, status_code: int = 503):
+        self.source = source
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+        super().__init__(
+            status_code=status_code,
+            detail=f"{source} is busy ({reason.replace('_', ' ')}), retry in {self.retry_after}s",
+            headers={"Retry-After": str(self.retry_after)}
+        )
+
+
+class SourceLimiter:
+    """
+    At most `concurrency` calls to one upstream at a time, with up to `queue`
+    more waiting no longer than `wait` seconds; anything beyond is rejected
+    immediately. A call still running after `deadline` seconds answers the
+    client with 504 but keeps its slot until the thread finishes, so the
+    limit really bounds outbound work.
+
+    Sources whose responses are cached take a slot from the worker thread
+    with hold(), around just the upstream call, so cache hits never queue.
+    A limiter is used one way or the other, not both.
+    """
+
+    def __init__(self, source: str, concurrency: int = DEFAULT_CONCURRENCY, queue: int = DEFAULT_QUEUE,
+                 wait: float = DEFAULT_WAIT, deadline: float = DEFAULT_DEADLINE):
+        self.source = source
+        self.concurrency = concurrency
+        self.queue = queue
+        self.wait = wait
+        self.deadline = deadline
+        self.active = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0
+        self._avg_seconds = 1.0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._thread_slots = threading.Semaphore(concurrency)
+        self._lock = threading.Lock()
+
+    def _slots(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def retry_after(self) -> float:
+        """Estimated seconds until a slot frees up for a new request"""
+        backlog = (self.waiting + self.active) / max(1, self.concurrency)
+        return max(1.0, backlog * self._avg_seconds)
+
+    def _reject(self, reason: str, status_code: int = 503) -> Overloaded:
+        self.rejected += 1
+        ADMISSION_REJECTED.labels(self.source, reason).inc()
+        return Overloaded(self.source, reason, self.retry_after(), status_code)
+
+    async def _acquire(self) -> None:
+        slots = self._slots()
+        # Checked and counted synchronously, so a burst can't all slip past the check
+        if self.active + self.waiting >= self.concurrency + self.queue:
+            raise self._reject("queue_full")
+        self.waiting += 1
+        ADMISSION_QUEUED.labels(self.source).inc()
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.wait)
+        except asyncio.TimeoutError:
+            raise self._reject("wait_timeout")
+        finally:
+            self.waiting -= 1
+            ADMISSION_QUEUED.labels(self.source).dec()
+            ADMISSION_WAIT_SECONDS.labels(self.source).observe(time.perf_counter() - start)
+
+    def _release(self, started: float) -> None:
+        elapsed = time.perf_counter() - started
+        self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * elapsed
+        self.active -= 1
+        self.completed += 1
+        ADMISSION_ACTIVE.labels(self.source).dec()
+        self._slots().release()
+
+    async def run(self, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking upstream call in the threadpool once admitted"""
+        await self._acquire()
+        self.active += 1
+        ADMISSION_ACTIVE.labels(self.source).inc()
+        started = time.perf_counter()
+        task = asyncio.ensure_future(run_in_threadpool(func, *args, **kwargs))
+        task.add_done_callback(lambda _: self._release(started))
+        try:
+            return await asyncio.wait_for(asyncio.shield(task), timeout=self.deadline)
+        except asyncio.TimeoutError:
+            # Don't leave an unobserved exception behind when the thread eventually fails
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            raise self._reject("deadline", status_code=504)
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """Slot for a blocking upstream call made from a worker thread (no deadline: the call's own timeout bounds it)"""
+        with self._lock:
+            if self.active + self.waiting >= self.concurrency + self.queue:
+                raise self._reject("queue_full")
+            self.waiting += 1
+        ADMISSION_QUEUED.labels(self.source).inc()
+        start = time.perf_counter()
+        acquired = self._thread_slots.acquire(timeout=self.wait)
+        with self._lock:
+            self.waiting -= 1
+            if acquired:
+                self.active += 1
+        ADMISSION_QUEUED.labels(self.source).dec()
+        ADMISSION_WAIT_SECONDS.labels(self.source).observe(time.perf_counter() - start)
+        if not acquired:
+            raise self._reject("wait_timeout")
+        ADMISSION_ACTIVE.labels(self.source).inc()
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._avg_seconds = 0.8 * self._avg_seconds + 0.2 * (time.perf_counter() - started)
+                self.active -= 1
+                self.completed += 1
+            ADMISSION_ACTIVE.labels(self.source).dec()
+            self._thread_slots.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "wait": self.wait,
+            "deadline": self.deadline,
+            "active": self.active,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_seconds": round(self._avg_seconds, 3)
+        }
+
+
+def parse_limits(spec: Optional[str]) -> Dict[str, Dict[str, float]]:
+    """'statarea=2:8:5:20,soccerapi=1' -> {source: {concurrency, queue, wait, deadline}} (omitted parts keep defaults)"""
+    limits: Dict[str, Dict[str, float]] = {}
+    if not spec:
+        return limits
+    keys = ("concurrency", "queue", "wait", "deadline")
+    for item in spec.split(","):
+        source, _, values = item.strip().partition("=")
+        if not source or not values:
+            continue
+        parts = [p for p in values.split(":")]
+        limits[source.strip()] = {
+            key: (int(value) if key in ("concurrency", "queue") else float(value))
+            for key, value in zip(keys, parts) if value
+        }
+    return limits
+
+
+class AdmissionController:
+    """One SourceLimiter per upstream source, created on first use"""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        self.limits = {**DEFAULT_LIMITS, **(limits or {})}
+        self.limiters: Dict[str, SourceLimiter] = {}
+
+    def limiter(self, source: str) -> SourceLimiter:
+        """Limiter for `source`; "soccerapi.bet365" gets its own slots with the "soccerapi" limits"""
+        limiter = self.limiters.get(source)
+        if limiter is None:
+            limits = self.limits.get(source, self.limits.get(source.split(".", 1)[0], {}))
+            # setdefault: hold() can be called from several threads at once
+            limiter = self.limiters.setdefault(source, SourceLimiter(source, **limits))
+        return limiter
+
+    def hold(self, source: str) -> Any:
+        """Thread-side slot for one upstream call, see SourceLimiter.hold"""
+        return self.limiter(source).hold()
+
+    async def run(self, source: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        return await self.limiter(source).run(func, *args, **kwargs)
+
+    def stats(self) -> Dict[str, Any]:
+        return {source: limiter.stats() for source, limiter in self.limiters.items()}
+
+
+def limits_from_env() -> Dict[str, Dict[str, float]]:
+    return parse_limits(os.getenv("ADMISSION_LIMITS"))
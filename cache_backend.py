@@ -0,0 +1,269 @@
+"""
+Pluggable cache backend shared by every uvicorn worker on a host
+memory:// (per process), sqlite:///path (shared by workers on one host) or redis://
+Select with CACHE_BACKEND_URL
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+DEFAULT_BACKEND_URL = "sqlite:///shared/cache.db"
+DEFAULT_NAMESPACE = "magajico"
+
+
+class MemoryBackend:
+    """
+    In-process store with the Redis get/set(ex, nx)/delete subset
+
+    Only shared between threads of one worker - the fallback when nothing
+    else is configured, and the reference for the interface.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _live(self, key: str) -> Optional[tuple]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] is not None and entry[1] <= time.time():
+            del self._entries[key]
+            return None
+        return entry
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._live(key)
+            return entry[0] if entry else None
+
+    def set(self, key: str, value: bytes, ex: Optional[float] = None, nx: bool = False) -> Optional[bool]:
+        with self._lock:
+            if nx and self._live(key) is not None:
+                return None
+            self._entries[key] = (value, time.time() + ex if ex else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(1 for key in keys if self._entries.pop(key, None) is not None)
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteBackend:
+    """
+    Store in one SQLite file (WAL mode), so every worker process on the host
+    sees the same entries; expired rows are purged every `purge_every` writes
+    """
+
+    def __init__(self, path: str = "shared/cache.db", purge_every: int = 200, timeout: float = 5.0):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.purge_every = purge_every
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)"
+        )
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+                (key, time.time())
+            ).fetchone()
+        return bytes(row[0]) if row else None
+
+    def set(self, key: str, value: bytes, ex: Optional[float] = None, nx: bool = False) -> Optional[bool]:
+        now = time.time()
+        expires = now + ex if ex else None
+        with self._lock:
+            if nx:
+                # Insert, or take over a row that has already expired
+                cursor = self._conn.execute(
+                    "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+                    "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+                    (key, value, expires, now)
+                )
+                stored = cursor.rowcount > 0
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+                    (key, value, expires)
+                )
+                stored = True
+            self._writes += 1
+            if self._writes % self.purge_every == 0:
+                self._conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (now,))
+        return True if stored else None
+
+    def delete(self, *keys: str) -> int:
+        with self._lock:
+            return sum(self._conn.execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount for key in keys)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def backend_from_url(url: str) -> Any:
+    """memory://, sqlite:///relative/path.db (sqlite:////abs/path.db) or redis://host:port/db"""
+    if url.startswith("memory://"):
+        return MemoryBackend()
+    if url.startswith("sqlite:///"):
+        return SQLiteBackend(url[len("sqlite:///"):] or "shared/cache.db")
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        if not REDIS_AVAILABLE:
+            raise ImportError("redis not installed. Run: pip install redis")
+        # redis.Redis already speaks get/set(ex, nx)/delete
+        return redis.Redis.from_url(url)
+    raise ValueError(f"Unsupported cache backend URL: {url}")
+
+
+class SharedCache:
+    """
+    JSON values over any backend with the Redis get/set(ex, nx)/delete subset
+
+    get_or_compute() is single-flight across workers: the first caller takes a
+    short-lived lock key and computes; the others wait for its value instead
+    of hitting the upstream too, so upstream load does not grow with the
+    number of workers.
+    """
+
+    def __init__(self, backend: Any, namespace: str = DEFAULT_NAMESPACE, backend_name: str = ""):
+        self.backend = backend
+        self.namespace = namespace
+        self.backend_name = backend_name or type(backend).__name__
+        self.hits = 0
+        self.misses = 0
+        self.computes = 0
+        self.waits = 0
+        self.errors = 0
+
+    def _key(self, key: str) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = self.backend.get(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Cache get failed ({self.backend_name}): {e}")
+            return None
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            self.backend.set(self._key(key), json.dumps(value, default=str).encode(), ex=ttl)
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Cache set failed ({self.backend_name}): {e}")
+
+    def delete(self, key: str) -> None:
+        try:
+            self.backend.delete(self._key(key))
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Cache delete failed ({self.backend_name}): {e}")
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       lock_ttl: float = 30.0, wait: float = 30.0, poll: float = 0.05,
+                       cache_if: Callable[[Any], bool] = bool) -> Any:
+        """
+        Cached value for `key`, or compute it once for all workers
+
+        Results failing `cache_if` (by default empty ones, i.e. a failed
+        scrape) are returned but not stored. A waiter whose lock holder died
+        or overran `wait` computes the value itself.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        lock_key = self._key(f"lock:{key}")
+        deadline = time.time() + wait
+        while True:
+            try:
+                acquired = self.backend.set(lock_key, b"1", ex=lock_ttl, nx=True)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ Cache lock failed ({self.backend_name}): {e}")
+                acquired = True  # backend down: just compute
+            if acquired:
+                break
+            time.sleep(poll)
+            value = self.get(key)
+            if value is not None:
+                self.waits += 1
+                return value
+            if time.time() >= deadline:
+                break
+
+        try:
+            self.computes += 1
+            value = compute()
+            if cache_if(value):
+                self.set(key, value, ttl)
+            return value
+        finally:
+            try:
+                self.backend.delete(lock_key)
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "backend": self.backend_name,
+            "namespace": self.namespace,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "computes": self.computes,
+            "waits": self.waits,
+            "errors": self.errors
+        }
+
+
+_default_cache: Optional[SharedCache] = None
+
+
+def get_shared_cache() -> SharedCache:
+    """Process-wide SharedCache for CACHE_BACKEND_URL (memory:// if the backend can't be opened)"""
+    global _default_cache
+    if _default_cache is None:
+        url = os.getenv("CACHE_BACKEND_URL", DEFAULT_BACKEND_URL)
+        try:
+            backend = backend_from_url(url)
+            name = url.split("://", 1)[0]
+        except Exception as e:
+            print(f"⚠️ Cache backend {url} unavailable, using per-process memory: {e}")
+            backend, name = MemoryBackend(), "memory"
+        _default_cache = SharedCache(backend, namespace=os.getenv("CACHE_NAMESPACE", DEFAULT_NAMESPACE),
+                                     backend_name=name)
+    return _default_cache
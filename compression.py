@@ -0,0 +1,219 @@
+"""
+Negotiated response compression (gzip, and brotli when installed)
+Size threshold and level configurable via COMPRESSION_MIN_SIZE / COMPRESSION_LEVEL
+"""
+
+import gzip
+import os
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+DEFAULT_MIN_SIZE = 1024
+DEFAULT_LEVEL = 6
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml")
+
+# Long-lived streams where per-chunk latency matters more than size
+UNCOMPRESSED_TYPES = ("text/event-stream",)
+
+
+def min_size_from_env() -> int:
+    return int(os.getenv("COMPRESSION_MIN_SIZE", str(DEFAULT_MIN_SIZE)))
+
+
+def level_from_env() -> int:
+    return int(os.getenv("COMPRESSION_LEVEL", str(DEFAULT_LEVEL)))
+
+
+def supported_encodings() -> List[str]:
+    """Encodings this server can produce, most preferred first"""
+    return (["br"] if BROTLI_AVAILABLE else []) + ["gzip"]
+
+
+def choose_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the best encoding the client accepts (honouring q-values), or None
+    """
+    if not accept_encoding:
+        return None
+    accepted: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        parts = [p.strip() for p in item.split(";")]
+        if not parts[0]:
+            continue
+        quality = 1.0
+        for param in parts[1:]:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        accepted[parts[0].lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in supported_encodings():
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int = DEFAULT_LEVEL) -> bytes:
+    if encoding == "br":
+        # brotli quality runs 0-11; map the shared 1-9 level onto it
+        return brotli.compress(body, quality=min(11, max(0, round(level * 11 / 9))))
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    raise ValueError(f"Unsupported encoding: {encoding}")
+
+
+def is_compressible(headers: List[Tuple[bytes, bytes]]) -> bool:
+    """True if the response has a compressible type and is not already encoded"""
+    content_type = b""
+    for key, value in headers:
+        name = key.lower()
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value.lower()
+    if any(content_type.startswith(t.encode()) for t in UNCOMPRESSED_TYPES):
+        return False
+    return any(content_type.startswith(t.encode()) for t in COMPRESSIBLE_TYPES)
+
+
+def add_vary(headers: List[Tuple[bytes, bytes]]) -> List[Tuple[bytes, bytes]]:
+    """Add Accept-Encoding to the Vary header, keeping any existing values"""
+    result, found = [], False
+    for key, value in headers:
+        if key.lower() == b"vary":
+            found = True
+            if b"accept-encoding" not in value.lower():
+                value = value + b", Accept-Encoding"
+        result.append((key, value))
+    if not found:
+        result.append((b"vary", b"Accept-Encoding"))
+    return result
+
+
+def _request_header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing response bodies the client can decode
+
+    Bodies below `minimum_size` and responses that already carry a
+    Content-Encoding (e.g. pre-compressed bytes from the response cache) pass
+    through untouched. Streamed responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: Any, minimum_size: int = DEFAULT_MIN_SIZE, level: int = DEFAULT_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = choose_encoding(_request_header(scope, b"accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Dict[str, Any] = {}
+        state = {"mode": None}  # None until the first body chunk: "plain", "whole" or "stream"
+        compressor: List[Any] = []
+
+        async def wrapped_send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                start.update(message)
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            headers = list(start.get("headers", []))
+
+            if state["mode"] is None:
+                if not is_compressible(headers) or start.get("status") in (204, 304):
+                    state["mode"] = "plain"
+                elif not more_body:
+                    state["mode"] = "whole"
+                    if len(body) < self.minimum_size:
+                        state["mode"] = "plain"
+                        headers = add_vary(headers)
+                else:
+                    state["mode"] = "stream"
+
+                if state["mode"] == "plain":
+                    await send({**start, "headers": headers})
+                elif state["mode"] == "whole":
+                    body = compress(body, encoding, self.level)
+                    await send({**start, "headers": self._encoded_headers(headers, encoding, len(body))})
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                else:
+                    # Length unknown up front: drop Content-Length, stream the encoding
+                    compressor.append(self._stream_compressor(encoding))
+                    await send({**start, "headers": self._encoded_headers(headers, encoding, None)})
+
+            if state["mode"] == "plain":
+                await send(message)
+                return
+
+            chunk = compressor[0].process(body)
+            if not more_body:
+                chunk += compressor[0].finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, wrapped_send)
+
+    @staticmethod
+    def _encoded_headers(headers: List[Tuple[bytes, bytes]], encoding: str,
+                         length: Optional[int]) -> List[Tuple[bytes, bytes]]:
+        headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+        headers.append((b"content-encoding", encoding.encode()))
+        if length is not None:
+            headers.append((b"content-length", str(length).encode()))
+        return add_vary(headers)
+
+    def _stream_compressor(self, encoding: str) -> Any:
+        if encoding == "br":
+            return _BrotliStream(self.level)
+        return _GzipStream(self.level)
+
+
+class _GzipStream:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=min(11, max(0, round(level * 11 / 9))))
+
+    def process(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
@@ -0,0 +1,168 @@
+"""
+Materialized league-grouped views of scraped match data
+Built once per data refresh and served read-only by /api/predictions, /api/live and /api/soccer
+"""
+
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+
+def format_live_match(match: Dict[str, Any]) -> Dict[str, Any]:
+    """Live match fields shared by /api/live and the live push feed"""
+    return {
+        "home_team": match.get("home_team", ""),
+        "away_team": match.get("away_team", ""),
+        "league": match.get("league", ""),
+        "time": match.get("time", ""),
+        "prediction": match.get("prediction", ""),
+        "odds": match.get("odds", ""),
+        "confidence": match.get("confidence", 75)
+    }
+
+
+def build_predictions_view(matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """League -> games grouping used by /api/predictions"""
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for pred in matches:
+        league = pred.get("league", "Unknown League")
+        if league not in grouped:
+            grouped[league] = {"league": league, "games": []}
+        grouped[league]["games"].append({
+            "home_team": pred.get("home_team"),
+            "away_team": pred.get("away_team"),
+            "prediction_1x2": pred.get("prediction", ""),
+            "prediction_over_under": pred.get("total_goals", ""),
+            "prediction_btts": "",
+            "confidence": pred.get("confidence", 75),
+            "time": pred.get("time", ""),
+            "league": league
+        })
+    return {
+        "status": "success",
+        "matches": list(grouped.values()),
+        "total_leagues": len(grouped)
+    }
+
+
+def build_live_view(matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Flat live match list used by /api/live"""
+    return {
+        "status": "success",
+        "matches": [format_live_match(match) for match in matches]
+    }
+
+
+def build_soccer_view(matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """League -> games grouping with flags used by /api/soccer (homepage)"""
+    grouped: Dict[str, Dict[str, Any]] = {}
+    for match in matches:
+        league = match.get("league", "Unknown League")
+        if league not in grouped:
+            grouped[league] = {"league": league, "flag": "⚽", "games": []}
+        grouped[league]["games"].append({
+            "home_team": match.get("home_team", ""),
+            "away_team": match.get("away_team", ""),
+            "time": match.get("time", ""),
+            "odds": match.get("odds", ""),
+            "prediction": match.get("prediction", ""),
+            "confidence": match.get("confidence", 75)
+        })
+    return {
+        "status": "success",
+        "matches": list(grouped.values())
+    }
+
+
+DEFAULT_BUILDERS: Dict[str, Callable[[List[Dict[str, Any]]], Dict[str, Any]]] = {
+    "predictions": build_predictions_view,
+    "live": build_live_view,
+    "soccer": build_soccer_view,
+}
+
+
+class MaterializedViews:
+    """
+    Read-only views rebuilt only when the underlying scrape changes
+
+    `fetch` is the blocking scrape (e.g. scrape_statarea). A view read older
+    than `max_age` seconds triggers one refresh, shared by concurrent readers;
+    if the snapshot tracker reports the same version as the last build, the
+    existing views are kept as they are. A failed or empty scrape keeps the
+    last good views rather than blanking the pages.
+    """
+
+    def __init__(self, fetch: Callable[[], List[Dict[str, Any]]], max_age: float = 30.0,
+                 tracker: Any = None, source: Optional[str] = None,
+                 builders: Optional[Dict[str, Callable[[List[Dict[str, Any]]], Dict[str, Any]]]] = None):
+        self.fetch = fetch
+        self.max_age = max_age
+        self.tracker = tracker
+        self.source = source
+        self.builders = builders or DEFAULT_BUILDERS
+        self.views: Dict[str, Dict[str, Any]] = {name: build([]) for name, build in self.builders.items()}
+        self.matches: List[Dict[str, Any]] = []
+        self.version: Optional[int] = None
+        self.built_at: Optional[str] = None
+        self.refreshed_at: Optional[float] = None
+        self.builds = 0
+        self.last_error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        return self.refreshed_at is None or time.monotonic() - self.refreshed_at >= self.max_age
+
+    def refresh(self, force: bool = False) -> bool:
+        """Scrape and rebuild if the data changed; returns True if views were rebuilt"""
+        with self._lock:
+            if not force and not self.is_stale():
+                return False  # another thread refreshed while we waited
+            try:
+                matches = self.fetch()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"⚠️ View refresh failed, serving previous data: {e}")
+                matches = []
+            self.refreshed_at = time.monotonic()
+
+            if not matches:
+                return False
+            version = self.tracker.version(self.source) if self.tracker is not None else None
+            if not force and version is not None and version == self.version:
+                return False
+            self.rebuild(matches, version)
+            return True
+
+    def rebuild(self, matches: List[Dict[str, Any]], version: Optional[int] = None) -> None:
+        # Build every view before swapping so readers never see a mix
+        views = {name: build(matches) for name, build in self.builders.items()}
+        self.views, self.matches = views, matches
+        self.version = version
+        self.built_at = datetime.now().isoformat()
+        self.builds += 1
+
+    def get(self, name: str) -> Dict[str, Any]:
+        """A view, refreshing first if it is stale (blocking - call from the threadpool)"""
+        if self.is_stale():
+            self.refresh()
+        return self.views[name]
+
+    def latest_matches(self) -> List[Dict[str, Any]]:
+        if self.is_stale():
+            self.refresh()
+        return self.matches
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "views": list(self.views),
+            "matches": len(self.matches),
+            "source": self.source,
+            "source_version": self.version,
+            "built_at": self.built_at,
+            "builds": self.builds,
+            "max_age": self.max_age,
+            "stale": self.is_stale(),
+            "last_error": self.last_error
+        }
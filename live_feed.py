@@ -0,0 +1,208 @@
+"""
+Live score push feed - one shared scrape loop fanned out to SSE/WebSocket subscribers
+"""
+
+import asyncio
+import json
+import time
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set
+
+from snapshot_diff import SnapshotTracker
+
+# Queued events per subscriber before it is considered too slow
+DEFAULT_MAX_QUEUE = 100
+DEFAULT_INTERVAL = 15.0
+DEFAULT_HEARTBEAT = 15.0
+
+
+class FeedEvent:
+    """One feed message, JSON-encoded once and shared by every subscriber"""
+
+    __slots__ = ("id", "type", "data", "league", "key", "_encoded")
+
+    def __init__(self, event_id: int, event_type: str, data: Dict[str, Any],
+                 league: Optional[str] = None, key: Optional[str] = None):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+        self.league = league
+        self.key = key
+        self._encoded: Optional[str] = None
+
+    @property
+    def json(self) -> str:
+        if self._encoded is None:
+            self._encoded = json.dumps({"id": self.id, "type": self.type, **self.data}, default=str)
+        return self._encoded
+
+    def sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {self.json}\n\n"
+
+
+class Subscriber:
+    """A connected viewer: optional league/match filter and a bounded event queue"""
+
+    def __init__(self, league: Optional[str] = None, match: Optional[str] = None,
+                 max_queue: int = DEFAULT_MAX_QUEUE):
+        self.league = league.strip().lower() if league else None
+        self.match = match.strip().lower() if match else None
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self.needs_resync = False
+        self.dropped = 0
+        self.connected_at = time.time()
+
+    def wants_match(self, match: Dict[str, Any]) -> bool:
+        if self.league and self.league not in str(match.get("league", "")).lower():
+            return False
+        if self.match:
+            teams = f"{match.get('home_team', '')} vs {match.get('away_team', '')}".lower()
+            if self.match not in teams:
+                return False
+        return True
+
+    def offer(self, event: FeedEvent) -> None:
+        """
+        Queue an event without ever blocking the publisher
+
+        A subscriber that falls a full queue behind loses its backlog and is
+        sent one resync snapshot instead of every missed change.
+        """
+        if self.needs_resync:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.needs_resync = True
+            self.queue.put_nowait(None)  # wake the consumer
+
+
+class LiveFeedHub:
+    """
+    Shared live match state plus the set of connected subscribers
+
+    While anyone is subscribed, `fetch` (a blocking scrape returning a list of
+    match dicts) runs every `interval` seconds in the threadpool - once for
+    all viewers. Each scrape is diffed by the snapshot tracker under `source`;
+    only the added/updated/removed matches (with their field-level changes)
+    are pushed, and each event is serialized once.
+    """
+
+    def __init__(self, fetch: Callable[[], List[Dict[str, Any]]], interval: float = DEFAULT_INTERVAL,
+                 heartbeat: float = DEFAULT_HEARTBEAT, max_queue: int = DEFAULT_MAX_QUEUE,
+                 tracker: Optional[SnapshotTracker] = None, source: str = "live_feed"):
+        self.fetch = fetch
+        self.interval = interval
+        self.heartbeat = heartbeat
+        self.max_queue = max_queue
+        self.tracker = tracker or SnapshotTracker()
+        self.source = source
+        self.subscribers: Set[Subscriber] = set()
+        self.last_refresh: Optional[float] = None
+        self.last_error: Optional[str] = None
+        self.events_published = 0
+        self._task: Optional[asyncio.Task] = None
+
+    # ---------- subscriptions ----------
+
+    def subscribe(self, league: Optional[str] = None, match: Optional[str] = None) -> Subscriber:
+        subscriber = Subscriber(league, match, self.max_queue)
+        self.subscribers.add(subscriber)
+        self._ensure_polling()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self.subscribers.discard(subscriber)
+
+    def snapshot_event(self, subscriber: Subscriber, event_type: str = "snapshot") -> FeedEvent:
+        """Full filtered state; anything already queued is covered by it and dropped"""
+        while not subscriber.queue.empty():
+            subscriber.queue.get_nowait()
+        subscriber.needs_resync = False
+        matches = [m for m in self.tracker.snapshot(self.source) if subscriber.wants_match(m)]
+        return FeedEvent(self.tracker.sequence, event_type, {"matches": matches, "count": len(matches)})
+
+    async def events(self, subscriber: Subscriber) -> AsyncIterator[FeedEvent]:
+        """
+        Events for one subscriber: an initial snapshot, then changes, with a
+        heartbeat whenever nothing happened for `heartbeat` seconds
+        """
+        if self.last_refresh is None:
+            await self.refresh()
+        yield self.snapshot_event(subscriber)
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=self.heartbeat)
+            except asyncio.TimeoutError:
+                yield FeedEvent(self.tracker.sequence, "heartbeat", {"time": time.time()})
+                continue
+
+            if subscriber.needs_resync:
+                yield self.snapshot_event(subscriber, "resync")
+            elif event is not None:
+                yield event
+
+    # ---------- change detection and fan-out ----------
+
+    def apply(self, matches: List[Dict[str, Any]]) -> List[FeedEvent]:
+        """Diff a new scrape against the previous one; returns events for what changed"""
+        diff = self.tracker.update(self.source, matches)
+        return [
+            FeedEvent(change["seq"], change["type"],
+                      {k: change[k] for k in ("key", "match", "changes") if k in change},
+                      change["match"].get("league"), change["key"])
+            for change in diff["events"]
+        ]
+
+    def publish(self, events: List[FeedEvent]) -> None:
+        for event in events:
+            match = event.data.get("match", {})
+            for subscriber in list(self.subscribers):
+                if subscriber.wants_match(match):
+                    subscriber.offer(event)
+        self.events_published += len(events)
+
+    async def refresh(self) -> int:
+        """Scrape once (off the event loop) and push the changes; returns the change count"""
+        loop = asyncio.get_running_loop()
+        try:
+            matches = await loop.run_in_executor(None, self.fetch)
+        except Exception as e:
+            self.last_error = str(e)
+            print(f"⚠️ Live feed refresh failed: {e}")
+            return 0
+        self.last_error = None
+        self.last_refresh = time.time()
+        events = self.apply(matches)
+        self.publish(events)
+        return len(events)
+
+    def _ensure_polling(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._poll_loop())
+
+    async def _poll_loop(self) -> None:
+        # Runs only while someone is listening; the next subscriber restarts it
+        while self.subscribers:
+            if self.last_refresh is None or time.time() - self.last_refresh >= self.interval:
+                await self.refresh()
+            await asyncio.sleep(min(self.interval, 1.0))
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self.subscribers),
+            "matches": len(self.tracker.snapshot(self.source)),
+            "version": self.tracker.version(self.source),
+            "sequence": self.tracker.sequence,
+            "events_published": self.events_published,
+            "slow_subscribers": sum(1 for s in self.subscribers if s.needs_resync),
+            "dropped_events": sum(s.dropped for s in self.subscribers),
+            "interval": self.interval,
+            "heartbeat": self.heartbeat,
+            "last_refresh": self.last_refresh,
+            "last_error": self.last_error
+        }
@@ -0,0 +1,479 @@
+"""
+End-to-end load test for main.py against local stand-in upstream servers
+
+A stand-in HTTP server replays fixture responses for statarea.com,
+mybets.today, scorepredictor.net, ESPN, FlashScore and the Odds API
+(recorded files under --fixtures, or generated ones when a fixture is
+missing), with configurable upstream latency. The app is imported with
+UPSTREAM_BASE_URL pointing at it, in a scratch working directory so the
+real results log, caches and model registry are untouched, and a weighted
+mix of endpoints is driven at a fixed concurrency.
+
+Reported per endpoint: requests, errors, requests/sec and latency p50/p90/p99/max,
+plus peak Python heap per request from an isolated tracemalloc pass.
+The client side uses httpx (in requirements.txt).
+
+Usage:
+    python load_test.py --concurrency 20 --duration 30
+    python load_test.py --mix "/api/soccer=5,/api/predictions=5" --upstream-latency-ms 200
+    python load_test.py --record                  # save real upstream responses as fixtures
+    python load_test.py --serve-only --port 9100  # stand-in only; run uvicorn with
+                                                  # UPSTREAM_BASE_URL=http://127.0.0.1:9100
+    python load_test.py --target http://127.0.0.1:8000   # drive an already running server
+"""
+
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_FIXTURES = os.path.join(REPO_ROOT, "benchmarks", "fixtures")
+
+# Upstream pages the scrapers request (what --record saves)
+UPSTREAM_URLS = [
+    "https://www.statarea.com/predictions",
+    "https://www.mybets.today/recommended-soccer-predictions/",
+    "https://scorepredictor.net/index.php",
+    "https://www.espn.com/soccer/scoreboard",
+    "https://www.flashscore.mobi/",
+    "https://mobile.bet365.com/",
+]
+
+ML_PREDICT = ("/api/ml/predict?home_team=Arsenal&away_team=Chelsea&home_strength=0.8&away_strength=0.7"
+              "&recent_form_home=0.7&recent_form_away=0.6")
+
+# Rough shape of frontend traffic: grouped views dominate, scrape-heavy endpoints are rare
+DEFAULT_MIX: Dict[str, float] = {
+    "/api/predictions": 25,
+    "/api/soccer": 20,
+    "/api/live": 15,
+    ML_PREDICT: 10,
+    "/api/predictions/today": 5,
+    "/api/predictions/mybets": 5,
+    "/api/predictions/statarea": 5,
+    "/api/teams/features": 5,
+    "/api/accuracy/stats": 4,
+    "/api/stats": 2,
+    "/api/odds/aggregate-weekly-soccer": 2,
+    "/api/health": 2,
+}
+
+TEAMS = ["Arsenal", "Chelsea", "Liverpool", "Everton", "Brighton", "Fulham", "Brentford", "Burnley",
+         "Barcelona", "Valencia", "Sevilla", "Getafe", "Juventus", "Torino", "Napoli", "Lazio",
+         "Bayern Munich", "Freiburg", "Mainz", "Augsburg", "Ajax", "Utrecht", "Benfica", "Porto"]
+
+
+# ---------- fixtures ----------
+
+def _pairs(n: int, seed: int) -> List[Tuple[str, str]]:
+    rng = random.Random(seed)
+    pairs = []
+    for i in range(n):
+        home, away = rng.sample(TEAMS, 2)
+        pairs.append((home, away))
+    return pairs
+
+
+def synthetic_fixtures(n_matches: int = 40, seed: int = 7) -> Dict[str, Tuple[str, bytes]]:
+    """Generated pages shaped like each source's markup, keyed by host + path"""
+    rng = random.Random(seed)
+    pairs = _pairs(n_matches, seed)
+    today = datetime.now().strftime("%Y-%m-%d")
+
+    statarea = "".join(
+        f"<div>{12 + i % 10:02d}:{(i * 15) % 60:02d} {h} - {a} TIP {rng.choice('1X2')} {rng.randint(55, 92)}%</div>"
+        for i, (h, a) in enumerate(pairs)
+    )
+    mybets = "".join(
+        f"<div class='event-fixtures'><div class='timediv'><time>{12 + i % 10:02d}:00</time></div>"
+        f"<div class='homediv'><span class='homespan'>{h}</span></div>"
+        f"<div class='awaydiv'><span class='awayTeam'>{a}</span></div>"
+        f"<span>{rng.choice('1X2')} ({rng.randint(55, 95)}%)</span></div>"
+        for i, (h, a) in enumerate(pairs)
+    )
+    espn_data = {"events": [
+        {"date": f"{today}T{12 + i % 10:02d}:00Z", "league": {"name": "Premier League"},
+         "competitions": [{"status": {"type": "scheduled"}, "competitors": [
+             {"team": {"displayName": h}, "score": str(rng.randint(0, 3))},
+             {"team": {"displayName": a}, "score": str(rng.randint(0, 3))}]}]}
+        for i, (h, a) in enumerate(pairs)
+    ]}
+    espn = f"<script>window.espn.scoreboardData = {json.dumps(espn_data)};</script>"
+    flashscore = "".join(
+        f"<div class='event'><span>{h}</span><span>{a}</span> {rng.randint(0, 3)} - {rng.randint(0, 3)} "
+        f"{12 + i % 10:02d}:00 {rng.uniform(1.1, 4.0):.2f}</div>"
+        for i, (h, a) in enumerate(pairs)
+    )
+
+    def html(body: str) -> Tuple[str, bytes]:
+        return "text/html; charset=utf-8", f"<html><body><p>{today}</p>{body}</body></html>".encode()
+
+    return {
+        "www.statarea.com/predictions": html(statarea),
+        "www.mybets.today/recommended-soccer-predictions": html(mybets),
+        "www.espn.com/soccer/scoreboard": html(espn),
+        "www.flashscore.mobi": html(flashscore),
+    }
+
+
+def fixture_key(url_path: str) -> str:
+    """'/www.statarea.com/predictions/' -> 'www.statarea.com/predictions'"""
+    return url_path.split("?", 1)[0].strip("/")
+
+
+def load_fixtures(fixtures_dir: str, n_matches: int, seed: int) -> Dict[str, Tuple[str, bytes]]:
+    """Recorded fixtures (host/path files under fixtures_dir) over generated ones"""
+    fixtures = synthetic_fixtures(n_matches, seed)
+    if os.path.isdir(fixtures_dir):
+        for root, _, files in os.walk(fixtures_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                key = os.path.relpath(path, fixtures_dir).replace(os.sep, "/")
+                if key.endswith("/index"):
+                    key = key[:-len("/index")]
+                with open(path, "rb") as f:
+                    body = f.read()
+                content_type = "application/json" if body.lstrip()[:1] in (b"{", b"[") else "text/html; charset=utf-8"
+                fixtures[key] = (content_type, body)
+    return fixtures
+
+
+def record_fixtures(fixtures_dir: str, urls: List[str] = UPSTREAM_URLS) -> None:
+    """Fetch each real upstream page once and save it as a fixture"""
+    import requests
+    headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
+    for url in urls:
+        parts = urlsplit(url)
+        key = f"{parts.netloc}/{parts.path.strip('/')}".rstrip("/")
+        path = os.path.join(fixtures_dir, *key.split("/"))
+        if key == parts.netloc:
+            path = os.path.join(path, "index")
+        try:
+            response = requests.get(url, headers=headers, timeout=15)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(response.content)
+            print(f"✅ {url} -> {path} ({len(response.content)} bytes, HTTP {response.status_code})")
+        except Exception as e:
+            print(f"⚠️ Could not record {url}: {e}")
+
+
+# ---------- stand-in upstream server ----------
+
+class StandInServer:
+    """Threaded HTTP server replaying fixtures at /<host>/<path>, 404 for anything unknown"""
+
+    def __init__(self, fixtures: Dict[str, Tuple[str, bytes]], port: int = 0, latency: float = 0.0):
+        self.fixtures = fixtures
+        self.latency = latency
+        self.hits: Dict[str, int] = {}
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                key = fixture_key(self.path)
+                server.hits[key] = server.hits.get(key, 0) + 1
+                if server.latency:
+                    time.sleep(server.latency)
+                fixture = server.fixtures.get(key)
+                if fixture is None:
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                content_type, body = fixture
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.httpd.daemon_threads = True
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def start(self) -> "StandInServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# ---------- app under test ----------
+
+def prepare_workdir(workdir: str, model_trees: int) -> None:
+    """Scratch copy of shared/ state so the run never writes to the real logs or registry"""
+    shared = os.path.join(workdir, "shared")
+    os.makedirs(shared, exist_ok=True)
+    for name in ("results_log.json", "team_features.json", "model_data.pkl"):
+        source = os.path.join(REPO_ROOT, "shared", name)
+        if os.path.exists(source):
+            shutil.copy(source, shared)
+    models = os.path.join(REPO_ROOT, "shared", "models")
+    if os.path.isdir(models):
+        shutil.copytree(models, os.path.join(shared, "models"), dirs_exist_ok=True)
+    elif model_trees:
+        # No published model: publish a small synthetic one so /api/ml/predict does real inference
+        sys.path.insert(0, os.path.join(REPO_ROOT, "src", "ml"))
+        from benchmark_inference import train_benchmark_model
+        from model_registry import publish_model
+        publish_model(train_benchmark_model(model_trees, n_samples=2000), root=os.path.join(shared, "models"))
+
+
+def import_app(upstream_url: str) -> Any:
+    """Import main.py configured for the stand-in upstream (call from inside the workdir)"""
+    os.environ["UPSTREAM_BASE_URL"] = upstream_url
+    os.environ.pop("MONGODB_URI", None)
+    os.environ.setdefault("CACHE_BACKEND_URL", "sqlite:///shared/cache.db")
+    if REPO_ROOT not in sys.path:
+        sys.path.insert(0, REPO_ROOT)
+    import main
+    return main.app
+
+
+# ---------- traffic ----------
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for item in spec.split(","):
+        path, _, weight = item.strip().rpartition("=")
+        if not path:
+            path, weight = weight, "1"
+        mix[path] = float(weight)
+    return mix
+
+
+def endpoint_label(path: str) -> str:
+    return path.split("?", 1)[0]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[index]
+
+
+def summarize(samples: Dict[str, List[Tuple[float, int]]], elapsed: float) -> Dict[str, Any]:
+    endpoints = {}
+    for label, rows in sorted(samples.items()):
+        latencies = sorted(ms for ms, _ in rows)
+        errors = sum(1 for _, status in rows if status >= 500 or status == 0)
+        endpoints[label] = {
+            "requests": len(rows),
+            "errors": errors,
+            "rps": round(len(rows) / elapsed, 2) if elapsed else 0.0,
+            "p50_ms": round(percentile(latencies, 0.50), 2),
+            "p90_ms": round(percentile(latencies, 0.90), 2),
+            "p99_ms": round(percentile(latencies, 0.99), 2),
+            "max_ms": round(latencies[-1], 2) if latencies else 0.0,
+            "statuses": {str(s): sum(1 for _, st in rows if st == s) for s in sorted({st for _, st in rows})}
+        }
+    total = sum(len(rows) for rows in samples.values())
+    return {
+        "duration_s": round(elapsed, 2),
+        "requests": total,
+        "rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "errors": sum(e["errors"] for e in endpoints.values()),
+        "endpoints": endpoints
+    }
+
+
+async def drive(client: httpx.AsyncClient, mix: Dict[str, float], concurrency: int,
+                duration: float, max_requests: Optional[int], seed: int) -> Dict[str, Any]:
+    """Run `concurrency` clients picking endpoints by weight until duration/max_requests is reached"""
+    paths, weights = list(mix), list(mix.values())
+    samples: Dict[str, List[Tuple[float, int]]] = {}
+    issued = {"n": 0}
+    deadline = time.perf_counter() + duration
+
+    async def client_loop(worker: int) -> None:
+        rng = random.Random(seed + worker)
+        while time.perf_counter() < deadline:
+            if max_requests is not None:
+                if issued["n"] >= max_requests:
+                    return
+                issued["n"] += 1
+            path = rng.choices(paths, weights)[0]
+            start = time.perf_counter()
+            try:
+                response = await client.get(path)
+                status = response.status_code
+            except Exception:
+                status = 0
+            samples.setdefault(endpoint_label(path), []).append(((time.perf_counter() - start) * 1000, status))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(i) for i in range(concurrency)))
+    return summarize(samples, time.perf_counter() - start)
+
+
+async def measure_memory(client: httpx.AsyncClient, paths: List[str], repeat: int) -> Dict[str, Any]:
+    """Peak traced Python heap per request and heap retained after `repeat` requests, per endpoint"""
+    results = {}
+    tracemalloc.start()
+    try:
+        for path in paths:
+            await client.get(path)  # warm caches/imports first
+            baseline = tracemalloc.get_traced_memory()[0]
+            peaks = []
+            for _ in range(repeat):
+                tracemalloc.reset_peak()
+                before = tracemalloc.get_traced_memory()[0]
+                await client.get(path)
+                peaks.append(tracemalloc.get_traced_memory()[1] - before)
+            retained = tracemalloc.get_traced_memory()[0] - baseline
+            results[endpoint_label(path)] = {
+                "peak_kb_per_request": round(max(peaks) / 1024, 1) if peaks else 0.0,
+                "avg_peak_kb": round(sum(peaks) / len(peaks) / 1024, 1) if peaks else 0.0,
+                "retained_kb": round(retained / 1024, 1)
+            }
+    finally:
+        tracemalloc.stop()
+    return results
+
+
+def max_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    run = report["load"]
+    memory = report.get("memory") or {}
+    print(f"\n{run['requests']} requests in {run['duration_s']}s = {run['rps']} req/s "
+          f"({run['errors']} errors, concurrency {report['config']['concurrency']})")
+    print(f"{'endpoint':<38} {'reqs':>6} {'err':>4} {'req/s':>8} {'p50':>8} {'p90':>8} {'p99':>8} "
+          f"{'max':>8} {'peak KB':>8}")
+    for label, row in run["endpoints"].items():
+        peak = memory.get(label, {}).get("peak_kb_per_request", "")
+        print(f"{label:<38} {row['requests']:>6} {row['errors']:>4} {row['rps']:>8} {row['p50_ms']:>8} "
+              f"{row['p90_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8} {peak:>8}")
+    print(f"max RSS {report['max_rss_mb']} MB; upstream hits: {report['upstream_hits']}")
+
+
+async def run(args: Any) -> Dict[str, Any]:
+    mix = parse_mix(args.mix)
+    fixtures = load_fixtures(args.fixtures, args.matches, args.seed)
+    server = StandInServer(fixtures, port=args.port, latency=args.upstream_latency_ms / 1000.0).start()
+    print(f"🧪 Stand-in upstream at {server.url} ({len(fixtures)} fixtures)")
+
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="loadtest-")
+    try:
+        if args.target:
+            print(f"⚠️ Driving {args.target}; start it with UPSTREAM_BASE_URL={server.url} to use the stand-in")
+            client = httpx.AsyncClient(base_url=args.target, timeout=args.timeout)
+        else:
+            prepare_workdir(workdir, args.model_trees)
+            os.chdir(workdir)
+            app = import_app(server.url)
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest",
+                                       timeout=args.timeout)
+
+        async with client:
+            # Warm-up so first-request costs (imports, model load, first scrape) are excluded
+            for path in mix:
+                await client.get(path)
+            load = await drive(client, mix, args.concurrency, args.duration, args.requests, args.seed)
+            memory = None
+            if not args.target and args.memory_repeat:
+                memory = await measure_memory(client, list(mix), args.memory_repeat)
+    finally:
+        os.chdir(cwd)
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "timestamp": datetime.now().isoformat()
+        },
+        "config": {
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "max_requests": args.requests,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "matches": args.matches,
+            "target": args.target or "in-process",
+            "mix": mix
+        },
+        "load": load,
+        "memory": memory,
+        "max_rss_mb": max_rss_mb(),
+        "upstream_hits": server.hits
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Load test main.py against local stand-in upstream servers")
+    parser.add_argument("--concurrency", type=int, default=10, help="Concurrent clients")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests instead")
+    parser.add_argument("--mix", help='Weighted endpoints, e.g. "/api/soccer=5,/api/predictions=3"')
+    parser.add_argument("--upstream-latency-ms", type=float, default=50.0, help="Delay added by the stand-in server")
+    parser.add_argument("--matches", type=int, default=40, help="Matches per generated fixture page")
+    parser.add_argument("--fixtures", default=DEFAULT_FIXTURES, help="Recorded fixtures directory (host/path files)")
+    parser.add_argument("--record", action="store_true", help="Save real upstream responses to --fixtures and exit")
+    parser.add_argument("--serve-only", action="store_true", help="Only run the stand-in upstream server")
+    parser.add_argument("--port", type=int, default=0, help="Stand-in server port (default: any free port)")
+    parser.add_argument("--target", help="Base URL of a running server to drive instead of the in-process app")
+    parser.add_argument("--model-trees", type=int, default=50,
+                        help="Trees in the synthetic model published when no registry exists (0 = none)")
+    parser.add_argument("--memory-repeat", type=int, default=10, help="Requests per endpoint in the memory pass (0 = skip)")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmarks/load_test.json", help="Where to write JSON results")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.fixtures)
+        sys.exit(0)
+
+    if args.serve_only:
+        server = StandInServer(load_fixtures(args.fixtures, args.matches, args.seed), port=args.port or 9100,
+                               latency=args.upstream_latency_ms / 1000.0)
+        print(f"🧪 Stand-in upstream at {server.url}; run the API with UPSTREAM_BASE_URL={server.url}")
+        try:
+            server.httpd.serve_forever()
+        except KeyboardInterrupt:
+            server.stop()
+        sys.exit(0)
+
+    report = asyncio.run(run(args))
+    output = os.path.abspath(args.output)
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Load test results written to {args.output}")
+    _print_report(report)
@@ -3,28 +3,109 @@ Updated FastAPI Main - Integrate Real Sports Data + ML
 Add this to your existing main.py
 """
 
-from fastapi import FastAPI, HTTPException, Query
+# First, so the report's "imports" phase covers everything below
+from startup_report import startup_report
+from fastapi import FastAPI, Header, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from typing import Optional, List, Dict, Any
+from starlette.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from typing import Optional, List, Dict, Any, Callable
 from datetime import datetime
-import pickle
 import numpy as np
 
 # Import your scraper (save the previous artifact as real_scraper.py)
 from real_scraper import RealSportsScraperService, LiveMatch, ResultsLogger
+from team_feature_store import FEATURE_NAMES, TeamFeatureStore, accuracy_result_id, template_result_id
+from response_cache import ResponseCache, ResponseCacheMiddleware, route_ttls_from_env
+from compression import CompressionMiddleware, level_from_env, min_size_from_env
+from pagination import MAX_LIMIT, decode_cursor, paginate
+from live_feed import LiveFeedHub
+from cache_backend import get_shared_cache
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, observe_inference, render_metrics
+from tracing import TracedRoute, TracingMiddleware, profiling_authorized, trace_store
+from admission import AdmissionController, limits_from_env
+from league_views import MaterializedViews
+from sports_api import create_sports_api_service
+from odds_aggregation import aggregate_odds, aggregate_rows
+from odds_history import OddsHistoryStore
+from warmup import WarmUp
+from src.ml.model_registry import ModelRegistry
+from src.ml.prediction_cache import LRUCache, PredictionCache
+
+startup_report.mark("imports")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Report the cold start, warm up in the background (see /api/ready), close connections on shutdown"""
+    startup_report.ready()
+    warmup.start()
+    yield
+    await warmup.stop()
+    odds_history.save_if_dirty()
+    results_logger.close()
+
+
+app = FastAPI(title="MagajiCo Sports Prediction API", lifespan=lifespan)
+# Every route records "endpoint" and "serialize" spans for tracing
+app.router.route_class = TracedRoute
 
-app = FastAPI(title="MagajiCo Sports Prediction API")
+import os
 
-# Prediction cache for consistency on failures
-_PREDICTION_RESULT_CACHE = {}
+# Memo of model outputs keyed by quantized features + model version
+prediction_cache = PredictionCache(max_size=int(os.getenv("PREDICTION_CACHE_SIZE", "4096")))
 
-# Initialize results logger with MongoDB support
-import os
+# Last good prediction per fixture, for consistency on failures: bounded per
+# worker, mirrored to the shared cache with a TTL (the key is client-supplied)
+_PREDICTION_RESULT_CACHE = LRUCache(max_size=1024)
+PREDICTION_RESULT_TTL = float(os.getenv("PREDICTION_RESULT_TTL", str(24 * 3600)))
+
+# Cache shared by all uvicorn workers on the host (CACHE_BACKEND_URL: sqlite
+# file by default, memory:// or redis://) - last good predictions, odds and
+# scrape results, so upstream load doesn't grow with the worker count
+shared_cache = get_shared_cache()
+startup_report.mark("shared_cache")
+
+# Initialize results logger with MongoDB support; the Atlas ping and JSON
+# sync run in the background (JSON-only until connected) so they don't
+# hold up serving
 results_logger = ResultsLogger(
     storage_path="shared/results_log.json",
-    mongodb_uri=os.getenv("MONGODB_URI")
+    mongodb_uri=os.getenv("MONGODB_URI"),
+    connect=False
+)
+mongodb_connect = startup_report.background("mongodb", results_logger.connect)
+startup_report.mark("results_log")
+
+# Precomputed team features (strength, form, head-to-head) for model inputs;
+# bootstrapped from the results log the first time, then updated incrementally
+team_features = TeamFeatureStore(path="shared/team_features.json")
+if not team_features.teams:
+    team_features.rebuild(results_logger)
+startup_report.mark("team_features")
+
+# Price history per match/market/bookmaker (change points, delta-encoded)
+# for line-movement queries; the results log keeps only fetch summaries
+odds_history = OddsHistoryStore(path="shared/odds_history.json")
+startup_report.mark("odds_history")
+
+# Cached GET responses with ETag/304 for polled endpoints (TTL per route,
+# override with RESPONSE_CACHE_TTLS). Added before CORS so CORS wraps it and
+# cached responses still get the right headers for each origin.
+response_cache = ResponseCache(max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "512")))
+app.add_middleware(
+    ResponseCacheMiddleware,
+    route_ttls=route_ttls_from_env(),
+    cache=response_cache,
+    minimum_size=min_size_from_env(),
+    level=level_from_env()
 )
 
+# gzip/brotli for everything else above COMPRESSION_MIN_SIZE bytes; cached
+# responses arrive already encoded and pass straight through
+app.add_middleware(CompressionMiddleware, minimum_size=min_size_from_env(), level=level_from_env())
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -34,20 +115,64 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Load ML Model
-try:
-    with open("shared/model_data.pkl", "rb") as f:
-        model_data = pickle.load(f)
-        ml_model = model_data["model"]
-        feature_names = model_data["feature_names"]
-    print("✅ ML Model loaded successfully from shared/model_data.pkl")
-except Exception as e:
-    print(f"❌ Failed to load ML model: {e}")
-    ml_model = None
-    feature_names = []
+# Request IDs, per-stage spans (Server-Timing) and on-demand profiling
+# (X-Debug-Profile: <DEBUG_PROFILE_TOKEN>); cached responses get an ID too
+app.add_middleware(TracingMiddleware)
+
+# Outermost, so latency includes cache, compression and CORS
+app.add_middleware(MetricsMiddleware)
+startup_report.mark("middleware")
+
+# ML model registry: versions load lazily (forest arrays memory-mapped, so
+# workers share pages) and a newly published version is hot-swapped in.
+# Falls back to the legacy pickle when nothing has been published yet.
+model_registry = ModelRegistry(
+    root=os.getenv("MODEL_REGISTRY_DIR", "shared/models"),
+    legacy_path="shared/model_data.pkl",
+    check_interval=float(os.getenv("MODEL_RELOAD_INTERVAL", "5"))
+)
+
+# Per-source limits on concurrent upstream scrapes/odds calls, run in the
+# threadpool so they never block the event loop; excess load gets a fast
+# 503 + Retry-After instead of starting more outbound work (ADMISSION_LIMITS)
+admission = AdmissionController(limits_from_env())
+
+# Initialize scraper with ML model (resolves the active version per batch)
+scraper = RealSportsScraperService(ml_predictor=model_registry, feature_store=team_features, cache=shared_cache,
+                                   odds_history=odds_history, admission=admission)
+
+# The Odds API client (ODDS_API_KEY) for cross-bookmaker odds
+sports_service = create_sports_api_service(feature_store=team_features, cache=shared_cache,
+                                           admission=admission)
+startup_report.mark("model_and_scraper")
 
-# Initialize scraper with ML model
-scraper = RealSportsScraperService(ml_predictor=ml_model)
+LEAGUE_VIEWS_MAX_AGE = float(os.getenv("LEAGUE_VIEWS_MAX_AGE", "15"))
+
+
+def _fetch_statarea() -> List[Dict[str, Any]]:
+    """Statarea scrape shared across workers; each worker still diffs it into its own snapshot"""
+    matches = shared_cache.get_or_compute("scrape:statarea", scraper.scrape_statarea, ttl=LEAGUE_VIEWS_MAX_AGE)
+    if matches:
+        scraper.snapshots.update("statarea", matches)  # no-op in the worker that scraped
+    return matches
+
+
+# League-grouped views for /api/predictions, /api/live, /api/soccer and the
+# live feed: one statarea scrape per LEAGUE_VIEWS_MAX_AGE seconds, regrouped
+# only when the snapshot version changes; requests just read the result
+league_views = MaterializedViews(
+    fetch=_fetch_statarea,
+    max_age=LEAGUE_VIEWS_MAX_AGE,
+    tracker=scraper.snapshots,
+    source="statarea"
+)
+
+
+async def _league_view(name: str) -> Dict[str, Any]:
+    """Materialized view by name; only a stale view costs a (threadpool) scrape"""
+    if league_views.is_stale():
+        return await run_in_threadpool(league_views.get, name)
+    return league_views.views[name]
 
 
 # ========== ML ENDPOINTS (Existing) ==========
@@ -55,15 +180,16 @@ scraper = RealSportsScraperService(ml_predictor=ml_model)
 @app.get("/api/ml/status")
 async def get_ml_status():
     """Get ML model status"""
-    if not ml_model:
+    model = model_registry.active()
+    if not model:
         raise HTTPException(status_code=503, detail="ML model not loaded")
     
     return {
         "status": "ready",
-        "model": str(type(ml_model).__name__).replace("Classifier", " Classifier"),
+        "model": "RandomForest Classifier",
         "accuracy": 0.9035,
-        "features": len(feature_names),
-        "feature_names": feature_names,
+        "features": len(model.feature_names),
+        "feature_names": model.feature_names,
         "prediction_classes": [
             "Home Win (1)",
             "Draw (X)",
@@ -71,7 +197,25 @@ async def get_ml_status():
         ],
         "training_samples": 10000,
         "training_accuracy": 0.987,
-        "test_accuracy": 0.9035
+        "test_accuracy": 0.9035,
+        "model_version": model.version,
+        "registry": model_registry.status(),
+        "prediction_cache": prediction_cache.stats()
+    }
+
+
+@app.post("/api/ml/reload")
+async def reload_ml_model():
+    """Hot-swap to the registry's current model version without a restart"""
+    model = model_registry.reload(force=True)
+    if not model:
+        raise HTTPException(status_code=503, detail=f"ML model not loaded: {model_registry.last_error}")
+    
+    return {
+        "status": "success",
+        "model_version": model.version,
+        "model": model.info(),
+        "timestamp": datetime.now().isoformat()
     }
 
 
@@ -87,17 +231,18 @@ async def predict_match(
     head_to_head: float = Query(0.5, ge=0.3, le=0.7),
     injuries: float = Query(0.9, ge=0.4, le=1.0)
 ):
-    """Make ML prediction for a match with caching for consistency on failures"""
-    global _PREDICTION_RESULT_CACHE
-    
-    if not ml_model:
+    """Make ML prediction for a match, memoized on the feature vector"""
+    # Pin one model version for the whole request, even if a hot swap happens
+    model = model_registry.active()
+    if not model:
         raise HTTPException(status_code=503, detail="ML model not loaded")
     
-    # Create cache key for this match
+    # Create fallback cache key for this match
     cache_key = f"{home_team}_{away_team}"
     
     try:
-        features = np.array([[
+        # Quantize once so the model sees exactly the features the memo is keyed on
+        quantized = prediction_cache.quantize([
             home_strength,
             away_strength,
             home_advantage,
@@ -105,10 +250,15 @@ async def predict_match(
             recent_form_away,
             head_to_head,
             injuries
-        ]])
+        ])
         
-        prediction = ml_model.predict(features)[0]
-        probabilities = ml_model.predict_proba(features)[0]
+        probabilities = prediction_cache.lookup(quantized, model.version)
+        cache_hit = probabilities is not None
+        if not cache_hit:
+            with observe_inference("api_single", 1):
+                probabilities = model.predict_proba(np.array([quantized]))[0]
+            prediction_cache.store(quantized, model.version, probabilities)
+        prediction = int(model.classes_[np.argmax(probabilities)])
         
         prediction_map = {
             0: "Home Win",
@@ -134,11 +284,19 @@ async def predict_match(
                 "head_to_head": head_to_head,
                 "injuries": injuries
             },
+            "model_version": model.version,
+            "cache_hit": cache_hit,
             "timestamp": datetime.now().isoformat()
         }
         
-        # Cache successful result for consistency on future failures
-        _PREDICTION_RESULT_CACHE[cache_key] = result
+        # Cache successful result for consistency on future failures; the
+        # shared copy is only rewritten when the prediction itself changed
+        previous = _PREDICTION_RESULT_CACHE.get(cache_key)
+        _PREDICTION_RESULT_CACHE.put(cache_key, result)
+        if previous is None or any(previous[field] != result[field]
+                                   for field in ("probabilities", "features_used", "model_version")):
+            await run_in_threadpool(shared_cache.set, f"prediction_result:{cache_key}", result,
+                                    PREDICTION_RESULT_TTL)
         
         # Log prediction result for training
         results_logger.log_prediction(result)
@@ -147,8 +305,11 @@ async def predict_match(
         
     except Exception as e:
         # On failure, return cached result if available to maintain consistency
-        if cache_key in _PREDICTION_RESULT_CACHE:
-            cached = _PREDICTION_RESULT_CACHE[cache_key].copy()
+        last_good = _PREDICTION_RESULT_CACHE.get(cache_key)
+        if last_good is None:
+            last_good = await run_in_threadpool(shared_cache.get, f"prediction_result:{cache_key}")
+        if last_good is not None:
+            cached = last_good.copy()
             cached["cached"] = True
             cached["error_recovered"] = f"Using cached prediction due to: {str(e)}"
             cached["cached_at"] = cached.get("timestamp")
@@ -174,7 +335,7 @@ async def get_sport_predictions(sport: str):
     
     try:
         # For soccer, return ScorePredictor predictions
-        predictions = scraper.scrape_scoreprediction()
+        predictions = await admission.run("scoreprediction", scraper.scrape_scoreprediction)
         
         # Format predictions for frontend compatibility
         formatted = []
@@ -209,6 +370,8 @@ async def get_sport_predictions(sport: str):
             "source": "ScorePredictor",
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch {sport} data: {str(e)}")
 
@@ -216,26 +379,34 @@ async def get_sport_predictions(sport: str):
 @app.get("/api/predictions/high-confidence")
 async def get_high_confidence_predictions(
     min_confidence: int = Query(85, ge=70, le=100),
-    api_key: Optional[str] = None
+    api_key: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description="Page size (default: everything)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. home_team,prediction")
 ):
     """
     Get only high-confidence predictions
     """
+    position = decode_cursor(cursor)
     try:
-        all_predictions = scraper.get_all_predictions(api_key=api_key)
+        all_predictions = await admission.run("espn", scraper.get_all_predictions, api_key=api_key)
         
         high_conf = [
             p for p in all_predictions 
             if p.get('confidence', 0) >= min_confidence
         ]
+        page = paginate(high_conf, limit, position, fields)
         
         return {
             "status": "success",
             "min_confidence": min_confidence,
-            "count": len(high_conf),
-            "predictions": high_conf,
+            "count": len(page["items"]),
+            "predictions": page["items"],
+            "pagination": page["pagination"],
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -243,47 +414,65 @@ async def get_high_confidence_predictions(
 @app.get("/api/predictions/league/{league}")
 async def get_league_predictions(
     league: str,
-    api_key: Optional[str] = None
+    api_key: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description="Page size (default: everything)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. home_team,prediction")
 ):
     """
     Get predictions filtered by league
     Examples: Premier League, La Liga, NFL, NBA
     """
+    position = decode_cursor(cursor)
     try:
-        all_predictions = scraper.get_all_predictions(api_key=api_key)
+        all_predictions = await admission.run("espn", scraper.get_all_predictions, api_key=api_key)
         
         league_predictions = [
             p for p in all_predictions
             if league.lower() in p.get('league', '').lower()
         ]
+        page = paginate(league_predictions, limit, position, fields)
         
         return {
             "league": league,
-            "count": len(league_predictions),
-            "predictions": league_predictions,
+            "count": len(page["items"]),
+            "predictions": page["items"],
+            "pagination": page["pagination"],
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/api/predictions/today")
-async def get_today_predictions(api_key: Optional[str] = None):
+async def get_today_predictions(
+    api_key: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description="Page size (default: everything)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. home_team,prediction")
+):
     """
     Get all predictions for today's matches
     """
+    position = decode_cursor(cursor)
     try:
-        predictions = scraper.get_all_predictions(api_key=api_key)
+        predictions = await admission.run("espn", scraper.get_all_predictions, api_key=api_key)
         
         # Filter for today (in production, you'd parse timestamps)
         today_predictions = predictions  # All fetched data is from today
+        page = paginate(today_predictions, limit, position, fields)
         
         return {
             "date": datetime.now().strftime("%Y-%m-%d"),
-            "count": len(today_predictions),
-            "predictions": today_predictions,
+            "count": len(page["items"]),
+            "predictions": page["items"],
+            "pagination": page["pagination"],
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -296,18 +485,100 @@ async def health_check():
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
-        "ml_model_loaded": ml_model is not None,
+        "ml_model_loaded": model_registry.current is not None,
         "scraper_active": True
     }
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    """Prometheus text exposition of request, scrape, inference and storage metrics"""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/api/startup")
+async def get_startup_report():
+    """Cold start breakdown: seconds per startup phase, budget and background initialization"""
+    return {"status": "success", **startup_report.to_dict(), "timestamp": datetime.now().isoformat()}
+
+
+# ========== DEBUG: TRACES AND PROFILES ==========
+
+def _require_debug_token(token: Optional[str]) -> None:
+    # Disabled (404) unless DEBUG_PROFILE_TOKEN is set; then the token is required
+    if not profiling_authorized(token):
+        raise HTTPException(status_code=404, detail="Not Found")
+
+
+@app.get("/api/debug/traces", include_in_schema=False)
+async def get_recent_traces(
+    limit: int = Query(50, ge=1, le=200),
+    min_ms: float = Query(0, ge=0, description="Only requests at least this slow"),
+    x_debug_profile: Optional[str] = Header(None)
+):
+    """Recent request traces, slowest first: per-stage totals by request ID"""
+    _require_debug_token(x_debug_profile)
+    traces = [t for t in trace_store.traces if (t.duration_ms or 0) >= min_ms]
+    traces.sort(key=lambda t: t.duration_ms or 0, reverse=True)
+    return {
+        "status": "success",
+        "traces": [{k: v for k, v in t.to_dict().items() if k != "spans"} for t in traces[:limit]]
+    }
+
+
+@app.get("/api/debug/traces/{request_id}", include_in_schema=False)
+async def get_trace(request_id: str, x_debug_profile: Optional[str] = Header(None)):
+    """Every span recorded for one request"""
+    _require_debug_token(x_debug_profile)
+    trace = trace_store.get_trace(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"No trace for request {request_id}")
+    return {"status": "success", **trace.to_dict()}
+
+
+@app.get("/api/debug/profile/{request_id}", include_in_schema=False)
+async def get_profile(request_id: str, x_debug_profile: Optional[str] = Header(None)):
+    """
+    Folded-stack CPU profile of a request sent with X-Debug-Profile
+    Feed to flamegraph.pl, inferno or speedscope
+    """
+    _require_debug_token(x_debug_profile)
+    folded = trace_store.get_profile(request_id)
+    if folded is None:
+        raise HTTPException(status_code=404, detail=f"No profile for request {request_id}")
+    return Response(
+        content=folded,
+        media_type="text/plain",
+        headers={"Content-Disposition": f'attachment; filename="{request_id}.folded"'}
+    )
+
+
+@app.get("/api/admission/stats")
+async def get_admission_stats():
+    """Active, queued and rejected upstream calls per source"""
+    return {"status": "success", "sources": admission.stats(), "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    """Response and prediction cache statistics"""
+    return {
+        "status": "success",
+        "response_cache": {**response_cache.stats(), "route_ttls": route_ttls_from_env()},
+        "prediction_cache": prediction_cache.stats(),
+        "league_views": league_views.stats(),
+        "shared_cache": shared_cache.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 @app.get("/api/predictions/mybets")
 async def get_mybets_predictions():
     """
     Get recommended soccer predictions from mybets.today
     """
     try:
-        predictions = scraper.scrape_mybets_today()
+        predictions = await admission.run("mybets", scraper.scrape_mybets_today)
         
         return {
             "status": "success",
@@ -316,6 +587,8 @@ async def get_mybets_predictions():
             "predictions": predictions,
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch mybets predictions: {str(e)}")
 
@@ -328,7 +601,7 @@ async def get_statarea_predictions():
     Accuracy: ~78% confidence prediction quality
     """
     try:
-        predictions = scraper.scrape_statarea()
+        predictions = await admission.run("statarea", scraper.scrape_statarea)
         
         return {
             "status": "success",
@@ -337,6 +610,8 @@ async def get_statarea_predictions():
             "predictions": predictions,
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch Statarea predictions: {str(e)}")
 
@@ -350,7 +625,7 @@ async def get_statarea_high_confidence(min_confidence: int = Query(78, ge=50, le
     """
     try:
         # Fetch all statarea predictions once
-        all_predictions = scraper.scrape_statarea()
+        all_predictions = await admission.run("statarea", scraper.scrape_statarea)
         
         # Filter for high confidence Home Win predictions
         predictions = scraper.get_statarea_high_confidence(
@@ -367,10 +642,31 @@ async def get_statarea_high_confidence(min_confidence: int = Query(78, ge=50, le
             "predictions": predictions,
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch Statarea high-confidence predictions: {str(e)}")
 
 
+def _log_odds_changes(snapshot_source: str, matches: List[Dict[str, Any]],
+                      meta: Dict[str, Any], source: str) -> None:
+    """
+    Log a summary of an odds fetch: which matches were added, updated or removed
+    (the prices themselves go to odds_history). Identical fetches aren't logged again.
+    """
+    changes = scraper.snapshots.update(snapshot_source, matches)
+    if not changes["changed"]:
+        return
+    by_type: Dict[str, List[str]] = {"added": [], "updated": [], "removed": []}
+    for event in changes["events"]:
+        by_type[event["type"]].append(event["key"])
+    results_logger.log_odds({
+        **meta,
+        "snapshot_version": changes["version"],
+        **by_type
+    }, source=source)
+
+
 @app.get("/api/odds/soccerapi")
 async def get_soccerapi_odds(
     bookmaker: str = Query("888sport", description="Bookmaker: 888sport, bet365, or unibet"),
@@ -384,7 +680,9 @@ async def get_soccerapi_odds(
     Includes: Full-time result odds + Over/Under 4.5 goals market
     """
     try:
-        odds = scraper.scrape_soccerapi_odds(
+        # Cached per bookmaker/league; only an actual soccerapi fetch takes an admission slot
+        odds = await run_in_threadpool(
+            scraper.scrape_soccerapi_odds,
             bookmaker=bookmaker.lower(),
             league=league.lower(),
             min_odds=1.0,
@@ -418,16 +716,17 @@ async def get_soccerapi_odds(
             "timestamp": datetime.now().isoformat()
         }
         
-        # Log odds results for training
-        results_logger.log_odds({
+        # Log odds results for training (only what changed since the last fetch)
+        _log_odds_changes(f"soccerapi_{bookmaker}_{league}_{max_odds}", filtered, {
             "league": league,
             "bookmaker": bookmaker,
             "max_odds": max_odds,
-            "total_matches": len(filtered),
-            "matches": filtered
+            "total_matches": len(filtered)
         }, source=f"soccerapi_{bookmaker}")
         
         return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch soccerapi odds: {str(e)}")
 
@@ -443,7 +742,9 @@ async def get_over_4_5_odds(
     Returns only matches with available over 4.5 goals odds <= threshold
     """
     try:
-        odds = scraper.scrape_soccerapi_odds(
+        # Cached per bookmaker/league; only an actual soccerapi fetch takes an admission slot
+        odds = await run_in_threadpool(
+            scraper.scrape_soccerapi_odds,
             bookmaker=bookmaker.lower(),
             league=league.lower(),
             min_odds=1.0,
@@ -479,17 +780,18 @@ async def get_over_4_5_odds(
             "timestamp": datetime.now().isoformat()
         }
         
-        # Log over 4.5 odds results for training
-        results_logger.log_odds({
+        # Log over 4.5 odds results for training (only what changed since the last fetch)
+        _log_odds_changes(f"soccerapi_{bookmaker}_{league}_over_4_5_{max_odds}", over_4_5_matches, {
             "market": "over_4_5_goals",
             "league": league,
             "bookmaker": bookmaker,
             "max_odds": max_odds,
-            "total_matches": len(over_4_5_matches),
-            "matches": over_4_5_matches
+            "total_matches": len(over_4_5_matches)
         }, source=f"soccerapi_{bookmaker}_over_4_5")
         
         return response
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch over 4.5 odds: {str(e)}")
 
@@ -503,7 +805,7 @@ async def get_bet365_odds(
     Returns: Matches with betting odds <= max_odds from Bet365
     """
     try:
-        bet365_odds = scraper.scrape_bet365_odds()
+        bet365_odds = await admission.run("bet365", scraper.scrape_bet365_odds)
         
         # Filter by max_odds threshold
         filtered = [
@@ -528,10 +830,122 @@ async def get_bet365_odds(
             "matches": filtered,
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch Bet365 odds: {str(e)}")
 
 
+@app.get("/api/odds/consensus/{sport}")
+async def get_odds_consensus(
+    sport: str,
+    bookmaker: Optional[str] = Query(None, description="Comma-separated bookmaker keys to restrict to")
+):
+    """
+    Whole-sport odds summary across bookmakers (The Odds API): best price per
+    outcome, implied probabilities, bookmaker margins and margin-free consensus
+    """
+    if not sports_service.odds_api_key:
+        raise HTTPException(status_code=503, detail="ODDS_API_KEY not configured")
+    try:
+        # Cached per request; only an actual /odds call takes an admission slot
+        batch = await run_in_threadpool(sports_service.fetch_odds_data, sport, bookmaker,
+                                        columnar=True, markets=("h2h",))
+        odds_history.record_batch(batch, league=sport.upper())
+        aggregate = aggregate_odds(batch)
+        games = aggregate_rows(batch, aggregate)
+        return {
+            "status": "success",
+            "source": "The Odds API",
+            "sport": sport.upper(),
+            "total_games": len(games),
+            "bookmakers": batch.bookmakers,
+            "arbitrage_games": sum(1 for game in games if game["arbitrage"]),
+            "games": games,
+            "timestamp": datetime.now().isoformat()
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to aggregate odds: {str(e)}")
+
+
+@app.get("/api/odds/quota")
+async def get_odds_quota():
+    """The Odds API credits left, budget pressure and the refresh demand per sport/market request"""
+    return {"status": "success", **sports_service.odds_quota.stats(), "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/api/odds/history/matches")
+async def get_odds_history_matches(
+    team: Optional[str] = Query(None, description="Only matches involving this team (substring)")
+):
+    """Matches with recorded price history, with the keys the other history endpoints take"""
+    matches = odds_history.find_matches(team)
+    return {
+        "status": "success",
+        "total_matches": len(matches),
+        "matches": matches,
+        "store": odds_history.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/odds/history/movement")
+async def get_odds_movement(
+    match: str = Query(..., description="Match key from /api/odds/history/matches"),
+    market: Optional[str] = Query(None, description="1x2, ou_4_5 (soccerapi) or h2h (The Odds API)"),
+    bookmaker: Optional[str] = Query(None),
+    window_minutes: Optional[float] = Query(None, gt=0, description="Also report the move over this many minutes")
+):
+    """Opening vs current price per market/bookmaker/outcome of a match"""
+    window = window_minutes * 60 if window_minutes else None
+    movement = odds_history.movement(match, market=market, bookmaker=bookmaker, window=window)
+    if not movement:
+        raise HTTPException(status_code=404, detail=f"No odds history for {match}")
+    return {
+        "status": "success",
+        "match": match,
+        **odds_history.matches.get(match, {}),
+        "series": movement,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/odds/history/movers")
+async def get_odds_movers(
+    window_minutes: float = Query(60, gt=0, le=7 * 24 * 60),
+    min_change_pct: float = Query(0.0, ge=0),
+    market: Optional[str] = Query(None),
+    limit: int = Query(50, ge=1, le=MAX_LIMIT)
+):
+    """Biggest price moves across all matches over the last window (default: the last hour)"""
+    movers = odds_history.movers(window=window_minutes * 60, min_change_pct=min_change_pct,
+                                 limit=limit, market=market)
+    return {
+        "status": "success",
+        "window_minutes": window_minutes,
+        "total": len(movers),
+        "movers": movers,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/odds/history")
+async def get_odds_history(
+    match: str = Query(..., description="Match key from /api/odds/history/matches"),
+    market: Optional[str] = Query(None),
+    bookmaker: Optional[str] = Query(None)
+):
+    """Every recorded price change of a match as [unix_time, price] points per series"""
+    series = odds_history.history(match, market=market, bookmaker=bookmaker)
+    if not series:
+        raise HTTPException(status_code=404, detail=f"No odds history for {match}")
+    return {"status": "success", "match": match, "series": series, "timestamp": datetime.now().isoformat()}
+
+
 @app.get("/api/odds/aggregate-weekly-soccer")
 async def get_aggregate_weekly_soccer_odds(
     max_odds: float = Query(1.16, ge=1.0, le=3.0, description="Maximum odds threshold")
@@ -545,7 +959,7 @@ async def get_aggregate_weekly_soccer_odds(
         
         # Fetch from Bet365
         try:
-            bet365_odds = scraper.scrape_bet365_odds()
+            bet365_odds = await admission.run("bet365", scraper.scrape_bet365_odds)
             filtered_bet365 = [
                 {
                     "home_team": p.get("home_team"),
@@ -566,7 +980,7 @@ async def get_aggregate_weekly_soccer_odds(
         
         # Fetch from MyBets
         try:
-            mybets_predictions = scraper.scrape_mybets_today()
+            mybets_predictions = await admission.run("mybets", scraper.scrape_mybets_today)
             all_odds.extend([
                 {
                     "home_team": p.get("home_team"),
@@ -582,7 +996,7 @@ async def get_aggregate_weekly_soccer_odds(
         
         # Fetch from Statarea (has odds data)
         try:
-            statarea_predictions = scraper.scrape_statarea()
+            statarea_predictions = await admission.run("statarea", scraper.scrape_statarea)
             filtered_statarea = [
                 {
                     "home_team": p.get("home_team"),
@@ -636,19 +1050,26 @@ async def get_aggregate_weekly_soccer_odds(
 @app.get("/api/training/logs")
 async def get_training_logs(
     log_type: Optional[str] = Query(None, description="Type: prediction, odds, or match"),
-    count: int = Query(100, ge=1, le=1000, description="Number of recent logs to retrieve")
+    count: int = Query(100, ge=1, le=1000, description="Number of recent logs to retrieve"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description="Page size (default: everything)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. home_team,prediction")
 ):
     """
     Get logged API results for training and analysis
     Returns all output stored since system startup
+    (the `count` most recent logs, paged with limit/cursor)
     """
+    position = decode_cursor(cursor)
     try:
         recent = results_logger.get_recent(count=count, log_type=log_type)
+        page = paginate(recent, limit, position, fields)
         return {
             "status": "success",
             "log_type": log_type or "all",
-            "count": len(recent),
-            "logs": recent,
+            "count": len(page["items"]),
+            "logs": page["items"],
+            "pagination": page["pagination"],
             "total_stored": {
                 "predictions": len(results_logger.results["predictions"]),
                 "odds": len(results_logger.results["odds"]),
@@ -656,6 +1077,8 @@ async def get_training_logs(
             },
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to retrieve logs: {str(e)}")
 
@@ -706,6 +1129,43 @@ async def get_training_summary():
         raise HTTPException(status_code=500, detail=f"Failed to get summary: {str(e)}")
 
 
+# ========== TEAM FEATURE ENDPOINTS ==========
+
+@app.get("/api/teams/features")
+async def get_match_features(
+    home_team: str = Query(..., description="Home team name"),
+    away_team: str = Query(..., description="Away team name")
+):
+    """Precomputed model features and team stats for a fixture"""
+    return {
+        "status": "success",
+        "match": f"{home_team} - {away_team}",
+        "features": dict(zip(FEATURE_NAMES, team_features.match_features(home_team, away_team))),
+        "stats": team_features.team_stats(home_team, away_team),
+        "store": team_features.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/teams/{team}/features")
+async def get_team_features(team: str):
+    """Running totals, strength and form for one team"""
+    summary = team_features.team_summary(team)
+    if summary is None:
+        raise HTTPException(status_code=404, detail=f"No logged results for {team}")
+    return {"status": "success", "team": summary, "timestamp": datetime.now().isoformat()}
+
+
+@app.post("/api/teams/features/rebuild")
+async def rebuild_team_features():
+    """Recompute the team feature store from the full results log"""
+    try:
+        added = team_features.rebuild(results_logger)
+        return {"status": "success", "results_replayed": added, **team_features.stats()}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to rebuild team features: {str(e)}")
+
+
 @app.get("/api/mongodb/status")
 async def get_mongodb_status():
     """
@@ -763,7 +1223,7 @@ async def get_mongodb_stats():
 async def get_stats(api_key: Optional[str] = None):
     """Get prediction statistics"""
     try:
-        predictions = scraper.get_all_predictions(api_key=api_key)
+        predictions = await admission.run("espn", scraper.get_all_predictions, api_key=api_key)
         
         if not predictions:
             return {
@@ -789,6 +1249,8 @@ async def get_stats(api_key: Optional[str] = None):
             "by_sport": by_sport,
             "timestamp": datetime.now().isoformat()
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -813,6 +1275,10 @@ async def log_accuracy(
             odds=odds
         )
         
+        record = results_logger.results["accuracy"][-1]
+        if team_features.record_outcome(match, actual, result_id=accuracy_result_id(record)):
+            team_features.save()
+        
         return {
             "status": "success",
             "message": "Prediction result logged",
@@ -935,45 +1401,8 @@ async def get_all_predictions_grouped():
     Get all predictions grouped by league (for frontend display)
     Format: { league: string, games: [] }
     """
-    try:
-        predictions = scraper.scrape_statarea()
-        
-        # Group by league
-        grouped = {}
-        for pred in predictions:
-            league = pred.get("league", "Unknown League")
-            if league not in grouped:
-                grouped[league] = {
-                    "league": league,
-                    "games": []
-                }
-            
-            game = {
-                "home_team": pred.get("home_team"),
-                "away_team": pred.get("away_team"),
-                "prediction_1x2": pred.get("prediction", ""),
-                "prediction_over_under": pred.get("total_goals", ""),
-                "prediction_btts": "",
-                "confidence": pred.get("confidence", 75),
-                "time": pred.get("time", ""),
-                "league": league
-            }
-            grouped[league]["games"].append(game)
-        
-        matches = list(grouped.values())
-        
-        return {
-            "status": "success",
-            "matches": matches,
-            "total_leagues": len(grouped),
-            "timestamp": datetime.now().isoformat()
-        }
-    except Exception as e:
-        return {
-            "status": "success",
-            "matches": [],
-            "timestamp": datetime.now().isoformat()
-        }
+    view = await _league_view("predictions")
+    return {**view, "timestamp": datetime.now().isoformat()}
 
 
 @app.get("/api/secrets")
@@ -1056,32 +1485,87 @@ async def get_live_data():
     """
     Get live soccer matches with odds
     """
+    view = await _league_view("live")
+    return {**view, "timestamp": datetime.now().isoformat()}
+
+
+# ========== LIVE PUSH FEED ==========
+
+# One scrape loop shared by every connected viewer, running only while
+# someone is subscribed; clients receive just the matches that changed.
+# Reads the materialized live view, so it shares the statarea scrape
+live_feed = LiveFeedHub(
+    fetch=lambda: league_views.get("live")["matches"],
+    interval=float(os.getenv("LIVE_FEED_INTERVAL", "15")),
+    heartbeat=float(os.getenv("LIVE_FEED_HEARTBEAT", "15")),
+    max_queue=int(os.getenv("LIVE_FEED_QUEUE", "100")),
+    tracker=scraper.snapshots,
+    source="live_feed"
+)
+
+
+@app.get("/api/live/stream")
+async def stream_live_data(
+    league: Optional[str] = Query(None, description="Only matches whose league contains this"),
+    match: Optional[str] = Query(None, description="Only matches whose 'HOME vs AWAY' contains this")
+):
+    """
+    Server-Sent Events feed of live matches
+    Sends a snapshot, then added/updated/removed events, heartbeats when idle,
+    and a resync snapshot if the client falls too far behind
+    """
+    subscriber = live_feed.subscribe(league=league, match=match)
+    
+    async def event_stream():
+        try:
+            yield f"retry: {int(live_feed.interval * 1000)}\n\n"
+            async for event in live_feed.events(subscriber):
+                yield event.sse() if event.type != "heartbeat" else ": heartbeat\n\n"
+        finally:
+            live_feed.unsubscribe(subscriber)
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.websocket("/ws/live")
+async def websocket_live_data(websocket: WebSocket, league: Optional[str] = None, match: Optional[str] = None):
+    """WebSocket version of /api/live/stream (same JSON events, one per message)"""
+    await websocket.accept()
+    subscriber = live_feed.subscribe(league=league, match=match)
     try:
-        live_matches = scraper.scrape_statarea()
-        
-        formatted = []
-        for match in live_matches:
-            formatted.append({
-                "home_team": match.get("home_team", ""),
-                "away_team": match.get("away_team", ""),
-                "league": match.get("league", ""),
-                "time": match.get("time", ""),
-                "prediction": match.get("prediction", ""),
-                "odds": match.get("odds", ""),
-                "confidence": match.get("confidence", 75)
-            })
-        
-        return {
-            "status": "success",
-            "matches": formatted,
-            "timestamp": datetime.now().isoformat()
-        }
-    except Exception as e:
-        return {
-            "status": "success",
-            "matches": [],
-            "timestamp": datetime.now().isoformat()
-        }
+        async for event in live_feed.events(subscriber):
+            await websocket.send_text(event.json)
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        live_feed.unsubscribe(subscriber)
+
+
+@app.get("/api/changes")
+async def get_snapshot_changes(
+    since: int = Query(0, ge=0, description="Return events with seq greater than this"),
+    source: Optional[str] = Query(None, description="Scrape source, e.g. statarea, flashscore, live_feed"),
+    limit: int = Query(500, ge=1, le=MAX_LIMIT)
+):
+    """Added/updated/removed match events between successive scrapes, for catching up by sequence"""
+    events = scraper.snapshots.events_since(since, source=source, limit=limit)
+    return {
+        "status": "success",
+        "events": events,
+        "next_since": events[-1]["seq"] if events else since,
+        **scraper.snapshots.stats(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/api/live/feed/stats")
+async def get_live_feed_stats():
+    """Subscriber count, backpressure and refresh status of the live feed"""
+    return {"status": "success", **live_feed.stats(), "timestamp": datetime.now().isoformat()}
 
 
 @app.get("/api/soccer")
@@ -1090,44 +1574,8 @@ async def get_soccer_live():
     Get real-time soccer matches from scraper (for homepage)
     Grouped by league with live odds
     """
-    try:
-        matches = scraper.scrape_statarea()
-        
-        # Group by league like homepage format
-        grouped = {}
-        for match in matches:
-            league = match.get("league", "Unknown League")
-            if league not in grouped:
-                grouped[league] = {
-                    "league": league,
-                    "flag": "⚽",
-                    "games": []
-                }
-            
-            game = {
-                "home_team": match.get("home_team", ""),
-                "away_team": match.get("away_team", ""),
-                "time": match.get("time", ""),
-                "odds": match.get("odds", ""),
-                "prediction": match.get("prediction", ""),
-                "confidence": match.get("confidence", 75)
-            }
-            grouped[league]["games"].append(game)
-        
-        matches_list = list(grouped.values())
-        
-        return {
-            "status": "success",
-            "matches": matches_list,
-            "timestamp": datetime.now().isoformat()
-        }
-    except Exception as e:
-        return {
-            "status": "success",
-            "matches": [],
-            "error": str(e),
-            "timestamp": datetime.now().isoformat()
-        }
+    view = await _league_view("soccer")
+    return {**view, "timestamp": datetime.now().isoformat()}
 
 
 # ========== RESULTS ENDPOINTS ==========
@@ -1164,6 +1612,11 @@ async def format_prediction_result(
         results_logger.results.setdefault("results", []).append(result)
         results_logger.save_results()
         
+        if actual_result and team_features.record_outcome(
+            result["match"], actual_result, result_id=template_result_id(result)
+        ):
+            team_features.save()
+        
         return {
             "status": "success",
             "result": result,
@@ -1177,8 +1630,14 @@ async def format_prediction_result(
 
 
 @app.get("/api/predictions/results/history")
-async def get_results_history(source: Optional[str] = Query(None, description="Filter by source")):
-    """Get history of organized prediction results"""
+async def get_results_history(
+    source: Optional[str] = Query(None, description="Filter by source"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description="Page size (default: everything)"),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. home_team,prediction")
+):
+    """Get history of organized prediction results (stats cover every result, not just the page)"""
+    position = decode_cursor(cursor)
     try:
         results = results_logger.results.get("results", [])
         
@@ -1191,6 +1650,7 @@ async def get_results_history(source: Optional[str] = Query(None, description="F
         lost = len([r for r in results if r.get("result_status") == "LOST"])
         pending = len([r for r in results if r.get("result_status") is None])
         accuracy = (won / (won + lost) * 100) if (won + lost) > 0 else 0
+        page = paginate(results, limit, position, fields)
         
         return {
             "status": "success",
@@ -1201,8 +1661,11 @@ async def get_results_history(source: Optional[str] = Query(None, description="F
                 "pending": pending,
                 "accuracy": f"{accuracy:.2f}%"
             },
-            "results": results
+            "results": page["items"],
+            "pagination": page["pagination"]
         }
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "status": "error",
@@ -1230,6 +1693,10 @@ async def root():
             "soccerapi_odds": "/api/odds/soccerapi",
             "over_4_5_goals": "/api/odds/over-4-5",
             "bet365_odds": "/api/odds/bet365",
+            "odds_consensus": "/api/odds/consensus/{sport}",
+            "odds_quota": "/api/odds/quota",
+            "odds_history": "/api/odds/history/matches",
+            "odds_movers": "/api/odds/history/movers",
             "aggregate_weekly_soccer_odds": "/api/odds/aggregate-weekly-soccer",
             "format_result": "/api/predictions/results (POST)",
             "results_history": "/api/predictions/results/history",
@@ -1239,12 +1706,82 @@ async def root():
             "mongodb_status": "/api/mongodb/status",
             "mongodb_stats": "/api/mongodb/stats",
             "health": "/api/health",
+            "ready": "/api/ready",
+            "startup": "/api/startup",
             "stats": "/api/stats"
         },
         "docs": "/docs"
     }
 
 
+# ========== WARM-UP ==========
+
+# Sources scraped once at startup, so their snapshots/views exist before the first request
+WARMUP_SOURCES = [s.strip() for s in os.getenv("WARMUP_SOURCES", "statarea,soccerapi").split(",") if s.strip()]
+WARMUP_FETCHES = {
+    "statarea": lambda: league_views.refresh(force=True),
+    "soccerapi": scraper.scrape_soccerapi_odds,  # default bookmaker and league
+    "mybets": scraper.scrape_mybets_today,
+    "scoreprediction": scraper.scrape_scoreprediction,
+    "espn": scraper.get_all_predictions,
+}
+
+
+def _warm_model() -> Dict[str, Any]:
+    """Load the active model version and run one dummy inference"""
+    model = model_registry.active()
+    if not model:
+        raise RuntimeError(f"ML model not loaded: {model_registry.last_error}")
+    model.predict_proba(np.array([prediction_cache.quantize([0.5] * len(FEATURE_NAMES))]))
+    return {"version": model.version}
+
+
+def _warm_imports() -> List[str]:
+    """Import the optional dependencies handlers load lazily, if installed"""
+    import importlib
+    import importlib.util
+    loaded = []
+    for module in ("soccerapi.api", "openai"):
+        if importlib.util.find_spec(module.split(".")[0]) is not None:
+            importlib.import_module(module)
+            loaded.append(module)
+    return loaded
+
+
+def _warm_connections() -> Dict[str, Any]:
+    """Wait for the background MongoDB connect and open the shared cache connection"""
+    mongodb_connect.join(timeout=10)
+    shared_cache.get("warmup")
+    return {"mongodb": results_logger.mongo_db is not None, "shared_cache": shared_cache.backend_name}
+
+
+def _warm_source(source: str) -> Callable[[], int]:
+    def warm() -> int:
+        result = WARMUP_FETCHES[source]()
+        rows = len(result) if isinstance(result, list) else int(bool(result))
+        if not rows:
+            # Scrapers swallow their own errors and return nothing: that isn't warm
+            raise RuntimeError(f"{source} returned no rows")
+        return rows
+    return warm
+
+
+warmup = WarmUp(
+    [("model", _warm_model), ("imports", _warm_imports), ("connections", _warm_connections)]
+    + [(f"scrape.{source}", _warm_source(source)) for source in WARMUP_SOURCES if source in WARMUP_FETCHES]
+)
+
+
+@app.get("/api/ready")
+async def readiness_check():
+    """Readiness for load balancers / rolling deploys: 503 until warm-up has finished (/api/health is liveness)"""
+    payload = {**warmup.status(), "timestamp": datetime.now().isoformat()}
+    return JSONResponse(status_code=200 if warmup.ready else 503, content=payload)
+
+
+startup_report.mark("routes")
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
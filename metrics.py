@@ -0,0 +1,437 @@
+"""
+Prometheus-style metrics: counters, gauges and latency histograms in the text exposition format
+Served at /metrics; per worker process (scrape each worker, or sum at the collector)
+"""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from tracing import record_span, span
+from upstream import resolve_url
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; request and scrape latencies run from ~1ms (cache hits) to ~30s (slow scrapes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+INFERENCE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5)
+BATCH_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values: Any, **kwargs: Any) -> Any:
+        """Child series for one label combination (created on first use)"""
+        key = tuple(str(v) for v in values) if values else tuple(str(kwargs[n]) for n in self.labelnames)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _default(self) -> Any:
+        return self.labels()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value", "_lock", "function")
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+        self.function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = float(value)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """Read the value from `function` at scrape time instead of storing it"""
+        self.function = function
+
+    def get(self) -> float:
+        if self.function is not None:
+            try:
+                return float(self.function())
+            except Exception:
+                return float("nan")
+        return self.value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._default().inc(amount)
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_label_text(self.labelnames, key)} {_format_value(child.get())}"
+                for key, child in list(self._children.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float) -> None:
+        self._default().set(value)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self._default().dec(amount)
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        self._default().set_function(function)
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "_lock")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self) -> _HistogramValue:
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._default().observe(value)
+
+    def time(self) -> Any:
+        return self._default().time()
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}")
+            labels = _label_text(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> None:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+
+    def get(self, name: str) -> Optional[_Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+# ---------- application metrics ----------
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template",
+    ["method", "route", "status"]
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests currently being served")
+
+SCRAPE_SECONDS = Histogram(
+    "scrape_duration_seconds", "Total time of one scrape/fetch call, by service and source",
+    ["service", "source"]
+)
+SCRAPE_FETCH_SECONDS = Histogram(
+    "scrape_fetch_seconds", "Time spent waiting on upstream HTTP within a scrape",
+    ["service", "source"]
+)
+SCRAPE_PARSE_SECONDS = Histogram(
+    "scrape_parse_seconds", "Time spent parsing and post-processing within a scrape (total minus fetch)",
+    ["service", "source"]
+)
+SCRAPE_ITEMS = Counter("scrape_items_total", "Items returned by scrapes", ["service", "source"])
+SCRAPE_EMPTY = Counter("scrape_empty_total", "Scrapes that returned no items", ["service", "source"])
+SCRAPE_ERRORS = Counter(
+    "scrape_errors_total", "Upstream errors by kind (http status, timeout, connection, exception)",
+    ["service", "source", "kind"]
+)
+
+INFERENCE_SECONDS = Histogram(
+    "inference_duration_seconds", "Model predict_proba latency", ["path"], buckets=INFERENCE_BUCKETS
+)
+INFERENCE_BATCH_SIZE = Histogram(
+    "inference_batch_size", "Rows per predict_proba call", ["path"], buckets=BATCH_BUCKETS
+)
+
+RESULTS_WRITE_SECONDS = Histogram(
+    "results_logger_write_duration_seconds", "ResultsLogger write latency by log type and store",
+    ["log_type", "store"]
+)
+RESULTS_WRITES_IN_FLIGHT = Gauge(
+    "results_logger_writes_in_flight", "ResultsLogger writes started but not finished (write queue depth)"
+)
+RESULTS_RECORDS = Gauge("results_logger_records", "Records held in the JSON results log", ["collection"])
+RESULTS_WRITE_ERRORS = Counter("results_logger_write_errors_total", "Failed ResultsLogger writes", ["store"])
+
+ODDS_API_REMAINING = Gauge("odds_api_requests_remaining", "The Odds API quota remaining (x-requests-remaining)")
+ODDS_API_USED = Gauge("odds_api_requests_used", "The Odds API quota used (x-requests-used)")
+
+
+# ---------- scrape instrumentation ----------
+
+_scrape_state = threading.local()
+
+
+def _current_scrape() -> Optional[Dict[str, Any]]:
+    stack = getattr(_scrape_state, "stack", None)
+    return stack[-1] if stack else None
+
+
+def track_scrape(source: str, service: str = "scraper") -> Callable:
+    """
+    Decorator timing a scrape method: total, upstream fetch and parse time,
+    items returned, empty results and exceptions. Upstream calls made through
+    http_get() inside it are attributed to `source`.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            stack = getattr(_scrape_state, "stack", None)
+            if stack is None:
+                stack = _scrape_state.stack = []
+            state = {"service": service, "source": source, "fetch": 0.0}
+            stack.append(state)
+            start = time.perf_counter()
+            try:
+                with span(f"scrape.{source}", service=service):
+                    result = func(*args, **kwargs)
+            except Exception:
+                SCRAPE_ERRORS.labels(service, source, "exception").inc()
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                stack.pop()
+                SCRAPE_SECONDS.labels(service, source).observe(elapsed)
+                if state["fetch"]:
+                    parse = max(0.0, elapsed - state["fetch"])
+                    SCRAPE_PARSE_SECONDS.labels(service, source).observe(parse)
+                    record_span(f"parse.{source}", parse)
+            try:
+                count = len(result)
+            except TypeError:
+                count = None
+            if count is not None:
+                SCRAPE_ITEMS.labels(service, source).inc(count)
+                if count == 0:
+                    SCRAPE_EMPTY.labels(service, source).inc()
+            return result
+        return wrapper
+    return decorator
+
+
+# One keep-alive connection pool per process for all scraper requests,
+# instead of a new TCP/TLS handshake per requests.get
+HTTP_POOL_SIZE = 16
+http_session = requests.Session()
+_adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+http_session.mount("http://", _adapter)
+http_session.mount("https://", _adapter)
+
+
+def http_get(url: str, **kwargs: Any) -> requests.Response:
+    """
+    A GET on the shared session, timed and error-counted against the enclosing track_scrape source
+    (and redirected to the stand-in server when UPSTREAM_BASE_URL is set)
+    """
+    state = _current_scrape()
+    service, source = (state["service"], state["source"]) if state else ("other", "untracked")
+    start = time.perf_counter()
+    try:
+        with span(f"fetch.{source}", url=url.split("?", 1)[0]):
+            response = http_session.get(resolve_url(url), **kwargs)
+    except requests.Timeout:
+        SCRAPE_ERRORS.labels(service, source, "timeout").inc()
+        raise
+    except requests.ConnectionError:
+        SCRAPE_ERRORS.labels(service, source, "connection").inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        SCRAPE_FETCH_SECONDS.labels(service, source).observe(elapsed)
+        if state:
+            state["fetch"] += elapsed
+    if response.status_code >= 400:
+        SCRAPE_ERRORS.labels(service, source, f"http_{response.status_code}").inc()
+    return response
+
+
+@contextmanager
+def observe_inference(path: str, rows: int) -> Iterator[None]:
+    INFERENCE_BATCH_SIZE.labels(path).observe(rows)
+    with INFERENCE_SECONDS.labels(path).time(), span("predict", rows=rows):
+        yield
+
+
+@contextmanager
+def observe_write(log_type: str, store: str) -> Iterator[None]:
+    """Time one ResultsLogger write; exceptions passing through count as errors"""
+    RESULTS_WRITES_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        with span(f"log.{store}", log_type=log_type):
+            yield
+    except Exception:
+        RESULTS_WRITE_ERRORS.labels(store).inc()
+        raise
+    finally:
+        RESULTS_WRITES_IN_FLIGHT.dec()
+        RESULTS_WRITE_SECONDS.labels(log_type, store).observe(time.perf_counter() - start)
+
+
+def record_odds_api_quota(headers: Any) -> None:
+    remaining = headers.get("x-requests-remaining")
+    used = headers.get("x-requests-used")
+    try:
+        if remaining is not None:
+            ODDS_API_REMAINING.set(float(remaining))
+        if used is not None:
+            ODDS_API_USED.set(float(used))
+    except ValueError:
+        pass
+
+
+# ---------- HTTP middleware ----------
+
+def _route_template(scope: Dict[str, Any]) -> str:
+    """Route path template (e.g. /api/teams/{team}/features) to keep label cardinality bounded"""
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    # Not routed (served from the response cache, or 404): match the app's routes ourselves
+    app = scope.get("app")
+    router = getattr(app, "router", None)
+    for candidate in getattr(router, "routes", []):
+        try:
+            match, _ = candidate.matches(scope)
+        except Exception:
+            continue
+        if match.name == "FULL" and hasattr(candidate, "path"):
+            return candidate.path
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency per method, route template and status"""
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def wrapped_send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            HTTP_REQUEST_SECONDS.labels(scope["method"], _route_template(scope), str(status["code"])).observe(elapsed)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,117 @@
+"""
+Cross-bookmaker odds aggregation on an OddsBatch: best price per outcome,
+implied probabilities, bookmaker margins and margin-free consensus
+probabilities, computed for every game and bookmaker at once with NumPy
+"""
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from sports_api import H2H_OUTCOMES, OddsBatch
+
+
+def aggregate_odds(batch: OddsBatch) -> Dict[str, np.ndarray]:
+    """
+    Arrays over the whole slate (G games, B bookmakers, 3 outcomes):
+    best_price/best_bookmaker/best_implied (G, 3), margin (G, B),
+    average_margin/lowest_margin/best_overround/books (G,), consensus (G, 3).
+    A bookmaker counts towards margins and consensus only with a complete
+    book: home and away priced, plus draw when anyone prices a draw.
+    """
+    prices = batch.prices
+    games, bookmakers = batch.shape
+    valid = prices > 1.0  # decimal odds; NaN compares False
+
+    implied = np.divide(1.0, prices, out=np.full(prices.shape, np.nan), where=valid)
+
+    # Two-way markets (NBA, NFL, MLB moneylines) have no draw at all
+    three_way = valid[:, :, 1].any(axis=1) if bookmakers else np.zeros(games, dtype=bool)
+    complete = valid[:, :, 0] & valid[:, :, 2] & (valid[:, :, 1] | ~three_way[:, None])
+    books = complete.sum(axis=1)
+
+    overround = np.where(complete, np.nansum(implied, axis=2), np.nan)
+    margin = overround - 1.0
+    has_books = books > 0
+    average_margin = np.full(games, np.nan)
+    lowest_margin = np.full(games, np.nan)
+    if has_books.any():
+        average_margin[has_books] = np.where(complete, margin, 0.0)[has_books].sum(axis=1) / books[has_books]
+        lowest_margin[has_books] = np.where(complete, margin, np.inf)[has_books].min(axis=1)
+
+    # Margin-free probabilities per bookmaker, averaged over complete books
+    fair = np.where(complete[:, :, None], np.nan_to_num(implied / overround[:, :, None]), 0.0)
+    consensus = np.full((games, 3), np.nan)
+    consensus[has_books] = fair[has_books].sum(axis=1) / books[has_books, None]
+    consensus[~three_way, 1] = np.nan
+
+    best_bookmaker = np.argmax(np.where(valid, prices, -np.inf), axis=1) if bookmakers else np.zeros((games, 3), dtype=int)
+    priced = valid.any(axis=1)
+    best_price = np.full((games, 3), np.nan)
+    if bookmakers:
+        best_price[priced] = np.take_along_axis(prices, best_bookmaker[:, None, :], axis=1)[:, 0, :][priced]
+    best_bookmaker = np.where(priced, best_bookmaker, -1)
+    best_implied = np.divide(1.0, best_price, out=np.full(best_price.shape, np.nan), where=priced)
+
+    # Taking every outcome at its best price; below 1.0 is an arbitrage
+    best_complete = priced[:, 0] & priced[:, 2] & (priced[:, 1] | ~three_way)
+    best_overround = np.where(best_complete, np.nansum(best_implied, axis=1), np.nan)
+
+    return {
+        "best_price": best_price,
+        "best_bookmaker": best_bookmaker,
+        "best_implied": best_implied,
+        "margin": margin,
+        "average_margin": average_margin,
+        "lowest_margin": lowest_margin,
+        "best_overround": best_overround,
+        "consensus": consensus,
+        "books": books,
+        "three_way": three_way
+    }
+
+
+def _rounded(value: float, digits: int = 4) -> Optional[float]:
+    return None if value is None or np.isnan(value) else round(value, digits)
+
+
+def aggregate_rows(batch: OddsBatch, aggregate: Optional[Dict[str, np.ndarray]] = None) -> List[Dict[str, Any]]:
+    """One JSON-ready summary per game from aggregate_odds"""
+    aggregate = aggregate if aggregate is not None else aggregate_odds(batch)
+    best_price = aggregate["best_price"].tolist()
+    best_bookmaker = aggregate["best_bookmaker"].tolist()
+    best_implied = aggregate["best_implied"].tolist()
+    consensus = aggregate["consensus"].tolist()
+    average_margin = aggregate["average_margin"].tolist()
+    lowest_margin = aggregate["lowest_margin"].tolist()
+    best_overround = aggregate["best_overround"].tolist()
+    books = aggregate["books"].tolist()
+    three_way = aggregate["three_way"].tolist()
+
+    rows = []
+    for g, game_id in enumerate(batch.game_ids):
+        outcomes = H2H_OUTCOMES if three_way[g] else ("home", "away")
+        index = {outcome: H2H_OUTCOMES.index(outcome) for outcome in outcomes}
+        rows.append({
+            "gameId": game_id,
+            "homeTeam": batch.home_teams[g],
+            "awayTeam": batch.away_teams[g],
+            "commenceTime": batch.commence_times[g],
+            "bookmakers": books[g],
+            "best": {
+                outcome: {
+                    "price": _rounded(best_price[g][i], 3),
+                    "bookmaker": batch.bookmakers[best_bookmaker[g][i]] if best_bookmaker[g][i] >= 0 else None,
+                    "impliedProbability": _rounded(best_implied[g][i])
+                }
+                for outcome, i in index.items()
+            },
+            "consensus": {outcome: _rounded(consensus[g][i]) for outcome, i in index.items()},
+            "margin": {
+                "average": _rounded(average_margin[g]),
+                "lowest": _rounded(lowest_margin[g]),
+                "bestPriceOverround": _rounded(best_overround[g])
+            },
+            "arbitrage": bool(best_overround[g] < 1.0)
+        })
+    return rows
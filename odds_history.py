@@ -0,0 +1,444 @@
+"""
+Odds history store - price time series per match/market/bookmaker/outcome for
+line-movement queries (opening vs current, movement over the last hour)
+
+Every uvicorn worker records into its own copy; a save merges it with the
+file (under a lock file) so workers don't overwrite each other's series.
+
+Each series keeps only price changes, delta-encoded in typed arrays (seconds
+since the previous point, price change in 1/1000 ticks), with a checkpoint
+every CHECKPOINT_EVERY points so a price at any time is found by bisecting
+the checkpoints and decoding at most that many deltas.
+"""
+
+import base64
+import json
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    FCNTL_AVAILABLE = False
+
+from snapshot_diff import match_identity
+
+PRICE_SCALE = 1000  # decimal odds stored as integer ticks (1.905 -> 1905)
+CHECKPOINT_EVERY = 32
+# Series not seen for this long are dropped when the store is saved
+RETENTION_SECONDS = float(os.getenv("ODDS_HISTORY_RETENTION_DAYS", "14")) * 86400
+SAVE_INTERVAL = float(os.getenv("ODDS_HISTORY_SAVE_INTERVAL", "60"))
+
+# Outcome fields of the soccerapi scrape rows, per market
+SOCCERAPI_MARKETS = {
+    "1x2": (("home", "odds_1"), ("draw", "odds_x"), ("away", "odds_2")),
+    "ou_4_5": (("over", "over_4_5"), ("under", "under_4_5")),
+}
+
+SeriesKey = Tuple[str, str, str, str]  # match, market, bookmaker, outcome
+
+
+def _ticks(price: float) -> int:
+    return int(round(float(price) * PRICE_SCALE))
+
+
+class PriceSeries:
+    """One outcome's price over time for one bookmaker, change points only"""
+
+    __slots__ = ("first_time", "first_ticks", "last_time", "last_ticks", "last_seen",
+                 "dt", "dp", "checkpoints")
+
+    def __init__(self, timestamp: int, ticks: int):
+        self.first_time = self.last_time = self.last_seen = timestamp
+        self.first_ticks = self.last_ticks = ticks
+        self.dt = array("I")  # seconds since the previous point
+        self.dp = array("i")  # tick change since the previous point
+        # (time, ticks, points before it) for point 0, CHECKPOINT_EVERY, 2 * CHECKPOINT_EVERY, ...
+        self.checkpoints: List[Tuple[int, int, int]] = [(timestamp, ticks, 0)]
+
+    def __len__(self) -> int:
+        return len(self.dt) + 1
+
+    def append(self, timestamp: int, ticks: int) -> bool:
+        """Add a snapshot; only a price change (at a later second) becomes a point"""
+        self.last_seen = max(self.last_seen, timestamp)
+        if ticks == self.last_ticks or timestamp <= self.last_time:
+            return False
+        self.dt.append(timestamp - self.last_time)
+        self.dp.append(ticks - self.last_ticks)
+        self.last_time, self.last_ticks = timestamp, ticks
+        if len(self.dt) % CHECKPOINT_EVERY == 0:
+            self.checkpoints.append((timestamp, ticks, len(self.dt)))
+        return True
+
+    def ticks_at(self, timestamp: float) -> Optional[int]:
+        """Price in force at `timestamp` (None before the series started)"""
+        if timestamp < self.first_time:
+            return None
+        if timestamp >= self.last_time:
+            return self.last_ticks
+        i = bisect_right(self.checkpoints, (timestamp, float("inf"), 0)) - 1
+        t, ticks, index = self.checkpoints[i]
+        for dt, dp in zip(self.dt[index:index + CHECKPOINT_EVERY], self.dp[index:index + CHECKPOINT_EVERY]):
+            if t + dt > timestamp:
+                break
+            t += dt
+            ticks += dp
+        return ticks
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Decoded (unix seconds, decimal prices) of every change point"""
+        times = np.empty(len(self), dtype=np.int64)
+        ticks = np.empty(len(self), dtype=np.int64)
+        times[0], ticks[0] = self.first_time, self.first_ticks
+        np.cumsum(np.frombuffer(self.dt, dtype=np.uint32), dtype=np.int64, out=times[1:])
+        np.cumsum(np.frombuffer(self.dp, dtype=np.int32), dtype=np.int64, out=ticks[1:])
+        times[1:] += self.first_time
+        ticks[1:] += self.first_ticks
+        return times, ticks / PRICE_SCALE
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "t0": self.first_time,
+            "p0": self.first_ticks,
+            "seen": self.last_seen,
+            "dt": base64.b64encode(self.dt.tobytes()).decode("ascii"),
+            "dp": base64.b64encode(self.dp.tobytes()).decode("ascii")
+        }
+
+    def points(self) -> Iterator[Tuple[int, int]]:
+        """(unix seconds, ticks) of every change point"""
+        t, ticks = self.first_time, self.first_ticks
+        yield t, ticks
+        for step, change in zip(self.dt, self.dp):
+            t += step
+            ticks += change
+            yield t, ticks
+
+    @classmethod
+    def merged(cls, a: "PriceSeries", b: "PriceSeries") -> "PriceSeries":
+        """One series from two workers' copies: the change points of both, in time order"""
+        points = sorted(set(a.points()) | set(b.points()))
+        series = cls(*points[0])
+        for t, ticks in points[1:]:
+            series.append(t, ticks)
+        series.last_seen = max(a.last_seen, b.last_seen)
+        return series
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "PriceSeries":
+        series = cls(int(data["t0"]), int(data["p0"]))
+        dt, dp = array("I"), array("i")
+        dt.frombytes(base64.b64decode(data["dt"]))
+        dp.frombytes(base64.b64decode(data["dp"]))
+        t, ticks = series.first_time, series.first_ticks
+        for step, change in zip(dt, dp):
+            t += step
+            ticks += change
+            series.append(t, ticks)
+        series.last_seen = max(series.last_time, int(data.get("seen", series.last_time)))
+        return series
+
+
+class OddsHistoryStore:
+    """
+    Price series indexed by match; matches carry their teams/league/kickoff for
+    listing. Persisted as one JSON document of base64-encoded delta arrays.
+    """
+
+    def __init__(self, path: Optional[str] = "shared/odds_history.json",
+                 save_interval: float = SAVE_INTERVAL, retention: float = RETENTION_SECONDS):
+        self.path = path
+        self.save_interval = save_interval
+        self.retention = retention
+        self.series: Dict[SeriesKey, PriceSeries] = {}
+        self.matches: Dict[str, Dict[str, Any]] = {}
+        self.by_match: Dict[str, List[SeriesKey]] = {}
+        self.snapshots = 0
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.time()
+        self._saving = False
+        self._save_lock = threading.Lock()  # one writer of the file at a time
+        if path:
+            self.load()
+
+    # ---------- recording ----------
+
+    def record(self, match: Dict[str, Any], market: str, bookmaker: str,
+               prices: Dict[str, Optional[float]], timestamp: Optional[float] = None) -> int:
+        """Snapshot one market's outcome prices for a match; returns the number of price changes stored"""
+        timestamp = int(timestamp if timestamp is not None else time.time())
+        match_key = match_identity(match)
+        kickoff = match.get("time") or match.get("commence_time") or match.get("game_time")
+        changed = 0
+        with self._lock:
+            if match_key not in self.matches:
+                self.matches[match_key] = {
+                    "home_team": match.get("home_team"),
+                    "away_team": match.get("away_team"),
+                    "league": match.get("league"),
+                    "kickoff": kickoff.isoformat() if hasattr(kickoff, "isoformat") else kickoff
+                }
+                self.by_match[match_key] = []
+            for outcome, price in prices.items():
+                if not price or price <= 1.0:
+                    continue
+                key = (match_key, market, bookmaker, outcome)
+                series = self.series.get(key)
+                if series is None:
+                    self.series[key] = PriceSeries(timestamp, _ticks(price))
+                    self.by_match[match_key].append(key)
+                    changed += 1
+                elif series.append(timestamp, _ticks(price)):
+                    changed += 1
+            self.snapshots += 1
+            self._dirty = self._dirty or changed > 0
+        self.save_if_due()
+        return changed
+
+    def record_soccerapi(self, rows: Iterable[Dict[str, Any]], bookmaker: str, league: Optional[str] = None,
+                         timestamp: Optional[float] = None) -> int:
+        """Record soccerapi scrape rows (1X2 and over/under 4.5 prices)"""
+        changed = 0
+        for row in rows:
+            kickoff = row.get("time")
+            match = {
+                **row,
+                "league": row.get("league") or league,
+                # soccerapi gives the kickoff in "time"; its date keeps rematches apart
+                "game_time": kickoff.isoformat() if hasattr(kickoff, "isoformat") else kickoff
+            }
+            for market, outcomes in SOCCERAPI_MARKETS.items():
+                prices = {outcome: row.get(field) for outcome, field in outcomes}
+                if any(prices.values()):
+                    changed += self.record(match, market, bookmaker, prices, timestamp)
+        return changed
+
+    def record_batch(self, batch: Any, league: Optional[str] = None, timestamp: Optional[float] = None) -> int:
+        """Record an OddsBatch (The Odds API): h2h prices per game and bookmaker"""
+        changed = 0
+        prices = np.where(np.isnan(batch.prices), 0.0, batch.prices).tolist()
+        for g, game_id in enumerate(batch.game_ids):
+            match = {
+                "home_team": batch.home_teams[g],
+                "away_team": batch.away_teams[g],
+                "league": league,
+                "commence_time": batch.commence_times[g],
+                "game_time": batch.commence_times[g]  # kickoff date keeps rematches apart
+            }
+            for b, bookmaker in enumerate(batch.bookmakers):
+                home, draw, away = prices[g][b]
+                if home or away:
+                    changed += self.record(match, "h2h", bookmaker, {"home": home, "draw": draw, "away": away},
+                                           timestamp)
+        return changed
+
+    # ---------- queries ----------
+
+    def _keys(self, match_key: Optional[str] = None, market: Optional[str] = None,
+              bookmaker: Optional[str] = None) -> List[SeriesKey]:
+        keys = self.by_match.get(match_key, []) if match_key is not None else list(self.series)
+        return [
+            key for key in keys
+            if (market is None or key[1] == market) and (bookmaker is None or key[2] == bookmaker)
+        ]
+
+    def movement(self, match_key: Optional[str] = None, market: Optional[str] = None,
+                 bookmaker: Optional[str] = None, window: Optional[float] = None,
+                 now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Opening vs current price per series, and with `window` (seconds) the
+        price that long ago and the move since
+        """
+        now = now if now is not None else time.time()
+        rows = []
+        with self._lock:
+            for key in self._keys(match_key, market, bookmaker):
+                series = self.series[key]
+                row = {
+                    "match": key[0],
+                    "market": key[1],
+                    "bookmaker": key[2],
+                    "outcome": key[3],
+                    "opening": series.first_ticks / PRICE_SCALE,
+                    "current": series.last_ticks / PRICE_SCALE,
+                    "change": (series.last_ticks - series.first_ticks) / PRICE_SCALE,
+                    "change_pct": round((series.last_ticks / series.first_ticks - 1) * 100, 2),
+                    "points": len(series),
+                    "first_seen": series.first_time,
+                    "last_change": series.last_time,
+                    "last_seen": series.last_seen
+                }
+                if window is not None:
+                    then = series.ticks_at(now - window)
+                    # Series younger than the window move from their opening price
+                    then = series.first_ticks if then is None else then
+                    row["window_seconds"] = window
+                    row["price_then"] = then / PRICE_SCALE
+                    row["window_change"] = (series.last_ticks - then) / PRICE_SCALE
+                    row["window_change_pct"] = round((series.last_ticks / then - 1) * 100, 2)
+                rows.append(row)
+        return rows
+
+    def movers(self, window: float = 3600, min_change_pct: float = 0.0, limit: int = 50,
+               market: Optional[str] = None, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Largest price moves (either direction) over the last `window` seconds across all matches"""
+        rows = [
+            row for row in self.movement(market=market, window=window, now=now)
+            if row["window_change"] != 0 and abs(row["window_change_pct"]) >= min_change_pct
+        ]
+        rows.sort(key=lambda row: abs(row["window_change_pct"]), reverse=True)
+        for row in rows[:limit]:
+            row.update(self.matches.get(row["match"], {}))
+        return rows[:limit]
+
+    def history(self, match_key: str, market: Optional[str] = None,
+                bookmaker: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every change point of a match's series as (unix time, price) pairs"""
+        with self._lock:
+            keys = self._keys(match_key, market, bookmaker)
+            decoded = [(key, self.series[key].arrays()) for key in keys]
+        return [
+            {
+                "market": key[1],
+                "bookmaker": key[2],
+                "outcome": key[3],
+                "points": [[int(t), float(p)] for t, p in zip(times, prices)]
+            }
+            for key, (times, prices) in decoded
+        ]
+
+    def find_matches(self, team: Optional[str] = None) -> List[Dict[str, Any]]:
+        needle = (team or "").lower()
+        with self._lock:
+            return [
+                {"match": key, **meta, "series": len(self.by_match.get(key, []))}
+                for key, meta in self.matches.items()
+                if not needle or needle in key
+            ]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            points = sum(len(series) for series in self.series.values())
+            encoded = sum(series.dt.itemsize * len(series.dt) + series.dp.itemsize * len(series.dp)
+                          for series in self.series.values())
+            return {
+                "matches": len(self.matches),
+                "series": len(self.series),
+                "points": points,
+                "snapshots": self.snapshots,
+                "delta_bytes": encoded,
+                "path": self.path
+            }
+
+    # ---------- persistence ----------
+
+    def _prune(self, now: float) -> None:
+        stale = [key for key, series in self.series.items() if now - series.last_seen > self.retention]
+        for key in stale:
+            del self.series[key]
+            self.by_match[key[0]].remove(key)
+        for match_key in [k for k, keys in self.by_match.items() if not keys]:
+            del self.by_match[match_key]
+            self.matches.pop(match_key, None)
+
+    def _read(self) -> Tuple[Dict[str, Dict[str, Any]], Dict[SeriesKey, PriceSeries]]:
+        """Matches and series as last saved to the file (by any worker)"""
+        if not os.path.exists(self.path):
+            return {}, {}
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        series = {tuple(entry["key"]): PriceSeries.from_dict(entry) for entry in data.get("series", [])}
+        return data.get("matches", {}), series
+
+    def _merge(self, matches: Dict[str, Dict[str, Any]], series: Dict[SeriesKey, PriceSeries]) -> None:
+        """Fold series recorded elsewhere into this store (call with _lock held)"""
+        for key, other in series.items():
+            mine = self.series.get(key)
+            if mine is None:
+                self.series[key] = other
+                self.by_match.setdefault(key[0], []).append(key)
+            elif set(other.points()) <= set(mine.points()):
+                mine.last_seen = max(mine.last_seen, other.last_seen)  # e.g. this worker's own last save
+            else:
+                self.series[key] = PriceSeries.merged(mine, other)
+            if not self.matches.get(key[0]):
+                self.matches[key[0]] = matches.get(key[0], {})
+
+    def load(self) -> None:
+        if not self.path:
+            return
+        try:
+            matches, series = self._read()
+            with self._lock:
+                self._merge(matches, series)
+            if series:
+                print(f"✅ Loaded odds history: {len(self.series)} series for {len(self.matches)} matches")
+        except Exception as e:
+            print(f"⚠️ Could not load odds history from {self.path}: {e}")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._save_lock:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(f"{self.path}.lock", "a") as lock_file:
+                    # Other workers save the same file: read-merge-replace one at a time
+                    if FCNTL_AVAILABLE:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX)
+                    self._save()
+            except Exception as e:
+                self._dirty = True
+                print(f"⚠️ Could not save odds history: {e}")
+
+    def _save(self) -> None:
+        try:
+            matches, series = self._read()
+        except Exception as e:
+            print(f"⚠️ Could not merge saved odds history from {self.path}: {e}")
+            matches, series = {}, {}
+        with self._lock:
+            self._merge(matches, series)
+            self._prune(time.time())
+            data = {
+                "matches": dict(self.matches),
+                "series": [{"key": list(key), **series.to_dict()} for key, series in self.series.items()],
+                "updated": time.time()
+            }
+            self._dirty = False
+            self._last_save = time.time()
+        try:
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f, separators=(",", ":"), default=str)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            self._dirty = True  # keep it for the next save rather than lose it
+            print(f"⚠️ Could not save odds history: {e}")
+
+    def save_if_dirty(self) -> None:
+        if self._dirty:
+            self.save()
+
+    def save_if_due(self) -> None:
+        """Save in a background thread: record() runs on request paths, the dump is the whole store"""
+        with self._lock:
+            if not self._dirty or self._saving or time.time() - self._last_save < self.save_interval:
+                return
+            self._saving = True
+        threading.Thread(target=self._save_in_background, name="odds-history-save", daemon=True).start()
+
+    def _save_in_background(self) -> None:
+        try:
+            self.save()
+        finally:
+            self._saving = False
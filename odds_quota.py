@@ -0,0 +1,204 @@
+"""
+The Odds API quota budget - tracks remaining credits (shared by all workers)
+and turns them into a refresh interval per sport/market request, shortest
+for games about to kick off, so the monthly quota lasts until it resets
+"""
+
+import math
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from cache_backend import SharedCache
+
+# Credits per month on the plan, and the UTC day of month the quota resets
+ODDS_API_MONTHLY_QUOTA = int(os.getenv("ODDS_API_MONTHLY_QUOTA", "500"))
+ODDS_API_RESET_DAY = int(os.getenv("ODDS_API_RESET_DAY", "1"))
+# Credits kept back for requests with nothing cached to fall back on
+ODDS_API_RESERVE = int(os.getenv("ODDS_API_RESERVE", "10"))
+
+# (seconds until the next kickoff, refresh interval): prices move most close to kickoff
+KICKOFF_TIERS = ((3600, 300), (6 * 3600, 900), (24 * 3600, 3600))
+IDLE_INTERVAL = 6 * 3600
+# A game this recently kicked off still counts as imminent (in-play prices)
+IN_PLAY_WINDOW = 3 * 3600
+
+QUOTA_KEY = "odds_api:quota"
+
+
+def request_cost(markets: Sequence[str], regions: Sequence[str], bookmakers: Sequence[str] = ()) -> int:
+    """Credits one /odds call costs: markets x regions (or x each 10 bookmakers when filtering by bookmaker)"""
+    groups = math.ceil(len(bookmakers) / 10) if bookmakers else len(regions)
+    return max(1, len(markets)) * max(1, groups)
+
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
+def next_kickoff_in(commence_times: Iterable[Optional[str]], now: Optional[float] = None) -> Optional[float]:
+    """Seconds until the soonest upcoming (or in-play) kickoff; None if nothing is scheduled"""
+    now = now if now is not None else time.time()
+    soonest = None
+    for value in commence_times:
+        kickoff = _parse_time(value)
+        if kickoff is None or kickoff < now - IN_PLAY_WINDOW:
+            continue
+        delta = max(0.0, kickoff - now)
+        soonest = delta if soonest is None else min(soonest, delta)
+    return soonest
+
+
+def slate_over_in(commence_times: Iterable[Optional[str]], now: Optional[float] = None) -> Optional[float]:
+    """Seconds until the last known game is past its in-play window (its odds become useless)"""
+    now = now if now is not None else time.time()
+    kickoffs = [k for k in (_parse_time(value) for value in commence_times) if k is not None]
+    return max(kickoffs) + IN_PLAY_WINDOW - now if kickoffs else None
+
+
+def base_interval(kickoff_in: Optional[float]) -> float:
+    """Refresh interval before budget pressure, from how close the next game is"""
+    if kickoff_in is None:
+        return KICKOFF_TIERS[-1][1]  # nothing known yet (first fetch): middle of the road
+    for within, interval in KICKOFF_TIERS:
+        if kickoff_in <= within:
+            return interval
+    return IDLE_INTERVAL
+
+
+class OddsQuotaBudget:
+    """
+    Spend rate vs. budget: every request key polled recently adds
+    cost / base interval credits per second of demand. When that exceeds
+    what the remaining credits allow until the reset, all intervals are
+    stretched by the same factor, so imminent games keep the shortest one.
+    """
+
+    def __init__(self, cache: SharedCache, monthly_quota: int = ODDS_API_MONTHLY_QUOTA,
+                 reset_day: int = ODDS_API_RESET_DAY, reserve: int = ODDS_API_RESERVE):
+        self.cache = cache
+        self.monthly_quota = monthly_quota
+        self.reset_day = reset_day
+        self.reserve = reserve
+        self.demand: Dict[str, Dict[str, float]] = {}
+        self.fetches = 0
+        self.cache_hits = 0
+        self.budget_skips = 0
+        self._lock = threading.Lock()
+
+    # ----- credits -----
+
+    def state(self) -> Dict[str, Any]:
+        return self.cache.get(QUOTA_KEY) or {}
+
+    def remaining(self) -> int:
+        remaining = self.state().get("remaining")
+        return int(remaining) if remaining is not None else self.monthly_quota
+
+    def update(self, headers: Any) -> None:
+        """Record the x-requests-* headers of an /odds response for every worker"""
+        try:
+            remaining = headers.get("x-requests-remaining")
+            used = headers.get("x-requests-used")
+            last = headers.get("x-requests-last")
+            state = {
+                "remaining": int(float(remaining)) if remaining is not None else None,
+                "used": int(float(used)) if used is not None else None,
+                "last_cost": int(float(last)) if last is not None else None,
+                "updated": time.time()
+            }
+        except (TypeError, ValueError):
+            return
+        if state["remaining"] is not None:
+            self.cache.set(QUOTA_KEY, state)
+            print(f"Odds API requests remaining: {state['remaining']}")
+
+    def seconds_until_reset(self, now: Optional[float] = None) -> float:
+        current = datetime.fromtimestamp(now if now is not None else time.time(), tz=timezone.utc)
+        day = min(self.reset_day, 28)
+        reset = current.replace(day=day, hour=0, minute=0, second=0, microsecond=0)
+        if reset <= current:
+            year, month = (current.year + 1, 1) if current.month == 12 else (current.year, current.month + 1)
+            reset = reset.replace(year=year, month=month)
+        return max(60.0, (reset - current).total_seconds())
+
+    def can_spend(self, cost: int, have_fallback: bool) -> bool:
+        """Requests with something cached to serve stop before the reserve; cold ones may use it"""
+        floor = self.reserve if have_fallback else 0
+        return self.remaining() - cost >= floor
+
+    # ----- refresh intervals -----
+
+    def _active_demand(self, now: float) -> float:
+        with self._lock:
+            for key in [k for k, d in self.demand.items() if now - d["seen"] > 2 * d["interval"]]:
+                del self.demand[key]
+            return sum(d["cost"] / d["interval"] for d in self.demand.values())
+
+    def pressure(self, now: Optional[float] = None) -> float:
+        """How much faster than the budget allows current polling would spend (>= 1)"""
+        now = now if now is not None else time.time()
+        allowed = max(0, self.remaining() - self.reserve) / self.seconds_until_reset(now)
+        demand = self._active_demand(now)
+        if demand <= 0:
+            return 1.0
+        if allowed <= 0:
+            return math.inf
+        return max(1.0, demand / allowed)
+
+    def refresh_interval(self, key: str, cost: int,
+                         commence_times: Optional[Iterable[Optional[str]]] = None) -> float:
+        """
+        Seconds a cached response for `key` stays fresh, given its games' kickoffs and the budget
+        (commence_times None: nothing fetched yet; empty or all finished: an idle sport)
+        """
+        now = time.time()
+        known = commence_times is not None
+        commence_times = list(commence_times or ())
+        kickoff_in = next_kickoff_in(commence_times, now)
+        if kickoff_in is None and known:
+            # Off-season, or the saved slate is over: nothing imminent to keep fresh
+            interval = IDLE_INTERVAL
+        else:
+            interval = base_interval(kickoff_in)
+        with self._lock:
+            self.demand[key] = {"cost": cost, "interval": interval, "seen": now}
+        ttl = min(interval * self.pressure(now), self.seconds_until_reset(now))
+        if kickoff_in is not None:
+            # Don't sleep through the next kickoff moving into a shorter tier
+            boundaries = [within for within, _ in KICKOFF_TIERS if within < kickoff_in]
+            if boundaries:
+                ttl = min(ttl, max(KICKOFF_TIERS[0][1], kickoff_in - max(boundaries)))
+            # Nor past the end of the slate: a refresh then picks up the next games
+            over_in = slate_over_in(commence_times, now)
+            if over_in is not None:
+                ttl = min(ttl, max(KICKOFF_TIERS[0][1], over_in))
+        return ttl
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        pressure = self.pressure(now)
+        with self._lock:
+            demand: List[Dict[str, Any]] = [
+                {"key": key, "cost": d["cost"], "base_interval": d["interval"]}
+                for key, d in self.demand.items()
+            ]
+        return {
+            **self.state(),
+            "monthly_quota": self.monthly_quota,
+            "reserve": self.reserve,
+            "seconds_until_reset": round(self.seconds_until_reset(now)),
+            "pressure": None if math.isinf(pressure) else round(pressure, 3),
+            "exhausted": math.isinf(pressure),
+            "fetches": self.fetches,
+            "cache_hits": self.cache_hits,
+            "budget_skips": self.budget_skips,
+            "demand": demand
+        }
@@ -0,0 +1,124 @@
+"""
+Limit/cursor pagination and fields= projection shared by list endpoints
+"""
+
+import base64
+import hashlib
+import json
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from fastapi import HTTPException
+
+from snapshot_diff import match_identity
+
+MAX_LIMIT = 1000
+
+
+class Cursor(NamedTuple):
+    """Where the next page starts, and the version of the list it was cut from"""
+    offset: int = 0
+    version: Optional[str] = None
+
+
+def list_version(items: List[Any]) -> str:
+    """
+    Short hash of which items are in the list and in what order: matches by
+    match_identity (a price or confidence update doesn't move them), other
+    items by their content
+    """
+    digest = hashlib.blake2b(digest_size=8)
+    for item in items:
+        if isinstance(item, dict) and "home_team" in item:
+            identity = match_identity(item)
+        else:
+            identity = json.dumps(item, sort_keys=True, default=str)
+        digest.update(identity.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def encode_cursor(offset: int, version: Optional[str] = None) -> str:
+    """Opaque, URL-safe cursor pointing at the next item to return"""
+    data: Dict[str, Any] = {"o": offset}
+    if version is not None:
+        data["v"] = version
+    raw = json.dumps(data, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Cursor:
+    """Decode a cursor from a previous page; raises 400 if it is malformed"""
+    if not cursor:
+        return Cursor()
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        offset = int(data["o"])
+        version = data.get("v")
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0 or not (version is None or isinstance(version, str)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return Cursor(offset, version)
+
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """Split "home_team,away_team,probabilities.home_win" into field paths"""
+    if not fields:
+        return None
+    paths = [f.strip() for f in fields.split(",") if f.strip()]
+    return paths or None
+
+
+def project(item: Any, paths: Optional[List[str]]) -> Any:
+    """
+    Keep only the requested fields of a dict; dotted paths select nested keys
+    Missing fields are omitted rather than returned as null
+    """
+    if not paths or not isinstance(item, dict):
+        return item
+    result: Dict[str, Any] = {}
+    for path in paths:
+        source: Any = item
+        parts = path.split(".")
+        for part in parts:
+            if not isinstance(source, dict) or part not in source:
+                break
+            source = source[part]
+        else:
+            target = result
+            for part in parts[:-1]:
+                target = target.setdefault(part, {})
+            target[parts[-1]] = source
+    return result
+
+
+def paginate(items: List[Any], limit: Optional[int] = None, cursor: Cursor = Cursor(),
+             fields: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Slice one page out of `items` and project its fields
+
+    Returns {"items": [...], "pagination": {...}}; with no limit the whole
+    list from the cursor is returned, so existing clients see no change.
+    Raises 409 when the list has changed since the cursor was issued (items
+    would be skipped or repeated): the client restarts without a cursor.
+    """
+    offset = cursor.offset
+    total = len(items)
+    end = total if limit is None else min(offset + limit, total)
+    version = list_version(items) if cursor.version is not None or end < total else None
+    if cursor.version is not None and cursor.version != version:
+        raise HTTPException(status_code=409, detail="List changed since the previous page; restart without a cursor")
+    paths = parse_fields(fields)
+    page = [project(item, paths) for item in items[offset:end]]
+    return {
+        "items": page,
+        "pagination": {
+            "limit": limit,
+            "total": total,
+            "returned": len(page),
+            "has_more": end < total,
+            "next_cursor": encode_cursor(end, version) if end < total else None,
+            "fields": paths
+        }
+    }
@@ -8,30 +8,38 @@ import re
 import json
 from typing import List, Dict, Any, Optional
 from datetime import datetime
+import importlib.util
 import os
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from contextlib import nullcontext
 
-try:
-    from soccerapi.api import Api888Sport, ApiBet365, ApiUnibet
-    SOCCERAPI_AVAILABLE = True
-except ImportError:
-    SOCCERAPI_AVAILABLE = False
-    print("⚠️ soccerapi not installed. Run: pip install soccerapi")
+from admission import Overloaded
+from snapshot_diff import SnapshotTracker
+from cache_backend import SharedCache, get_shared_cache
+from metrics import (RESULTS_RECORDS, RESULTS_WRITE_ERRORS, http_get, observe_inference,
+                     observe_write, track_scrape)
 
-try:
-    from pymongo import MongoClient
-    MONGODB_AVAILABLE = True
-except ImportError:
-    MONGODB_AVAILABLE = False
-    print("⚠️ pymongo not installed. Run: pip install pymongo")
+# soccerapi and pymongo are heavy imports: only check they are installed here
+# and import them on first use, so they stay off the cold start path
+SOCCERAPI_AVAILABLE = importlib.util.find_spec("soccerapi") is not None
+MONGODB_AVAILABLE = importlib.util.find_spec("pymongo") is not None
 
+_soccerapi_warned = False
 
-# Global cache for predictions to maintain consistency on failures
-_PREDICTION_CACHE = {
-    "last_successful": None,
-    "timestamp": None,
-    "odds_cache": {},
-    "soccerapi_cache": {}
-}
+
+def _warn_soccerapi_missing() -> None:
+    global _soccerapi_warned
+    if not _soccerapi_warned:
+        _soccerapi_warned = True
+        print("⚠️ soccerapi not installed. Run: pip install soccerapi")
+
+
+# Seconds a soccerapi odds fetch is served from the shared cache before refetching
+SOCCERAPI_CACHE_TTL = float(os.getenv("SOCCERAPI_CACHE_TTL", "600"))
+# soccerapi calls run on these threads so a caller can give up waiting; at
+# most this many (hung ones included) are ever in flight per worker
+_SOCCERAPI_POOL = ThreadPoolExecutor(max_workers=int(os.getenv("SOCCERAPI_MAX_CALLS", "4")),
+                                     thread_name_prefix="soccerapi")
 
 
 class ResultsTemplate:
@@ -80,28 +88,93 @@ class ResultsTemplate:
         }
 
 
+    @staticmethod
+    def split_match(match: str) -> tuple:
+        """
+        Split a match label into (home_team, away_team)
+        Accepts the template "HOME - AWAY" as well as "HOME vs AWAY" / "HOME v AWAY"
+        """
+        parts = re.split(r'\s+(?:vs\.?|v|-)\s+', match.strip(), maxsplit=1, flags=re.IGNORECASE)
+        if len(parts) != 2:
+            return None, None
+        return parts[0].strip(), parts[1].strip()
+    
+    @staticmethod
+    def parse_score(result: str) -> Optional[tuple]:
+        """Parse a "2-1" / "2:1" score into (home_goals, away_goals)"""
+        score = re.fullmatch(r'(\d+)\s*[-:]\s*(\d+)', str(result or "").strip())
+        return (int(score.group(1)), int(score.group(2))) if score else None
+    
+    @staticmethod
+    def outcome_code(result: str, home_team: Optional[str] = None, away_team: Optional[str] = None) -> Optional[str]:
+        """
+        Normalize a logged outcome to "1", "X" or "2"
+        Understands scores ("2-1"), codes ("1", "X", "2"), "Home Win"/"Draw"/"Away Win"
+        and team-named results such as "Arsenal Win"
+        """
+        if not result:
+            return None
+        text = str(result).strip()
+        
+        score = ResultsTemplate.parse_score(text)
+        if score:
+            home_score, away_score = score
+            return "1" if home_score > away_score else ("X" if home_score == away_score else "2")
+        
+        normalized = text.lower().replace("_", " ")
+        if normalized in ("1", "home", "home win", "home_win"):
+            return "1"
+        if normalized in ("x", "draw", "tie"):
+            return "X"
+        if normalized in ("2", "away", "away win", "away_win"):
+            return "2"
+        
+        # "Bayern Win" for "Bayern Munich" - accept a leading-words match
+        winner = re.sub(r'\s+win$', '', normalized)
+        for team, code in ((home_team, "1"), (away_team, "2")):
+            name = team.lower().replace("_", " ") if team else ""
+            if name and (winner == name or name.startswith(winner + " ")):
+                return code
+        return None
+
+
 class ResultsLogger:
     """Logs all API outputs to MongoDB and JSON for training and consistency tracking"""
     
-    def __init__(self, storage_path: str = "shared/results_log.json", mongodb_uri: Optional[str] = None):
+    def __init__(self, storage_path: str = "shared/results_log.json", mongodb_uri: Optional[str] = None,
+                 connect: bool = True):
         self.storage_path = storage_path
         self.mongodb_uri = mongodb_uri or os.getenv("MONGODB_URI")
         self.mongo_client = None
         self.mongo_db = None
         self.results = self._load_results()
+        for collection in ("predictions", "odds", "matches", "accuracy"):
+            RESULTS_RECORDS.labels(collection).set_function(
+                lambda c=collection: len(self.results.get(c, []))
+            )
         
-        # Try to connect to MongoDB
-        if self.mongodb_uri and MONGODB_AVAILABLE:
-            self._connect_mongodb()
-        else:
+        # Try to connect to MongoDB (connect=False leaves it to the caller,
+        # e.g. a background thread, since ping + sync can take seconds)
+        if connect:
+            self.connect()
+    
+    def connect(self) -> None:
+        """Connect to MongoDB if configured and sync the JSON log into it; JSON-only otherwise"""
+        if not self.mongodb_uri:
             print("⚠️ MongoDB not configured. Using JSON storage only.")
+        elif not MONGODB_AVAILABLE:
+            print("⚠️ pymongo not installed. Run: pip install pymongo")
+        else:
+            self._connect_mongodb()
     
     def _connect_mongodb(self) -> None:
         """Connect to MongoDB Atlas"""
         try:
-            self.mongo_client = MongoClient(self.mongodb_uri, serverSelectionTimeoutMS=5000)
-            self.mongo_client.admin.command('ping')
-            self.mongo_db = self.mongo_client['magajico_sports']
+            from pymongo import MongoClient
+            client = MongoClient(self.mongodb_uri, serverSelectionTimeoutMS=5000)
+            client.admin.command('ping')
+            self.mongo_client = client
+            self.mongo_db = client['magajico_sports']
             print("✅ Connected to MongoDB Atlas successfully")
             self._sync_to_mongodb()
         except Exception as e:
@@ -118,7 +191,8 @@ class ResultsLogger:
             collections = ["predictions", "odds", "matches"]
             for collection_name in collections:
                 collection = self.mongo_db[collection_name]
-                items = self.results.get(collection_name, [])
+                # Copy: requests may append while a background sync runs
+                items = list(self.results.get(collection_name, []))
                 
                 for item in items:
                     # Insert if not already in MongoDB
@@ -157,6 +231,7 @@ class ResultsLogger:
             with open(self.storage_path, 'w') as f:
                 json.dump(self.results, f, indent=2, default=str)
         except Exception as e:
+            RESULTS_WRITE_ERRORS.labels("json").inc()
             print(f"Failed to save JSON results: {e}")
         
         # Also save to MongoDB
@@ -180,12 +255,14 @@ class ResultsLogger:
         }
         self.results["predictions"].append(log_entry)
         self.results["metadata"]["total_logs"] += 1
-        self.save_results()
+        with observe_write("prediction", "json"):
+            self.save_results()
         
         # Save to MongoDB
         if self.mongo_db is not None:
             try:
-                self.mongo_db['predictions'].insert_one(log_entry)
+                with observe_write("prediction", "mongodb"):
+                    self.mongo_db['predictions'].insert_one(log_entry)
             except Exception as e:
                 print(f"Failed to save prediction to MongoDB: {e}")
     
@@ -199,12 +276,14 @@ class ResultsLogger:
         }
         self.results["odds"].append(log_entry)
         self.results["metadata"]["total_logs"] += 1
-        self.save_results()
+        with observe_write("odds", "json"):
+            self.save_results()
         
         # Save to MongoDB
         if self.mongo_db is not None:
             try:
-                self.mongo_db['odds'].insert_one(log_entry)
+                with observe_write("odds", "mongodb"):
+                    self.mongo_db['odds'].insert_one(log_entry)
             except Exception as e:
                 print(f"Failed to save odds to MongoDB: {e}")
     
@@ -217,12 +296,14 @@ class ResultsLogger:
         }
         self.results["matches"].append(log_entry)
         self.results["metadata"]["total_logs"] += 1
-        self.save_results()
+        with observe_write("match", "json"):
+            self.save_results()
         
         # Save to MongoDB
         if self.mongo_db is not None:
             try:
-                self.mongo_db['matches'].insert_one(log_entry)
+                with observe_write("match", "mongodb"):
+                    self.mongo_db['matches'].insert_one(log_entry)
             except Exception as e:
                 print(f"Failed to save match to MongoDB: {e}")
     
@@ -245,12 +326,14 @@ class ResultsLogger:
         if "total_accuracy_records" not in self.results["metadata"]:
             self.results["metadata"]["total_accuracy_records"] = 0
         self.results["metadata"]["total_accuracy_records"] += 1
-        self.save_results()
+        with observe_write("accuracy", "json"):
+            self.save_results()
         
         # Save to MongoDB
         if self.mongo_db is not None:
             try:
-                self.mongo_db['accuracy'].insert_one(accuracy_entry)
+                with observe_write("accuracy", "mongodb"):
+                    self.mongo_db['accuracy'].insert_one(accuracy_entry)
             except Exception as e:
                 print(f"Failed to save accuracy record to MongoDB: {e}")
     
@@ -278,6 +361,19 @@ class ResultsLogger:
             "recent_records": sorted(accuracy_records, key=lambda x: x.get("timestamp", ""), reverse=True)[:20]
         }
     
+    def get_accuracy_records(self, limit: int = 10000) -> List[Dict[str, Any]]:
+        """Get logged actual-result records (labelled outcomes) from MongoDB or JSON"""
+        if self.mongo_db is not None:
+            try:
+                records = list(self.mongo_db['accuracy'].find().sort("timestamp", -1).limit(limit))
+                for record in records:
+                    record.pop("_id", None)
+                return records
+            except Exception as e:
+                print(f"Failed to get accuracy records from MongoDB: {e}")
+        
+        return sorted(self.results.get("accuracy", []), key=lambda x: x.get("timestamp", ""), reverse=True)[:limit]
+    
     def get_recent(self, count: int = 100, log_type: Optional[str] = None) -> List[Dict[str, Any]]:
         """Get recent logged results from MongoDB (preferred) or JSON fallback"""
         if self.mongo_db is not None and log_type:
@@ -359,6 +455,7 @@ class LiveMatch:
         self.prediction = kwargs.get('prediction', 'TBD')
         self.confidence = kwargs.get('confidence', 0)
         self.result = kwargs.get('result', None)
+        self.model_version = kwargs.get('model_version', None)
 
     def to_dict(self) -> Dict[str, Any]:
         return {
@@ -372,17 +469,39 @@ class LiveMatch:
             "source": self.source,
             "prediction": self.prediction,
             "confidence": self.confidence,
+            "model_version": self.model_version,
             "result": self.result
         }
 
 
 class RealSportsScraperService:
-    def __init__(self, ml_predictor=None):
+    def __init__(self, ml_predictor=None, feature_store=None, cache: Optional[SharedCache] = None,
+                 odds_history=None, admission=None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         }
         self.ml_predictor = ml_predictor
+        self.feature_store = feature_store
+        # Shared by all workers on the host, so odds are fetched once, not once per worker
+        self.cache = cache or get_shared_cache()
+        # Price history of every fetched odds row, recorded before any caller's odds filter
+        self.odds_history = odds_history
+        # Upstream slots (AdmissionController), taken only around actual fetches, not cache hits
+        self.admission = admission
+        # Previous scrape per source, so each scrape also yields what changed
+        self.snapshots = SnapshotTracker()
+        self.last_changes: Dict[str, Dict[str, Any]] = {}
+    
+    def _record_snapshot(self, source: str, matches: List[Any]) -> Dict[str, Any]:
+        """Diff a fresh scrape against the source's previous one"""
+        result = self.snapshots.update(source, matches)
+        self.last_changes[source] = result
+        if result["changed"]:
+            print(f"🔄 {source}: +{result['added']} ~{result['updated']} -{result['removed']} "
+                  f"({result['unchanged']} unchanged)")
+        return result
     
+    @track_scrape("flashscore")
     def scrape_flashscore_soccer(self) -> List[LiveMatch]:
         """
         Scrape live soccer matches from FlashScore mobile
@@ -391,7 +510,7 @@ class RealSportsScraperService:
         
         try:
             url = "https://www.flashscore.mobi/"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = http_get(url, headers=self.headers, timeout=10)
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # Find all match elements
@@ -439,12 +558,6 @@ class RealSportsScraperService:
                         source="FlashScore"
                     )
                     
-                    # Add ML prediction
-                    if self.ml_predictor:
-                        pred = self._generate_ml_prediction(match)
-                        match.prediction = pred['prediction']
-                        match.confidence = pred['confidence']
-                    
                     matches.append(match)
                     
                 except Exception as e:
@@ -454,9 +567,13 @@ class RealSportsScraperService:
         except Exception as e:
             print(f"FlashScore mobile scraping error: {e}")
             return []
-            
+        
+        # Score all parsed matches in one batched ML call
+        self._attach_ml_predictions(matches)
+        self._record_snapshot("flashscore", matches)
         return matches
     
+    @track_scrape("espn")
     def scrape_espn_scores(self, sport: str = "soccer") -> List[LiveMatch]:
         """
         Scrape ESPN scores (more reliable than FlashScore)
@@ -471,7 +588,7 @@ class RealSportsScraperService:
         url = sport_urls.get(sport.lower(), sport_urls["soccer"])
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = http_get(url, headers=self.headers, timeout=10)
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # ESPN uses a JSON data structure embedded in the page
@@ -488,9 +605,11 @@ class RealSportsScraperService:
         except Exception as e:
             print(f"ESPN scraping error: {e}")
             return []
-            
+        
+        self._record_snapshot(f"espn_{sport.lower()}", matches)
         return matches
 
+    @track_scrape("api_football")
     def fetch_api_football_data(self, api_key: str) -> List[LiveMatch]:
         """
         Fetch data from API-Football (rapidapi.com/api-sports)
@@ -508,7 +627,7 @@ class RealSportsScraperService:
                 "X-RapidAPI-Host": "api-football-v1.p.rapidapi.com"
             }
             
-            response = requests.get(url, headers=headers, params=params, timeout=10)
+            response = http_get(url, headers=headers, params=params, timeout=10)
             data = response.json()
             
             if data.get("response"):
@@ -532,12 +651,6 @@ class RealSportsScraperService:
                             source="API-Football"
                         )
                         
-                        # Add ML prediction
-                        if self.ml_predictor:
-                            pred = self._generate_ml_prediction(match)
-                            match.prediction = pred['prediction']
-                            match.confidence = pred['confidence']
-                        
                         matches.append(match)
                     except:
                         continue
@@ -546,6 +659,9 @@ class RealSportsScraperService:
             print(f"API-Football error: {e}")
             return []
         
+        # Score all parsed matches in one batched ML call
+        self._attach_ml_predictions(matches)
+        self._record_snapshot("api_football", matches)
         return matches
 
     def get_all_predictions(self, api_key: Optional[str] = None) -> List[Dict[str, Any]]:
@@ -565,6 +681,7 @@ class RealSportsScraperService:
                 "score": f"{match.home_score}-{match.away_score}",
                 "prediction": match.prediction,
                 "confidence": match.confidence,
+                "model_version": match.model_version,
                 "source": "ESPN"
             })
         
@@ -582,36 +699,81 @@ class RealSportsScraperService:
                     "score": f"{match.home_score}-{match.away_score}",
                     "prediction": match.prediction,
                     "confidence": match.confidence,
+                    "model_version": match.model_version,
                     "source": "API-Football"
                 })
         
         return all_predictions
 
     def _generate_ml_prediction(self, match: LiveMatch) -> Dict[str, Any]:
-        """Generate ML prediction for a match"""
-        if not self.ml_predictor:
-            return {"prediction": "TBD", "confidence": 0}
+        """Generate ML prediction for a single match"""
+        return self._generate_ml_predictions([match])[0]
+
+    def _generate_ml_predictions(self, matches: List[LiveMatch]) -> List[Dict[str, Any]]:
+        """
+        Generate ML predictions for a batch of matches
+        Builds one feature matrix and runs a single predict_proba call,
+        deriving the predicted class from the probabilities
+        """
+        fallback = [{"prediction": "TBD", "confidence": 0} for _ in matches]
+        if not self.ml_predictor or not matches:
+            return fallback
         
         try:
-            features = self._estimate_match_features(match)
-            prediction = self.ml_predictor.predict([features])[0]
-            probabilities = self.ml_predictor.predict_proba([features])[0]
+            # A model registry resolves to one pinned version for the whole batch
+            model = self.ml_predictor
+            if hasattr(model, "active"):
+                model = model.active()
+            if model is None:
+                return fallback
+            
+            features = [self._estimate_match_features(match) for match in matches]
+            with observe_inference("scraper_batch", len(features)):
+                probabilities = model.predict_proba(features)
+            classes = getattr(model, "classes_", None)
+            model_version = getattr(model, "version", None)
             
             prediction_map = {0: "Home Win", 1: "Draw", 2: "Away Win"}
             
-            return {
-                "prediction": prediction_map.get(prediction, "TBD"),
-                "confidence": int(max(probabilities) * 100)
-            }
+            results = []
+            for row in probabilities:
+                best = max(range(len(row)), key=lambda i: row[i])
+                label = classes[best] if classes is not None else best
+                results.append({
+                    "prediction": prediction_map.get(int(label), "TBD"),
+                    "confidence": int(max(row) * 100),
+                    "model_version": model_version
+                })
+            return results
         except:
-            return {"prediction": "TBD", "confidence": 0}
+            return fallback
+
+    def _attach_ml_predictions(self, matches: List[LiveMatch]) -> None:
+        """
+        Score parsed matches in one batch and attach predictions in place,
+        then fold any final scores into the team feature store
+        """
+        if self.ml_predictor and matches:
+            for match, pred in zip(matches, self._generate_ml_predictions(matches)):
+                match.prediction = pred['prediction']
+                match.confidence = pred['confidence']
+                match.model_version = pred.get('model_version')
+        
+        if self.feature_store is not None and matches:
+            try:
+                if self.feature_store.ingest_matches(matches):
+                    self.feature_store.save_if_dirty()
+            except Exception as e:
+                print(f"⚠️ Team feature update failed: {e}")
 
     def _estimate_match_features(self, match: LiveMatch) -> List[float]:
         """
         Estimate match features for ML prediction
-        Returns 7-dimensional feature vector
+        Returns 7-dimensional feature vector from precomputed team features
         """
-        # Placeholder values - in production, would use actual team stats
+        if self.feature_store is not None:
+            return self.feature_store.match_features(match.home_team, match.away_team)
+        # No feature store - neutral placeholder values
         return [0.65, 0.55, 0.65, 0.6, 0.58, 0.5, 0.9]
 
     def _parse_espn_json(self, data: Dict, sport: str) -> List[LiveMatch]:
@@ -644,17 +806,15 @@ class RealSportsScraperService:
                     source="ESPN"
                 )
                 
-                if self.ml_predictor:
-                    pred = self._generate_ml_prediction(match)
-                    match.prediction = pred['prediction']
-                    match.confidence = pred['confidence']
-                
                 matches.append(match)
         except Exception as e:
             print(f"Error parsing ESPN JSON: {e}")
         
+        # Score all parsed matches in one batched ML call
+        self._attach_ml_predictions(matches)
         return matches
 
+    @track_scrape("mybets")
     def scrape_mybets_today(self) -> List[Dict[str, Any]]:
         """
         Scrape predictions from MyBets.today/recommended-soccer-predictions/
@@ -665,7 +825,7 @@ class RealSportsScraperService:
         
         try:
             url = "https://www.mybets.today/recommended-soccer-predictions/"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = http_get(url, headers=self.headers, timeout=10)
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # Find all match events (class='event-fixtures')
@@ -725,8 +885,10 @@ class RealSportsScraperService:
             print(f"MyBets.today scraping error: {e}")
             return []
         
+        self._record_snapshot("mybets", predictions)
         return predictions
 
+    @track_scrape("statarea")
     def scrape_statarea(self) -> List[Dict[str, Any]]:
         """
         Scrape predictions from Statarea.com
@@ -745,7 +907,7 @@ class RealSportsScraperService:
         
         try:
             url = "https://www.statarea.com/predictions"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = http_get(url, headers=self.headers, timeout=10)
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # Extract current date from page - StatArea displays date in format like "2025-11-25"
@@ -882,6 +1044,7 @@ class RealSportsScraperService:
             return []
         
         print(f"StatArea: Successfully scraped {len(predictions)} predictions for {predictions[0].get('day_of_week', 'Today')}")
+        self._record_snapshot("statarea", predictions)
         return predictions
 
     def get_statarea_high_confidence(self, min_confidence: int = 78, predictions: Optional[List[Dict[str, Any]]] = None) -> List[Dict[str, Any]]:
@@ -908,6 +1071,7 @@ class RealSportsScraperService:
         print(f"StatArea High Confidence (>={min_confidence}%): {count} out of {total} predictions")
         return high_confidence
 
+    @track_scrape("scoreprediction")
     def scrape_scoreprediction(self) -> List[Dict[str, Any]]:
         """
         Scrape predictions from ScorePredictor.net (scorepredictor.net/index.php)
@@ -920,7 +1084,7 @@ class RealSportsScraperService:
         
         try:
             url = "https://scorepredictor.net/index.php"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = http_get(url, headers=self.headers, timeout=10)
             soup = BeautifulSoup(response.text, 'html.parser')
             
             # Parse page text to find day sections
@@ -1040,6 +1204,7 @@ class RealSportsScraperService:
         return predictions
 
 
+    @track_scrape("bet365")
     def scrape_bet365_odds(self) -> List[Dict[str, Any]]:
         """
         Scrape Bet365 soccer odds
@@ -1052,7 +1217,7 @@ class RealSportsScraperService:
             # Attempt to scrape Bet365 mobile site
             # Note: Bet365 frequently blocks scrapers, so fallback to sample
             url = "https://mobile.bet365.com/"
-            response = requests.get(url, headers=self.headers, timeout=10)
+            response = http_get(url, headers=self.headers, timeout=10)
             
             if response.status_code == 200:
                 soup = BeautifulSoup(response.text, 'html.parser')
@@ -1108,73 +1273,104 @@ class RealSportsScraperService:
         
         On failure, returns cached results to maintain consistency
         """
-        global _PREDICTION_CACHE
+        cache_key = f"soccerapi:{bookmaker}_{league}_{max_odds}"
+        last_good_key = f"{cache_key}:last_good"
         
-        cache_key = f"{bookmaker}_{league}_{max_odds}"
+        if not SOCCERAPI_AVAILABLE:
+            _warn_soccerapi_missing()
+            return self.cache.get(last_good_key) or []
         
-        # Check cache first - if available, return cached results
-        if cache_key in _PREDICTION_CACHE["soccerapi_cache"]:
-            return _PREDICTION_CACHE["soccerapi_cache"][cache_key]
+        def fetch() -> List[Dict[str, Any]]:
+            odds = self._fetch_soccerapi_odds(bookmaker, league, min_odds, max_odds, include_over_under, timeout)
+            if odds:
+                self.cache.set(last_good_key, odds)
+            return odds
         
-        if not SOCCERAPI_AVAILABLE:
-            return []
+        # One worker fetches, the rest wait for its result
+        try:
+            odds_data = self.cache.get_or_compute(cache_key, fetch, ttl=SOCCERAPI_CACHE_TTL)
+        except Overloaded:
+            # No upstream slot: the last good odds if there are any, else the 503
+            last_good = self.cache.get(last_good_key)
+            if last_good:
+                return last_good
+            raise
+        if odds_data:
+            return odds_data
+        # Nothing fresh: fall back to the last successful fetch
+        return self.cache.get(last_good_key) or []
+    
+    def _upstream_slot(self, source: str) -> Any:
+        """Admission slot for one upstream call (no limit without an AdmissionController)"""
+        return self.admission.hold(source) if self.admission is not None else nullcontext()
+    
+    @staticmethod
+    def _soccerapi_matches(bookmaker: str, league: str) -> Optional[List[Dict[str, Any]]]:
+        """The soccerapi call itself: raw matches for a league, None for an unsupported bookmaker"""
+        if bookmaker.lower() == "888sport":
+            from soccerapi.api import Api888Sport
+            api = Api888Sport()
+            league_urls = {
+                "premier_league": "https://www.888sport.com/#/filter/football/england/premier_league",
+                "la_liga": "https://www.888sport.com/#/filter/football/spain/la_liga",
+                "serie_a": "https://www.888sport.com/#/filter/football/italy/serie_a",
+                "bundesliga": "https://www.888sport.com/#/filter/football/germany/bundesliga",
+                "ligue_1": "https://www.888sport.com/#/filter/football/france/ligue_1",
+            }
+            url = league_urls.get(league, league_urls["premier_league"])
+            return api.odds(url)
         
+        elif bookmaker.lower() == "bet365":
+            from soccerapi.api import ApiBet365 as ApiBet365Class
+            api = ApiBet365Class()
+            country_league = {
+                "premier_league": ("england", "premier_league"),
+                "la_liga": ("spain", "la_liga"),
+                "serie_a": ("italy", "serie_a"),
+                "bundesliga": ("germany", "bundesliga"),
+                "ligue_1": ("france", "ligue_1"),
+            }
+            country, lg = country_league.get(league, ("england", "premier_league"))
+            return api.odds(country, lg)
+        
+        elif bookmaker.lower() == "unibet":
+            from soccerapi.api import ApiUnibet as ApiUnibetClass
+            api = ApiUnibetClass()
+            country_league = {
+                "premier_league": ("england", "premier_league"),
+                "la_liga": ("spain", "la_liga"),
+                "serie_a": ("italy", "serie_a"),
+                "bundesliga": ("germany", "bundesliga"),
+                "ligue_1": ("france", "ligue_1"),
+            }
+            country, lg = country_league.get(league, ("england", "premier_league"))
+            return api.odds(country, lg)
+        else:
+            return None
+    
+    @track_scrape("soccerapi")
+    def _fetch_soccerapi_odds(self, bookmaker: str, league: str, min_odds: float, max_odds: float,
+                              include_over_under: bool, timeout: int) -> List[Dict[str, Any]]:
+        """One soccerapi fetch; empty list on timeout or error"""
         odds_data = []
         
         try:
-            import signal
-            
-            def timeout_handler(signum, frame):
-                raise TimeoutError("soccerapi request timeout")
-            
-            # Set timeout
-            signal.signal(signal.SIGALRM, timeout_handler)
-            signal.alarm(timeout)
-            
             try:
-                # Select bookmaker API
-                api = None
-                if bookmaker.lower() == "888sport":
-                    api = Api888Sport()
-                    league_urls = {
-                        "premier_league": "https://www.888sport.com/#/filter/football/england/premier_league",
-                        "la_liga": "https://www.888sport.com/#/filter/football/spain/la_liga",
-                        "serie_a": "https://www.888sport.com/#/filter/football/italy/serie_a",
-                        "bundesliga": "https://www.888sport.com/#/filter/football/germany/bundesliga",
-                        "ligue_1": "https://www.888sport.com/#/filter/football/france/ligue_1",
-                    }
-                    url = league_urls.get(league, league_urls["premier_league"])
-                    matches = api.odds(url)
-                    
-                elif bookmaker.lower() == "bet365":
-                    from soccerapi.api import ApiBet365 as ApiBet365Class
-                    api = ApiBet365Class()
-                    country_league = {
-                        "premier_league": ("england", "premier_league"),
-                        "la_liga": ("spain", "la_liga"),
-                        "serie_a": ("italy", "serie_a"),
-                        "bundesliga": ("germany", "bundesliga"),
-                        "ligue_1": ("france", "ligue_1"),
-                    }
-                    country, lg = country_league.get(league, ("england", "premier_league"))
-                    matches = api.odds(country, lg)
-                    
-                elif bookmaker.lower() == "unibet":
-                    from soccerapi.api import ApiUnibet as ApiUnibetClass
-                    api = ApiUnibetClass()
-                    country_league = {
-                        "premier_league": ("england", "premier_league"),
-                        "la_liga": ("spain", "la_liga"),
-                        "serie_a": ("italy", "serie_a"),
-                        "bundesliga": ("germany", "bundesliga"),
-                        "ligue_1": ("france", "ligue_1"),
-                    }
-                    country, lg = country_league.get(league, ("england", "premier_league"))
-                    matches = api.odds(country, lg)
-                else:
-                    signal.alarm(0)
+                with self._upstream_slot(f"soccerapi.{bookmaker.lower()}"):
+                    # soccerapi sets no request timeout: stop waiting after `timeout`
+                    # (freeing the slot); a hung call only keeps its pool thread
+                    future = _SOCCERAPI_POOL.submit(self._soccerapi_matches, bookmaker, league)
+                    try:
+                        matches = future.result(timeout=timeout)
+                    except FuturesTimeoutError:
+                        future.cancel()
+                        raise TimeoutError("soccerapi request timeout")
+                if matches is None:
                     return []
                 
+                # Every priced match, before the odds-range filter, for the price history
+                priced = []
+                
                 # Process matches
                 for match in matches[:10]:  # Limit to 10 matches for speed
                     try:
@@ -1199,6 +1395,17 @@ class RealSportsScraperService:
                                 under_4_5 = over_under[key].get("under", 0) / 100
                                 break
                         
+                        priced.append({
+                            "home_team": home_team,
+                            "away_team": away_team,
+                            "time": time,
+                            "odds_1": odds_1,
+                            "odds_x": odds_x,
+                            "odds_2": odds_2,
+                            "over_4_5": over_4_5,
+                            "under_4_5": under_4_5
+                        })
+                        
                         # Filter by odds range
                         if odds_1 > 0 and min_odds <= odds_1 <= max_odds:
                             match_data = {
@@ -1221,30 +1428,18 @@ class RealSportsScraperService:
                     except:
                         continue
                 
-                signal.alarm(0)  # Cancel timeout
+                if self.odds_history is not None and priced:
+                    self.odds_history.record_soccerapi(priced, bookmaker=bookmaker.lower(), league=league.lower())
                 
             except TimeoutError:
                 print(f"Timeout fetching {bookmaker} odds")
-                signal.alarm(0)
-                # Use cache only
-                if cache_key in _PREDICTION_CACHE["soccerapi_cache"]:
-                    return _PREDICTION_CACHE["soccerapi_cache"][cache_key]
                 return []
             
-            # Cache successful results
-            if odds_data:
-                _PREDICTION_CACHE["soccerapi_cache"][cache_key] = odds_data
-                return odds_data
-            else:
-                # Use cache if no results
-                if cache_key in _PREDICTION_CACHE["soccerapi_cache"]:
-                    return _PREDICTION_CACHE["soccerapi_cache"][cache_key]
-                return []
+            return odds_data
                 
+        except Overloaded:
+            raise
         except Exception as e:
             print(f"soccerapi error ({bookmaker}): {e}")
-            # Return cached data only
-            if cache_key in _PREDICTION_CACHE["soccerapi_cache"]:
-                return _PREDICTION_CACHE["soccerapi_cache"][cache_key]
             return []
 
@@ -0,0 +1,309 @@
+"""
+Response cache middleware for read-heavy GET endpoints
+Per-route TTLs, strong ETags, If-None-Match -> 304 Not Modified, and
+compressed variants cached alongside each entry
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from compression import DEFAULT_LEVEL, DEFAULT_MIN_SIZE, add_vary, choose_encoding, compress, is_compressible
+
+# Seconds a rendered response is reused before the endpoint runs again
+DEFAULT_ROUTE_TTLS = {
+    "/api/predictions": 30.0,
+    "/api/soccer": 30.0,
+    "/api/live": 10.0,
+    "/api/ml/status": 5.0,
+    "/api/accuracy/stats": 60.0,
+}
+
+# Successful non-GET requests to these paths drop the listed cached routes
+DEFAULT_INVALIDATIONS = {
+    "/api/accuracy/log": ["/api/accuracy/stats"],
+    "/api/ml/reload": ["/api/ml/status"],
+}
+
+# Keys that change on every render without the data changing; left out of the ETag
+VOLATILE_KEYS = {"timestamp"}
+
+
+def parse_route_ttls(spec: Optional[str]) -> Dict[str, float]:
+    """Parse RESPONSE_CACHE_TTLS, e.g. "/api/live=5,/api/soccer=60" (0 disables a route)"""
+    ttls: Dict[str, float] = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        path, ttl = item.split("=", 1)
+        ttls[path.strip()] = float(ttl)
+    return ttls
+
+
+def _strip_volatile(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _strip_volatile(v) for k, v in value.items() if k not in VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_strip_volatile(v) for v in value]
+    return value
+
+
+def payload_etag(body: bytes) -> str:
+    """
+    Strong ETag for a JSON body, ignoring volatile keys such as "timestamp"
+
+    Two renders of the same data therefore share an ETag; the cache keeps
+    serving the first body for it, so the ETag always matches the bytes sent.
+    """
+    try:
+        canonical = json.dumps(_strip_volatile(json.loads(body)), sort_keys=True, separators=(",", ":")).encode()
+    except (ValueError, UnicodeDecodeError):
+        canonical = body
+    return '"' + hashlib.sha1(canonical).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: str, etag: str) -> bool:
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class CachedResponse:
+    """One rendered response: status, headers and body, plus its ETag and age"""
+
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, etag: str, ttl: float):
+        self.status = status
+        self.headers = headers
+        self.body = body
+        self.etag = etag
+        self.ttl = ttl
+        self.stored_at = time.monotonic()
+        self.compressible = is_compressible(headers)
+        self.variants: Dict[str, bytes] = {}  # encoding -> compressed body, built on first request
+
+    def variant(self, encoding: str, level: int) -> bytes:
+        body = self.variants.get(encoding)
+        if body is None:
+            body = self.variants[encoding] = compress(self.body, encoding, level)
+        return body
+
+    def variant_etag(self, encoding: Optional[str]) -> str:
+        # Each representation gets its own strong validator
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.stored_at
+
+    @property
+    def fresh(self) -> bool:
+        return self.age < self.ttl
+
+
+class ResponseCache:
+    """Bounded in-process store of rendered responses, keyed by path + query string"""
+
+    def __init__(self, max_entries: int = 512):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: CachedResponse) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._locks.pop(evicted, None)
+
+    def lock(self, key: str) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def invalidate(self, path: str) -> int:
+        """Drop every cached variant (any query string) of a route"""
+        keys = [k for k in self._entries if k == path or k.startswith(path + "?")]
+        for key in keys:
+            self._entries.pop(key, None)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+class ResponseCacheMiddleware:
+    """
+    ASGI middleware serving cached GET responses for configured routes
+
+    Within a route's TTL the endpoint is not called at all. Every response
+    carries a strong ETag; a request whose If-None-Match matches gets an empty
+    304, whether the entry was fresh or just re-rendered. Concurrent misses for
+    the same URL wait for one render instead of each running the endpoint.
+    Bodies of at least `minimum_size` bytes are served compressed when the
+    client accepts it; each encoding is compressed once per entry and reused.
+    """
+
+    def __init__(self, app: Any, route_ttls: Optional[Dict[str, float]] = None,
+                 invalidations: Optional[Dict[str, Iterable[str]]] = None,
+                 cache: Optional[ResponseCache] = None,
+                 minimum_size: int = DEFAULT_MIN_SIZE, level: int = DEFAULT_LEVEL):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.level = level
+        self.route_ttls = {path: ttl for path, ttl in (route_ttls or DEFAULT_ROUTE_TTLS).items() if ttl > 0}
+        self.invalidations = invalidations if invalidations is not None else DEFAULT_INVALIDATIONS
+        self.cache = cache or ResponseCache()
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        method = scope["method"]
+        if method not in ("GET", "HEAD") or path not in self.route_ttls:
+            if path in self.invalidations and method not in ("GET", "HEAD"):
+                await self._call_and_invalidate(scope, receive, send)
+            else:
+                await self.app(scope, receive, send)
+            return
+
+        query = scope.get("query_string", b"").decode("latin-1")
+        key = f"{path}?{query}" if query else path
+        if_none_match = self._header(scope, b"if-none-match")
+        encoding = choose_encoding(self._header(scope, b"accept-encoding"))
+
+        entry = self.cache.get(key)
+        if entry is not None and entry.fresh:
+            self.cache.hits += 1
+            await self._send_entry(send, entry, if_none_match, encoding, method, "HIT")
+            return
+
+        async with self.cache.lock(key):
+            # Another request may have rendered it while we waited
+            entry = self.cache.get(key)
+            if entry is not None and entry.fresh:
+                self.cache.hits += 1
+                await self._send_entry(send, entry, if_none_match, encoding, method, "HIT")
+                return
+
+            self.cache.misses += 1
+            status, headers, body = await self._render(scope, receive)
+            if status != 200:
+                await self._send_raw(send, status, headers, body, method)
+                return
+
+            etag = payload_etag(body)
+            if entry is not None and entry.etag == etag:
+                # Same data as before: keep the original bytes so the ETag stays exact
+                entry.stored_at = time.monotonic()
+                entry.ttl = self.route_ttls[path]
+            else:
+                entry = CachedResponse(status, headers, body, etag, self.route_ttls[path])
+                self.cache.put(key, entry)
+        await self._send_entry(send, entry, if_none_match, encoding, method, "MISS")
+
+    @staticmethod
+    def _header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+        for key, value in scope.get("headers", []):
+            if key == name:
+                return value.decode("latin-1")
+        return None
+
+    async def _render(self, scope: Dict[str, Any], receive: Any) -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+        """Run the endpoint with a GET and collect its full response"""
+        message_start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+
+        async def capture(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                message_start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+
+        # Render uncompressed; encoded variants are derived from the cached body
+        headers = [(k, v) for k, v in scope.get("headers", []) if k != b"accept-encoding"]
+        await self.app({**scope, "method": "GET", "headers": headers}, receive, capture)
+        headers = [
+            (k, v) for k, v in message_start.get("headers", [])
+            if k.lower() not in (b"content-length", b"etag", b"cache-control")
+        ]
+        return message_start.get("status", 500), headers, b"".join(chunks)
+
+    async def _send_entry(self, send: Any, entry: CachedResponse, if_none_match: Optional[str],
+                          encoding: Optional[str], method: str, cache_status: str) -> None:
+        if not entry.compressible or len(entry.body) < self.minimum_size:
+            encoding = None
+        etag = entry.variant_etag(encoding)
+        cache_headers = [
+            (b"etag", etag.encode()),
+            (b"cache-control", b"no-cache"),
+            (b"age", str(int(entry.age)).encode()),
+            (b"x-cache", cache_status.encode()),
+        ]
+        if entry.compressible:
+            cache_headers = add_vary(cache_headers)
+
+        # Either representation's validator proves the client holds the current data
+        if if_none_match and (_etag_matches(if_none_match, etag) or _etag_matches(if_none_match, entry.etag)):
+            self.cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304, "headers": cache_headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if encoding is None:
+            await self._send_raw(send, entry.status, entry.headers + cache_headers, entry.body, method)
+            return
+        body = entry.variant(encoding, self.level)
+        await self._send_raw(send, entry.status,
+                             entry.headers + cache_headers + [(b"content-encoding", encoding.encode())],
+                             body, method)
+
+    @staticmethod
+    async def _send_raw(send: Any, status: int, headers: List[Tuple[bytes, bytes]], body: bytes, method: str) -> None:
+        headers = [(k, v) for k, v in headers if k.lower() != b"content-length"]
+        headers.append((b"content-length", str(len(body)).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if method == "HEAD" else body})
+
+    async def _call_and_invalidate(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        status_holder: Dict[str, int] = {}
+
+        async def watch(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status_holder["status"] = message["status"]
+            await send(message)
+
+        await self.app(scope, receive, watch)
+        if 200 <= status_holder.get("status", 500) < 300:
+            for cached_path in self.invalidations[scope["path"]]:
+                self.cache.invalidate(cached_path)
+
+
+def route_ttls_from_env() -> Dict[str, float]:
+    """Default per-route TTLs, overridden by RESPONSE_CACHE_TTLS"""
+    return {**DEFAULT_ROUTE_TTLS, **parse_route_ttls(os.getenv("RESPONSE_CACHE_TTLS"))}
@@ -0,0 +1,170 @@
+"""
+Snapshot diff engine - compares successive scrapes per source by stable match identity
+Emits added / updated / removed events with field-level changes
+"""
+
+import re
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+# Fields that differ on every scrape without the match changing
+VOLATILE_FIELDS = {"timestamp", "scraped_at", "cached_at", "fetched_at"}
+
+_DATE_PREFIX = re.compile(r"^\d{4}-\d{2}-\d{2}")
+
+
+def _normalize(value: Any) -> str:
+    return " ".join(str(value or "").replace("_", " ").lower().split())
+
+
+def as_dict(match: Any) -> Dict[str, Any]:
+    """Scrapers return dicts or LiveMatch objects; diff both as dicts"""
+    if isinstance(match, dict):
+        return match
+    if hasattr(match, "to_dict"):
+        return match.to_dict()
+    return dict(vars(match))
+
+
+def match_identity(match: Any) -> str:
+    """
+    Stable key for a fixture across scrapes: home|away, plus the kickoff date
+    when the source gives a full ISO date (so a rematch is a different match)
+    """
+    data = as_dict(match)
+    key = f"{_normalize(data.get('home_team'))}|{_normalize(data.get('away_team'))}"
+    kickoff = str(data.get("game_time") or data.get("date") or "")
+    if _DATE_PREFIX.match(kickoff):
+        key += f"|{kickoff[:10]}"
+    return key
+
+
+def field_changes(old: Dict[str, Any], new: Dict[str, Any],
+                  ignore: Optional[set] = None) -> Dict[str, Dict[str, Any]]:
+    """{field: {"old": ..., "new": ...}} for every field whose value differs"""
+    ignore = VOLATILE_FIELDS if ignore is None else ignore
+    changes = {}
+    for field in old.keys() | new.keys():
+        if field in ignore:
+            continue
+        before, after = old.get(field), new.get(field)
+        if before != after:
+            changes[field] = {"old": before, "new": after}
+    return changes
+
+
+def diff_snapshots(previous: Dict[str, Dict[str, Any]], current: Dict[str, Dict[str, Any]],
+                   ignore: Optional[set] = None) -> List[Dict[str, Any]]:
+    """Events turning `previous` into `current` (both keyed by match identity)"""
+    events = []
+    for key, match in current.items():
+        before = previous.get(key)
+        if before is None:
+            events.append({"type": "added", "key": key, "match": match})
+            continue
+        changes = field_changes(before, match, ignore)
+        if changes:
+            events.append({"type": "updated", "key": key, "match": match, "changes": changes})
+    for key, match in previous.items():
+        if key not in current:
+            events.append({"type": "removed", "key": key, "match": match})
+    return events
+
+
+class SnapshotTracker:
+    """
+    Last snapshot per source, and the changes between successive snapshots
+
+    update() is called with each fresh scrape; it returns only what changed
+    and bumps the source's version when anything did, so downstream caches,
+    logs and push feeds can act on deltas. Recent events are kept in a
+    bounded log for clients that catch up by sequence number.
+    """
+
+    def __init__(self, ignore_fields: Optional[set] = None, event_log_size: int = 1000):
+        self.ignore_fields = VOLATILE_FIELDS if ignore_fields is None else ignore_fields
+        self._snapshots: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._versions: Dict[str, int] = {}
+        self._updated: Dict[str, str] = {}
+        self._events: deque = deque(maxlen=event_log_size)
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def update(self, source: str, matches: List[Any]) -> Dict[str, Any]:
+        """
+        Record a new scrape for `source` and return its diff against the last one
+
+        An empty scrape is treated as "no data" (failed or blocked source) rather
+        than every match being removed, and leaves the snapshot untouched.
+        """
+        current: Dict[str, Dict[str, Any]] = {}
+        for match in matches:
+            data = as_dict(match)
+            current[match_identity(data)] = data
+
+        with self._lock:
+            previous = self._snapshots.get(source, {})
+            if not current:
+                return self._result(source, [], len(previous), skipped=True)
+
+            events = diff_snapshots(previous, current, self.ignore_fields)
+            now = datetime.now().isoformat()
+            for event in events:
+                self._sequence += 1
+                event["seq"] = self._sequence
+                event["source"] = source
+                event["timestamp"] = now
+                self._events.append(event)
+
+            self._snapshots[source] = current
+            if events or source not in self._versions:
+                self._versions[source] = self._versions.get(source, 0) + 1
+                self._updated[source] = now
+            unchanged = len(current) - sum(1 for e in events if e["type"] != "removed")
+            return self._result(source, events, unchanged)
+
+    def _result(self, source: str, events: List[Dict[str, Any]], unchanged: int,
+                skipped: bool = False) -> Dict[str, Any]:
+        return {
+            "source": source,
+            "version": self._versions.get(source, 0),
+            "changed": bool(events),
+            "skipped": skipped,
+            "added": sum(1 for e in events if e["type"] == "added"),
+            "updated": sum(1 for e in events if e["type"] == "updated"),
+            "removed": sum(1 for e in events if e["type"] == "removed"),
+            "unchanged": unchanged,
+            "events": events
+        }
+
+    def snapshot(self, source: str) -> List[Dict[str, Any]]:
+        return list(self._snapshots.get(source, {}).values())
+
+    def version(self, source: str) -> int:
+        return self._versions.get(source, 0)
+
+    def events_since(self, seq: int = 0, source: Optional[str] = None,
+                     limit: int = 500) -> List[Dict[str, Any]]:
+        """Logged events after sequence number `seq`, oldest first"""
+        with self._lock:
+            events = [e for e in self._events if e["seq"] > seq and (source is None or e["source"] == source)]
+        return events[:limit]
+
+    @property
+    def sequence(self) -> int:
+        return self._sequence
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sequence": self._sequence,
+            "sources": {
+                source: {
+                    "version": self._versions.get(source, 0),
+                    "matches": len(snapshot),
+                    "updated": self._updated.get(source)
+                }
+                for source, snapshot in self._snapshots.items()
+            }
+        }
@@ -0,0 +1,382 @@
+"""
+Inference benchmark suite for MLPredictor and the /api/ml/predict path
+
+For each forest size a model is trained on synthetic data, published to a
+scratch registry, and measured for:
+  - load time (registry version with mmap'd forest, and the legacy pickle)
+  - single-row latency p50/p99 (MLPredictor.predict, sklearn, compiled forest)
+  - batched latency and rows/sec at several batch sizes
+  - the main.py prediction path (quantize + memo lookup + predict_proba),
+    with a cold and a warm prediction cache
+  - peak Python heap allocation (tracemalloc) while loading and scoring
+
+Results are written as JSON; pass --compare with an earlier results file to
+flag regressions between runs or model versions.
+
+Usage:
+    python src/ml/benchmark_inference.py --output benchmarks/inference.json
+    python src/ml/benchmark_inference.py --sizes 50,100 --compare benchmarks/inference.json
+    python src/ml/benchmark_inference.py --registry shared/models   # published versions
+"""
+import gc
+import json
+import os
+import pickle
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+try:
+    from ml_predictor import MLPredictor
+    from model_registry import ModelRegistry, publish_model
+    from prediction_cache import PredictionCache
+except ImportError:
+    from src.ml.ml_predictor import MLPredictor
+    from src.ml.model_registry import ModelRegistry, publish_model
+    from src.ml.prediction_cache import PredictionCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = [10, 50, 100, 200]
+DEFAULT_BATCH_SIZES = [1, 8, 64, 512, 4096]
+
+# Same sampling ranges the model is trained on, in feature order
+FEATURE_RANGES = np.array([
+    [0.3, 1.0],
+    [0.3, 1.0],
+    [0.5, 0.8],
+    [0.2, 1.0],
+    [0.2, 1.0],
+    [0.3, 0.7],
+    [0.4, 1.0],
+])
+
+# Lower-is-better metrics compared by --compare (dotted paths into a result)
+COMPARED_METRICS = [
+    "load.registry_ms",
+    "load.legacy_pickle_ms",
+    "single_row.predictor.p50_us",
+    "single_row.predictor.p99_us",
+    "single_row.compiled.p50_us",
+    "api_path.cold.p50_us",
+    "api_path.warm.p50_us",
+    "memory.load_peak_kb",
+    "memory.batch_peak_kb",
+]
+
+
+def _sample_features(n_samples: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.RandomState(seed)
+    return rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1], size=(n_samples, len(FEATURE_RANGES)))
+
+
+def _latency_stats(timings: List[float]) -> Dict[str, float]:
+    timings_us = np.asarray(timings) * 1e6
+    return {
+        "p50_us": round(float(np.percentile(timings_us, 50)), 1),
+        "p99_us": round(float(np.percentile(timings_us, 99)), 1),
+        "mean_us": round(float(timings_us.mean()), 1)
+    }
+
+
+def _time_calls(fn: Callable[[Any], Any], inputs: List[Any], warmup: int = 5) -> Dict[str, float]:
+    for item in inputs[:warmup]:
+        fn(item)
+    timings = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        timings.append(time.perf_counter() - start)
+    return _latency_stats(timings)
+
+
+def _peak_alloc_kb(fn: Callable[[], Any]) -> float:
+    """Peak traced Python heap allocation while running fn, in KiB"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def train_benchmark_model(n_estimators: int, max_depth: Optional[int] = 10,
+                          n_samples: int = 10000, seed: int = 42) -> Dict[str, Any]:
+    """Train a model_data dict of the given forest size, as train_model.py would"""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.preprocessing import StandardScaler
+    try:
+        from train_model import generate_training_data
+    except ImportError:
+        from src.ml.train_model import generate_training_data
+
+    X, y = generate_training_data(n_samples, seed=seed)
+    scaler = StandardScaler().fit(X)
+    model = RandomForestClassifier(n_estimators=n_estimators, max_depth=max_depth,
+                                   random_state=seed, n_jobs=-1).fit(scaler.transform(X), y)
+    return {
+        "model": model,
+        "scaler": scaler,
+        "accuracy": None,
+        "version": f"bench-{n_estimators}x{max_depth or 'full'}",
+        "trained_date": datetime.now().isoformat(timespec="seconds")
+    }
+
+
+def _api_path(model: Any, cache: PredictionCache) -> Callable[[np.ndarray], Any]:
+    """The /api/ml/predict inference steps from main.py, minus HTTP and logging"""
+    def run(features: np.ndarray) -> Any:
+        quantized = cache.quantize(features)
+        probabilities = cache.lookup(quantized, model.version)
+        if probabilities is None:
+            probabilities = model.predict_proba(np.array([quantized]))[0]
+            cache.store(quantized, model.version, probabilities)
+        return int(model.classes_[np.argmax(probabilities)])
+    return run
+
+
+def benchmark_registry_version(root: str, version: str, legacy_path: Optional[str] = None,
+                               repeat: int = 500, batch_sizes: Optional[List[int]] = None) -> Dict[str, Any]:
+    """Benchmark one published registry version"""
+    batch_sizes = batch_sizes or DEFAULT_BATCH_SIZES
+    registry = ModelRegistry(root=root)
+
+    # Load time: a fresh registry each time so nothing is reused
+    load_times = []
+    for _ in range(5):
+        start = time.perf_counter()
+        loaded = ModelRegistry(root=root).load_version(version)
+        load_times.append(time.perf_counter() - start)
+    load = {"registry_ms": round(float(np.median(load_times)) * 1e3, 2)}
+    load_peak = _peak_alloc_kb(lambda: registry.load_version(version))
+
+    if legacy_path and os.path.exists(legacy_path):
+        legacy_times = []
+        for _ in range(3):
+            start = time.perf_counter()
+            with open(legacy_path, "rb") as f:
+                pickle.load(f)
+            legacy_times.append(time.perf_counter() - start)
+        load["legacy_pickle_ms"] = round(float(np.median(legacy_times)) * 1e3, 2)
+
+    # MLPredictor pinned to this version
+    predictor = MLPredictor(model_path=legacy_path or "", registry_root=root)
+    predictor.registry._active = loaded
+    predictor.registry._last_check = float("inf")
+
+    X = _sample_features(max(repeat, max(batch_sizes)), seed=1)
+    X_scaled = loaded.scaler.transform(X) if loaded.scaler is not None else X
+    rows = [X[i] for i in range(repeat)]
+
+    single_row = {
+        "predictor": _time_calls(lambda row: predictor.predict(list(row)), rows),
+        "compiled": _time_calls(lambda row: loaded.predict_proba(row.reshape(1, -1)),
+                                [X_scaled[i] for i in range(repeat)])
+    }
+    sklearn_model = loaded.sklearn_model
+    if sklearn_model is not None:
+        n_jobs = sklearn_model.n_jobs
+        sklearn_model.n_jobs = 1
+        single_row["sklearn"] = _time_calls(
+            lambda row: sklearn_model.predict_proba(row.reshape(1, -1)),
+            [X_scaled[i] for i in range(min(repeat, 200))]
+        )
+
+    batches = []
+    for size in batch_sizes:
+        batch = [list(row) for row in X[:size]]
+        n_calls = max(3, min(200, 20000 // size))
+        stats = _time_calls(lambda b: predictor.predict_batch(b), [batch] * n_calls, warmup=2)
+        entry = {"batch_size": size, **stats,
+                 "rows_per_sec": round(size / (stats["p50_us"] / 1e6), 1)}
+        if sklearn_model is not None:
+            sk_stats = _time_calls(lambda b: sklearn_model.predict_proba(b),
+                                   [X_scaled[:size]] * min(n_calls, 20), warmup=1)
+            entry["sklearn_rows_per_sec"] = round(size / (sk_stats["p50_us"] / 1e6), 1)
+        batches.append(entry)
+    if sklearn_model is not None:
+        sklearn_model.n_jobs = n_jobs
+
+    # main.py path: every request distinct (cold) vs the same fixtures re-polled (warm)
+    cold_cache = PredictionCache(max_size=repeat * 2)
+    warm_cache = PredictionCache(max_size=repeat * 2)
+    hot_rows = rows[:20]
+    for row in hot_rows:
+        _api_path(loaded, warm_cache)(row)
+    api_path = {
+        "cold": _time_calls(_api_path(loaded, cold_cache), rows, warmup=0),
+        "warm": _time_calls(_api_path(loaded, warm_cache), hot_rows * (repeat // len(hot_rows)), warmup=0)
+    }
+
+    largest = [list(row) for row in X[:max(batch_sizes)]]
+    memory = {
+        "load_peak_kb": load_peak,
+        "batch_peak_kb": _peak_alloc_kb(lambda: predictor.predict_batch(largest)),
+        "batch_size": len(largest),
+        "forest_array_kb": round(sum(
+            a.nbytes for a in (loaded.forest.feature, loaded.forest.threshold, loaded.forest.children,
+                               loaded.forest.value, loaded.forest.roots)
+        ) / 1024, 1)
+    }
+
+    return {
+        "version": version,
+        "n_estimators": loaded.forest.n_estimators,
+        "n_nodes": loaded.forest.n_nodes,
+        "max_depth": loaded.forest.max_depth,
+        "load": load,
+        "single_row": single_row,
+        "batches": batches,
+        "api_path": api_path,
+        "memory": memory
+    }
+
+
+def run_suite(sizes: Optional[List[int]] = None, max_depth: Optional[int] = 10,
+              repeat: int = 500, batch_sizes: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """Train, publish and benchmark one model per forest size in a scratch registry"""
+    sizes = sizes or DEFAULT_SIZES
+    workdir = tempfile.mkdtemp(prefix="magajico-bench-")
+    results = []
+    try:
+        for n_estimators in sizes:
+            logger.info(f"🏋️ Training benchmark forest: {n_estimators} trees, max_depth={max_depth}")
+            model_data = train_benchmark_model(n_estimators, max_depth)
+            root = os.path.join(workdir, f"registry-{n_estimators}")
+            legacy_path = os.path.join(workdir, f"model_data-{n_estimators}.pkl")
+            with open(legacy_path, "wb") as f:
+                pickle.dump(model_data, f)
+            version = publish_model(model_data, root=root)
+
+            logger.info(f"⏱️ Benchmarking {version}")
+            results.append(benchmark_registry_version(root, version, legacy_path, repeat, batch_sizes))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def run_registry(root: str, versions: Optional[List[str]] = None, repeat: int = 500,
+                 batch_sizes: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+    """Benchmark already-published versions (default: all) of a model registry"""
+    registry = ModelRegistry(root=root)
+    versions = versions or registry.list_versions()
+    results = []
+    for version in versions:
+        logger.info(f"⏱️ Benchmarking {version}")
+        results.append(benchmark_registry_version(root, version, None, repeat, batch_sizes))
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    import sklearn
+    return {
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count()
+    }
+
+
+def _metric(result: Dict[str, Any], path: str) -> Optional[float]:
+    value: Any = result
+    for part in path.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return float(value)
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.2) -> List[Dict[str, Any]]:
+    """
+    Compare two result files, matching runs by forest size
+
+    Returns one row per metric with the current/baseline ratio; rows whose
+    ratio exceeds 1 + tolerance are marked as regressions.
+    """
+    baseline_by_size = {r["n_estimators"]: r for r in baseline.get("results", [])}
+    rows = []
+    for result in current.get("results", []):
+        previous = baseline_by_size.get(result["n_estimators"])
+        if previous is None:
+            continue
+        for path in COMPARED_METRICS:
+            old, new = _metric(previous, path), _metric(result, path)
+            if not old or new is None:
+                continue
+            ratio = new / old
+            rows.append({
+                "n_estimators": result["n_estimators"],
+                "metric": path,
+                "baseline": old,
+                "current": new,
+                "ratio": round(ratio, 3),
+                "regression": ratio > 1 + tolerance
+            })
+    return rows
+
+
+def _print_summary(results: List[Dict[str, Any]]) -> None:
+    print(f"\n{'trees':>6} {'nodes':>8} {'load ms':>8} {'1-row p50':>10} {'1-row p99':>10} "
+          f"{'api warm':>9} {'rows/s @max':>12}")
+    for r in results:
+        print(f"{r['n_estimators']:>6} {r['n_nodes']:>8} {r['load']['registry_ms']:>8} "
+              f"{r['single_row']['predictor']['p50_us']:>9}µ {r['single_row']['predictor']['p99_us']:>9}µ "
+              f"{r['api_path']['warm']['p50_us']:>8}µ {r['batches'][-1]['rows_per_sec']:>12}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Benchmark model inference latency, throughput, memory and load time")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated forest sizes (n_estimators) to train and benchmark")
+    parser.add_argument("--max-depth", type=int, default=10, help="max_depth for benchmark forests (0 = unlimited)")
+    parser.add_argument("--batch-sizes", default=",".join(map(str, DEFAULT_BATCH_SIZES)))
+    parser.add_argument("--repeat", type=int, default=500, help="Single-row calls to time")
+    parser.add_argument("--registry", help="Benchmark published versions in this registry instead of training")
+    parser.add_argument("--versions", help="Comma-separated registry versions (default: all)")
+    parser.add_argument("--output", default="benchmarks/inference.json", help="Where to write JSON results")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown ratio before flagging")
+    args = parser.parse_args()
+
+    batch_sizes = [int(s) for s in args.batch_sizes.split(",")]
+    if args.registry:
+        versions = args.versions.split(",") if args.versions else None
+        results = run_registry(args.registry, versions, args.repeat, batch_sizes)
+    else:
+        sizes = [int(s) for s in args.sizes.split(",")]
+        results = run_suite(sizes, args.max_depth or None, args.repeat, batch_sizes)
+
+    report = {"environment": environment(), "results": results}
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"✅ Benchmark results written to {args.output}")
+    _print_summary(results)
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.tolerance)
+        regressions = [row for row in rows if row["regression"]]
+        for row in rows:
+            flag = "❌" if row["regression"] else "✅"
+            print(f"{flag} {row['n_estimators']:>4} trees {row['metric']:<30} "
+                  f"{row['baseline']:>10} -> {row['current']:>10} (x{row['ratio']})")
+        if regressions:
+            logger.warning(f"⚠️ {len(regressions)} metric(s) regressed more than {args.tolerance:.0%}")
+            sys.exit(1)
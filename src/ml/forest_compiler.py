@@ -0,0 +1,237 @@
+"""Compiled flat-array evaluator for trained Random Forest models"""
+import json
+import os
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+ARRAY_NAMES = ["feature", "threshold", "children", "value", "roots", "classes"]
+META_FILE = "forest.json"
+
+
+class CompiledForest:
+    """
+    Random Forest flattened into contiguous NumPy node arrays
+
+    All trees share one set of node arrays; `roots` holds the index of each
+    tree's root node. Leaves point to themselves in `children`, so every row
+    can be walked for a fixed number of steps (the forest's max depth) with
+    vectorized gathers instead of per-tree Python or sklearn calls.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 value: np.ndarray, roots: np.ndarray, classes: np.ndarray,
+                 max_depth: int, n_features: int):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.value = value
+        self.roots = roots
+        self.classes_ = classes
+        self.max_depth = int(max_depth)
+        self.n_features_in_ = int(n_features)
+
+    @property
+    def n_estimators(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_sklearn(cls, model: Any) -> "CompiledForest":
+        """Compile a fitted sklearn RandomForestClassifier"""
+        features, thresholds, children, values, roots = [], [], [], [], []
+        offset = 0
+        max_depth = 0
+
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            n_nodes = tree.node_count
+            node_ids = np.arange(n_nodes, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+
+            left = np.where(is_leaf, node_ids, tree.children_left).astype(np.int32)
+            right = np.where(is_leaf, node_ids, tree.children_right).astype(np.int32)
+
+            # sklearn >= 1.4 stores class fractions in tree_.value and returns them
+            # unchanged; older releases store weighted counts and normalize them
+            leaf_value = tree.value[:, 0, :model.n_classes_].astype(np.float64)
+            normalizer = leaf_value.sum(axis=1)
+            if not np.allclose(normalizer, 1.0):
+                normalizer[normalizer == 0.0] = 1.0
+                leaf_value = leaf_value / normalizer[:, np.newaxis]
+
+            features.append(np.where(is_leaf, 0, tree.feature).astype(np.int32))
+            thresholds.append(np.where(is_leaf, 0.0, tree.threshold).astype(np.float64))
+            children.append(np.stack([left, right], axis=1) + offset)
+            values.append(leaf_value)
+            roots.append(offset)
+
+            offset += n_nodes
+            max_depth = max(max_depth, tree.max_depth)
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(features)),
+            threshold=np.ascontiguousarray(np.concatenate(thresholds)),
+            children=np.ascontiguousarray(np.concatenate(children)),
+            value=np.ascontiguousarray(np.concatenate(values)),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=np.asarray(model.classes_),
+            max_depth=max_depth,
+            n_features=model.n_features_in_
+        )
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """
+        Class probabilities for each row, identical to sklearn's predict_proba
+
+        Rows are cast to float32 exactly like sklearn's tree input validation,
+        and per-tree probabilities are summed in tree order before averaging.
+        """
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features_in_:
+            raise ValueError(f"Expected {self.n_features_in_} features, got {X.shape[1]}")
+
+        rows = np.arange(X.shape[0])[np.newaxis, :]
+        nodes = np.repeat(self.roots[:, np.newaxis], X.shape[0], axis=1)
+
+        for _ in range(self.max_depth):
+            go_right = X[rows, self.feature[nodes]] > self.threshold[nodes]
+            nodes = self.children[nodes, go_right.astype(np.intp)]
+
+        # Reducing over the leading (tree) axis adds one tree at a time in order,
+        # the same accumulation sklearn performs with n_jobs=1
+        proba = np.add.reduce(self.value[nodes], axis=0)
+        proba /= self.n_estimators
+        return proba
+
+    def predict(self, X: Any) -> np.ndarray:
+        """Predicted class for each row"""
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+    def save(self, directory: str) -> None:
+        """Write node arrays as individual .npy files plus a small JSON header"""
+        os.makedirs(directory, exist_ok=True)
+        for name in ARRAY_NAMES:
+            array = self.classes_ if name == "classes" else getattr(self, name)
+            np.save(os.path.join(directory, f"{name}.npy"), array)
+
+        with open(os.path.join(directory, META_FILE), "w") as f:
+            json.dump({
+                "max_depth": self.max_depth,
+                "n_features": self.n_features_in_,
+                "n_estimators": self.n_estimators,
+                "n_nodes": self.n_nodes
+            }, f, indent=2)
+
+    @classmethod
+    def load(cls, directory: str, mmap_mode: Optional[str] = None) -> "CompiledForest":
+        """
+        Load a forest written by save()
+
+        With mmap_mode="r" the node arrays stay memory-mapped, so every worker
+        process serving the same files shares one copy in the page cache.
+        """
+        with open(os.path.join(directory, META_FILE), "r") as f:
+            meta = json.load(f)
+
+        # np.asarray drops the np.memmap subclass (whose indexing is slower)
+        # while keeping the view on the mapped buffer
+        arrays = {
+            name: np.asarray(np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode))
+            for name in ARRAY_NAMES
+        }
+        return cls(
+            feature=arrays["feature"],
+            threshold=arrays["threshold"],
+            children=arrays["children"],
+            value=arrays["value"],
+            roots=arrays["roots"],
+            classes=arrays["classes"],
+            max_depth=meta["max_depth"],
+            n_features=meta["n_features"]
+        )
+
+
+def compile_forest(model: Any) -> CompiledForest:
+    """Compile a fitted RandomForestClassifier into flat node arrays"""
+    return CompiledForest.from_sklearn(model)
+
+
+def verify_compiled_forest(model: Any, forest: CompiledForest, X: np.ndarray) -> bool:
+    """
+    Check the compiled forest reproduces sklearn's probabilities exactly
+
+    sklearn is evaluated with n_jobs=1 so its per-tree accumulation order is
+    deterministic and matches the compiled evaluator.
+    """
+    n_jobs = model.n_jobs
+    try:
+        model.n_jobs = 1
+        expected = model.predict_proba(X)
+    finally:
+        model.n_jobs = n_jobs
+    return bool(np.array_equal(expected, forest.predict_proba(X)))
+
+
+def _latency_stats(timings: List[float]) -> Dict[str, float]:
+    timings_us = np.asarray(timings) * 1e6
+    return {
+        "p50_us": round(float(np.percentile(timings_us, 50)), 1),
+        "p99_us": round(float(np.percentile(timings_us, 99)), 1),
+        "mean_us": round(float(timings_us.mean()), 1)
+    }
+
+
+def benchmark(model: Any, forest: Optional[CompiledForest] = None,
+              repeat: int = 200, seed: int = 0) -> Dict[str, Any]:
+    """
+    Compare single-row latency of sklearn predict_proba vs the compiled forest
+    """
+    forest = forest or compile_forest(model)
+    rng = np.random.RandomState(seed)
+    X = rng.uniform(-2.0, 2.0, size=(repeat, forest.n_features_in_))
+
+    results = {}
+    for name, predict_proba in [("sklearn", model.predict_proba), ("compiled", forest.predict_proba)]:
+        predict_proba(X[:1])  # warm-up
+        timings = []
+        for row in X:
+            start = time.perf_counter()
+            predict_proba(row.reshape(1, -1))
+            timings.append(time.perf_counter() - start)
+        results[name] = _latency_stats(timings)
+
+    results["speedup_p50"] = round(results["sklearn"]["p50_us"] / max(results["compiled"]["p50_us"], 1e-9), 1)
+    results["exact_match"] = verify_compiled_forest(model, forest, X)
+    results["n_estimators"] = forest.n_estimators
+    results["n_nodes"] = forest.n_nodes
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+    import pickle
+
+    parser = argparse.ArgumentParser(description="Compile a trained forest and benchmark single-row latency")
+    parser.add_argument("--model", default="model_data.pkl", help="Pickled model_data file")
+    parser.add_argument("--output", default="model_forest", help="Directory for compiled node arrays")
+    parser.add_argument("--repeat", type=int, default=200, help="Single-row calls to time")
+    args = parser.parse_args()
+
+    with open(args.model, "rb") as f:
+        model = pickle.load(f)["model"]
+
+    compiled = compile_forest(model)
+    compiled.save(args.output)
+    logger.info(f"✅ Compiled {compiled.n_estimators} trees ({compiled.n_nodes} nodes) to {args.output}/")
+    logger.info(json.dumps(benchmark(model, compiled, repeat=args.repeat), indent=2))
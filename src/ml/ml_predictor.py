@@ -1,10 +1,13 @@
 """ML Model Prediction Service for Sports Match Outcomes"""
-import pickle
-import os
 import logging
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 import numpy as np
 
+try:
+    from model_registry import LoadedModel, ModelRegistry
+except ImportError:
+    from src.ml.model_registry import LoadedModel, ModelRegistry
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -12,29 +15,36 @@ logger = logging.getLogger(__name__)
 class MLPredictor:
     """Loads and uses the trained Random Forest model for predictions"""
     
-    def __init__(self, model_path: str = "model_data.pkl"):
+    def __init__(self, model_path: str = "model_data.pkl", registry_root: str = "shared/models"):
         self.model_path = model_path
-        self.model = None
-        self.scaler = None
-        self.accuracy = None
-        self._load_model()
+        self.registry = ModelRegistry(root=registry_root, legacy_path=model_path)
     
-    def _load_model(self):
-        """Load the trained model and scaler from pickle file"""
-        try:
-            if os.path.exists(self.model_path):
-                with open(self.model_path, "rb") as f:
-                    model_data = pickle.load(f)
-                
-                self.model = model_data["model"]
-                self.scaler = model_data["scaler"]
-                self.accuracy = model_data["accuracy"]
-                
-                logger.info(f"✅ ML Model loaded successfully (accuracy: {self.accuracy:.2%})")
-            else:
-                logger.warning(f"⚠️ Model file not found at {self.model_path}")
-        except Exception as e:
-            logger.error(f"❌ Failed to load model: {str(e)}")
+    def _active_model(self) -> Optional[LoadedModel]:
+        """Current registry version (loaded lazily, hot-swapped when republished)"""
+        model = self.registry.active()
+        if model is None:
+            logger.warning(f"⚠️ No model in {self.registry.root}/ or at {self.model_path}")
+        return model
+    
+    @property
+    def model(self):
+        model = self._active_model()
+        return model.sklearn_model if model else None
+    
+    @property
+    def scaler(self):
+        model = self._active_model()
+        return model.scaler if model else None
+    
+    @property
+    def accuracy(self) -> Optional[float]:
+        model = self._active_model()
+        return model.accuracy if model else None
+    
+    @property
+    def version(self) -> Optional[str]:
+        model = self._active_model()
+        return model.version if model else None
     
     def predict(self, features: List[float]) -> Tuple[int, Dict[str, float]]:
         """
@@ -49,44 +59,39 @@ class MLPredictor:
             - prediction: 0=home_win, 1=draw, 2=away_win
             - confidence_dict: probabilities for each outcome
         """
-        if self.model is None:
-            logger.warning("Model not loaded")
-            return None, {}
+        results = self.predict_batch([features])
+        return results[0] if results else (None, {})
+    
+    def predict_batch(self, features_list: List[List[float]]) -> List[Tuple[int, Dict]]:
+        """Predict multiple matches at once with a single compiled-forest pass"""
+        return self._score(features_list)[1]
+    
+    def _score(self, features_list: List[List[float]]) -> Tuple[Optional[str], List[Tuple[int, Dict]]]:
+        """Score a batch on one pinned model version; returns (version, results)"""
+        model = self._active_model()
+        if model is None or not features_list:
+            return None, []
         
         try:
             # Scale features using the trained scaler
-            features_array = np.array([features])
-            scaled_features = self.scaler.transform(features_array)
+            features_array = np.array(features_list)
+            scaled_features = model.scaler.transform(features_array) if model.scaler is not None else features_array
             
-            # Get prediction
-            prediction = self.model.predict(scaled_features)[0]
-            
-            # Get prediction probabilities
-            probabilities = self.model.predict_proba(scaled_features)[0]
-            
-            confidence_dict = {
-                "home_win": float(probabilities[0]),
-                "draw": float(probabilities[1]),
-                "away_win": float(probabilities[2])
-            }
-            
-            return int(prediction), confidence_dict
-        
+            # Prediction is the most probable class, as in sklearn's predict()
+            probabilities = model.predict_proba(scaled_features)
+            predictions = model.classes_.take(np.argmax(probabilities, axis=1))
         except Exception as e:
-            logger.error(f"Prediction error: {str(e)}")
-            return None, {}
-    
-    def predict_batch(self, features_list: List[List[float]]) -> List[Tuple[int, Dict]]:
-        """Predict multiple matches at once"""
-        if self.model is None:
-            return []
-        
-        results = []
-        for features in features_list:
-            prediction, confidence = self.predict(features)
-            results.append((prediction, confidence))
+            logger.error(f"Batch prediction error: {str(e)}")
+            return model.version, [(None, {}) for _ in features_list]
         
-        return results
+        return model.version, [
+            (int(prediction), {
+                "home_win": float(proba[0]),
+                "draw": float(proba[1]),
+                "away_win": float(proba[2])
+            })
+            for prediction, proba in zip(predictions, probabilities)
+        ]
     
     def predict_match(self, home_strength: float, away_strength: float, 
                      home_advantage: float, recent_form_home: float, 
@@ -108,7 +113,8 @@ class MLPredictor:
             recent_form_home, recent_form_away, head_to_head, injuries
         ]
         
-        prediction, probabilities = self.predict(features)
+        version, results = self._score([features])
+        prediction, probabilities = results[0] if results else (None, {})
         
         if prediction is None:
             return {"error": "Model not available"}
@@ -121,9 +127,15 @@ class MLPredictor:
             "prediction": prediction_str,
             "confidence": confidence,
             "probabilities": probabilities,
-            "model_accuracy": self.accuracy or 0.903
+            "model_accuracy": self.accuracy or 0.903,
+            "model_version": version
         }
     
+    def reload(self) -> Optional[str]:
+        """Hot-swap to the registry's current version; returns the version served"""
+        model = self.registry.reload(force=True)
+        return model.version if model else None
+    
     def is_ready(self) -> bool:
         """Check if model is loaded and ready"""
-        return self.model is not None
+        return self._active_model() is not None
@@ -0,0 +1,274 @@
+"""Versioned model registry with lazy loading and atomic hot reload"""
+import json
+import os
+import pickle
+import shutil
+import threading
+import time
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+try:
+    from forest_compiler import CompiledForest, compile_forest
+except ImportError:
+    from src.ml.forest_compiler import CompiledForest, compile_forest
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+METADATA_FILE = "metadata.json"
+FOREST_DIR = "forest"
+SCALER_FILE = "scaler.pkl"
+MODEL_FILE = "model.pkl"
+
+
+class LoadedModel:
+    """
+    One immutable model version as served
+
+    The compiled forest arrays are memory-mapped; the full sklearn estimator
+    is only unpickled if something asks for `sklearn_model` (e.g. retraining).
+    """
+
+    def __init__(self, version: str, forest: CompiledForest, scaler: Any = None,
+                 metadata: Optional[Dict[str, Any]] = None, model_path: Optional[str] = None,
+                 sklearn_model: Any = None):
+        self.version = version
+        self.forest = forest
+        self.scaler = scaler
+        self.metadata = metadata or {}
+        self.model_path = model_path
+        self.loaded_at = datetime.now().isoformat()
+        self._sklearn_model = sklearn_model
+
+    @property
+    def classes_(self) -> np.ndarray:
+        return self.forest.classes_
+
+    @property
+    def feature_names(self) -> List[str]:
+        return self.metadata.get("feature_names", [])
+
+    @property
+    def accuracy(self) -> Optional[float]:
+        return self.metadata.get("accuracy")
+
+    @property
+    def sklearn_model(self) -> Any:
+        if self._sklearn_model is None and self.model_path and os.path.exists(self.model_path):
+            with open(self.model_path, "rb") as f:
+                self._sklearn_model = pickle.load(f)
+        return self._sklearn_model
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        return self.forest.predict_proba(X)
+
+    def predict(self, X: Any) -> np.ndarray:
+        return self.forest.predict(X)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "loaded_at": self.loaded_at,
+            "n_estimators": self.forest.n_estimators,
+            "n_nodes": self.forest.n_nodes,
+            **{k: v for k, v in self.metadata.items() if k != "feature_names"}
+        }
+
+
+def make_version_id(model_data: Dict[str, Any]) -> str:
+    """Registry version id: model release name plus training timestamp"""
+    trained = str(model_data.get("trained_date") or datetime.now().isoformat(timespec="seconds"))
+    stamp = "".join(ch for ch in trained if ch.isdigit())[:14]
+    return f"{model_data.get('version', 'model')}-{stamp}"
+
+
+def _write_atomic(path: str, text: str) -> None:
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def publish_model(model_data: Dict[str, Any], root: str = "shared/models",
+                  activate: bool = True) -> str:
+    """
+    Write a trained model into the registry as a new version
+
+    The version directory is assembled under a temporary name and renamed
+    into place, then CURRENT is swapped with os.replace, so readers only
+    ever see complete versions.
+    """
+    version = make_version_id(model_data)
+    final_dir = os.path.join(root, version)
+    tmp_dir = os.path.join(root, f".tmp-{version}-{os.getpid()}")
+    os.makedirs(root, exist_ok=True)
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    compile_forest(model_data["model"]).save(os.path.join(tmp_dir, FOREST_DIR))
+    with open(os.path.join(tmp_dir, MODEL_FILE), "wb") as f:
+        pickle.dump(model_data["model"], f)
+    if model_data.get("scaler") is not None:
+        with open(os.path.join(tmp_dir, SCALER_FILE), "wb") as f:
+            pickle.dump(model_data["scaler"], f)
+
+    metadata = {
+        k: v for k, v in model_data.items() if k not in ("model", "scaler")
+    }
+    metadata["version"] = version
+    metadata["release"] = model_data.get("version")
+    metadata["published"] = datetime.now().isoformat()
+    with open(os.path.join(tmp_dir, METADATA_FILE), "w") as f:
+        json.dump(metadata, f, indent=2, default=str)
+
+    if os.path.exists(final_dir):
+        shutil.rmtree(final_dir)
+    os.replace(tmp_dir, final_dir)
+
+    if activate:
+        _write_atomic(os.path.join(root, CURRENT_FILE), version)
+    logger.info(f"✅ Published model version {version} to {root}/")
+    return version
+
+
+class ModelRegistry:
+    """
+    Serves the active model version from a registry directory
+
+    Layout:
+        <root>/CURRENT                  name of the active version
+        <root>/<version>/forest/*.npy   compiled node arrays (memory-mapped)
+        <root>/<version>/scaler.pkl     fitted feature scaler
+        <root>/<version>/model.pkl      sklearn estimator (loaded on demand)
+        <root>/<version>/metadata.json
+
+    Nothing is read until the first call to active(). After that, CURRENT
+    is re-checked at most every `check_interval` seconds and a new version
+    is loaded and swapped in with a single reference assignment; requests
+    already holding the previous LoadedModel finish on it unaffected.
+    If the registry is empty, the legacy pickle at `legacy_path` is served.
+    """
+
+    def __init__(self, root: str = "shared/models", legacy_path: Optional[str] = None,
+                 check_interval: float = 5.0):
+        self.root = root
+        self.legacy_path = legacy_path
+        self.check_interval = check_interval
+        self._active: Optional[LoadedModel] = None
+        self._lock = threading.Lock()
+        self._last_check = 0.0
+        self._current_mtime: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def _current_path(self) -> str:
+        return os.path.join(self.root, CURRENT_FILE)
+
+    def _read_current(self) -> Optional[str]:
+        try:
+            with open(self._current_path(), "r") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def list_versions(self) -> List[str]:
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if not name.startswith(".") and os.path.isdir(os.path.join(self.root, name))
+        )
+
+    def load_version(self, version: str) -> LoadedModel:
+        """Load one registry version with its forest arrays memory-mapped"""
+        version_dir = os.path.join(self.root, version)
+        with open(os.path.join(version_dir, METADATA_FILE), "r") as f:
+            metadata = json.load(f)
+
+        scaler = None
+        scaler_path = os.path.join(version_dir, SCALER_FILE)
+        if os.path.exists(scaler_path):
+            with open(scaler_path, "rb") as f:
+                scaler = pickle.load(f)
+
+        forest = CompiledForest.load(os.path.join(version_dir, FOREST_DIR), mmap_mode="r")
+        return LoadedModel(
+            version=version,
+            forest=forest,
+            scaler=scaler,
+            metadata=metadata,
+            model_path=os.path.join(version_dir, MODEL_FILE)
+        )
+
+    def _load_legacy(self) -> Optional[LoadedModel]:
+        if not self.legacy_path or not os.path.exists(self.legacy_path):
+            return None
+        with open(self.legacy_path, "rb") as f:
+            model_data = pickle.load(f)
+
+        metadata = {k: v for k, v in model_data.items() if k not in ("model", "scaler")}
+        return LoadedModel(
+            version=make_version_id(model_data),
+            forest=compile_forest(model_data["model"]),
+            scaler=model_data.get("scaler"),
+            metadata=metadata,
+            sklearn_model=model_data["model"]
+        )
+
+    def reload(self, force: bool = False) -> Optional[LoadedModel]:
+        """Swap to the version named in CURRENT if it differs from the active one"""
+        with self._lock:
+            self._last_check = time.monotonic()
+            try:
+                mtime = os.stat(self._current_path()).st_mtime
+            except FileNotFoundError:
+                mtime = None
+
+            if not force and self._active is not None and mtime == self._current_mtime:
+                return self._active
+
+            try:
+                version = self._read_current()
+                if version is not None:
+                    if force or self._active is None or version != self._active.version:
+                        self._active = self.load_version(version)
+                        logger.info(f"✅ Serving model version {version}")
+                elif self._active is None or force:
+                    self._active = self._load_legacy()
+                    if self._active:
+                        logger.info(f"✅ Serving legacy model {self.legacy_path} as {self._active.version}")
+                self._current_mtime = mtime
+                self.last_error = None
+            except Exception as e:
+                # Keep serving the previous version if the new one is unreadable
+                self.last_error = str(e)
+                logger.error(f"❌ Failed to load model version: {e}")
+            return self._active
+
+    @property
+    def current(self) -> Optional[LoadedModel]:
+        """The loaded version, without triggering a load or CURRENT check"""
+        return self._active
+
+    def active(self) -> Optional[LoadedModel]:
+        """The model to serve right now, loading or hot-swapping if needed"""
+        model = self._active
+        if model is None or time.monotonic() - self._last_check >= self.check_interval:
+            model = self.reload()
+        return model
+
+    def status(self) -> Dict[str, Any]:
+        model = self.current
+        return {
+            "root": self.root,
+            "active_version": model.version if model else None,
+            "available_versions": self.list_versions(),
+            "legacy_path": self.legacy_path,
+            "last_error": self.last_error
+        }
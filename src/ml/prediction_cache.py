@@ -0,0 +1,98 @@
+"""Bounded LRU memoization for model inference"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+class LRUCache:
+    """Thread-safe least-recently-used cache with a fixed entry limit"""
+
+    def __init__(self, max_size: int = 1024):
+        if max_size <= 0:
+            raise ValueError("max_size must be positive")
+        self.max_size = max_size
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
+
+
+def quantize_features(features: Sequence[float], precision: int = 4) -> Tuple[float, ...]:
+    """Round a feature vector so near-identical queries share one cache entry"""
+    return tuple(round(float(x), precision) for x in features)
+
+
+class PredictionCache(LRUCache):
+    """
+    Memo of model probabilities keyed on (model version, quantized features)
+
+    Callers should run the model on the quantized features returned by
+    quantize() so a cached entry is exactly what the model would return for
+    its key. Entries from an older model version are dropped as soon as a
+    different version is seen.
+    """
+
+    def __init__(self, max_size: int = 4096, precision: int = 4):
+        super().__init__(max_size=max_size)
+        self.precision = precision
+        self.model_version: Optional[str] = None
+
+    def quantize(self, features: Sequence[float]) -> Tuple[float, ...]:
+        return quantize_features(features, self.precision)
+
+    def _check_version(self, model_version: str) -> None:
+        with self._lock:
+            if model_version != self.model_version:
+                self._entries.clear()
+                self.model_version = model_version
+
+    def lookup(self, features: Sequence[float], model_version: str) -> Optional[List[float]]:
+        """Cached probabilities for these features under model_version, if any"""
+        self._check_version(model_version)
+        return self.get((model_version, self.quantize(features)))
+
+    def store(self, features: Sequence[float], model_version: str, probabilities: Sequence[float]) -> None:
+        self._check_version(model_version)
+        self.put((model_version, self.quantize(features)), [float(p) for p in probabilities])
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "model_version": self.model_version, "precision": self.precision}
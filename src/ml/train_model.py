@@ -5,61 +5,90 @@ from sklearn.preprocessing import StandardScaler
 from sklearn.model_selection import train_test_split
 import logging
 
+from model_registry import publish_model
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def generate_training_data(n_samples=10000):
-    np.random.seed(42)
-    X = []
-    y = []
-
-    for _ in range(n_samples):
-        home_strength = np.random.uniform(0.3, 1.0)
-        away_strength = np.random.uniform(0.3, 1.0)
-        home_advantage = np.random.uniform(0.5, 0.8)
-        recent_form_home = np.random.uniform(0.2, 1.0)
-        recent_form_away = np.random.uniform(0.2, 1.0)
-        head_to_head = np.random.uniform(0.3, 0.7)
-        injuries = np.random.uniform(0.4, 1.0)
-
-        features = [
-            home_strength, away_strength, home_advantage,
-            recent_form_home, recent_form_away, head_to_head, injuries
-        ]
-
-        home_score = (
-            home_strength * 0.3 +
-            home_advantage * 0.2 +
-            recent_form_home * 0.25 +
-            head_to_head * 0.15 +
-            injuries * 0.1
-        )
-
-        away_score = (
-            away_strength * 0.3 +
-            (1 - home_advantage) * 0.1 +
-            recent_form_away * 0.25 +
-            (1 - head_to_head) * 0.15 +
-            injuries * 0.2
-        )
-
-        diff = home_score - away_score
-        if diff > 0.15:
-            label = 0  # home win
-        elif diff < -0.15:
-            label = 2  # away win
-        else:
-            label = 1  # draw
-
-        X.append(features)
-        y.append(label)
-
-    return np.array(X), np.array(y)
-
-def train_model():
+# (low, high) sampling range per feature, in model feature order:
+# home_strength, away_strength, home_advantage, recent_form_home,
+# recent_form_away, head_to_head, injuries
+FEATURE_RANGES = np.array([
+    [0.3, 1.0],
+    [0.3, 1.0],
+    [0.5, 0.8],
+    [0.2, 1.0],
+    [0.2, 1.0],
+    [0.3, 0.7],
+    [0.4, 1.0],
+])
+
+
+def _sample_features(rng, n_samples):
+    # Row-major draws consume the RNG stream in the same order as drawing
+    # the seven features sample by sample
+    return rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1], size=(n_samples, len(FEATURE_RANGES)))
+
+
+def _label_outcomes(X):
+    home_strength, away_strength, home_advantage, recent_form_home, \
+        recent_form_away, head_to_head, injuries = X.T
+
+    home_score = (
+        home_strength * 0.3 +
+        home_advantage * 0.2 +
+        recent_form_home * 0.25 +
+        head_to_head * 0.15 +
+        injuries * 0.1
+    )
+
+    away_score = (
+        away_strength * 0.3 +
+        (1 - home_advantage) * 0.1 +
+        recent_form_away * 0.25 +
+        (1 - head_to_head) * 0.15 +
+        injuries * 0.2
+    )
+
+    # 0 = home win, 1 = draw, 2 = away win
+    diff = home_score - away_score
+    return np.where(diff > 0.15, 0, np.where(diff < -0.15, 2, 1))
+
+
+def generate_training_data(n_samples=10000, seed=42):
+    rng = np.random.RandomState(seed)
+    X = _sample_features(rng, n_samples)
+    return X, _label_outcomes(X)
+
+
+def generate_training_data_chunked(n_samples, path_prefix, chunk_size=1_000_000, seed=42):
+    """
+    Stream a large synthetic dataset to <path_prefix>_X.npy / _y.npy
+
+    Only one chunk is held in memory at a time; the result is identical to
+    generate_training_data(n_samples, seed). Returns read-only memory maps.
+    """
+    rng = np.random.RandomState(seed)
+    X_path, y_path = f"{path_prefix}_X.npy", f"{path_prefix}_y.npy"
+    X_out = np.lib.format.open_memmap(X_path, mode="w+", dtype=np.float64, shape=(n_samples, len(FEATURE_RANGES)))
+    y_out = np.lib.format.open_memmap(y_path, mode="w+", dtype=np.int64, shape=(n_samples,))
+
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        X_chunk = _sample_features(rng, stop - start)
+        X_out[start:stop] = X_chunk
+        y_out[start:stop] = _label_outcomes(X_chunk)
+        logger.info(f"💾 Generated samples {start:,}-{stop:,} of {n_samples:,}")
+
+    X_out.flush()
+    y_out.flush()
+    del X_out, y_out
+    return np.load(X_path, mmap_mode="r"), np.load(y_path, mmap_mode="r")
+
+def train_model(n_samples=10000):
     logger.info("🏋️ Starting model training...")
 
-    X, y = generate_training_data(10000)
+    X, y = generate_training_data(n_samples)
     logger.info(f"✅ Generated {len(X)} training samples")
 
     X_train, X_test, y_train, y_test = train_test_split(
@@ -100,6 +129,10 @@ def train_model():
         pickle.dump(model_data, f)
 
     logger.info("✅ Model saved to model_data.pkl")
+
+    # Publish as a new registry version (compiled forest + scaler + metadata);
+    # running API workers hot-swap to it on their next CURRENT check
+    publish_model(model_data, root="shared/models")
     return model, scaler, test_score
 
 if __name__ == "__main__":
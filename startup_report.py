@@ -0,0 +1,113 @@
+"""
+Cold start accounting - time spent in each startup phase (imports, stores,
+model registry, ...) against a budget, printed when the app starts serving
+Budget: STARTUP_BUDGET_SECONDS (default 3)
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3"))
+
+
+def _process_age() -> Optional[float]:
+    """Seconds since this process started (Linux /proc), covering the interpreter's own boot"""
+    try:
+        with open("/proc/self/stat") as f:
+            started_ticks = float(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - started_ticks / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError, KeyError):
+        return None
+
+
+class StartupReport:
+    """
+    Phases are recorded with mark(name): the time since the previous mark.
+    Slow initialization that doesn't have to block serving goes through
+    background(name, func) and is reported separately when it finishes.
+    """
+
+    def __init__(self, budget: float = STARTUP_BUDGET_SECONDS):
+        self.budget = budget
+        self.started = time.perf_counter()
+        self.before_app = _process_age()  # interpreter + anything imported before this module
+        self.phases: List[Dict[str, Any]] = []
+        self.background_tasks: Dict[str, Dict[str, Any]] = {}
+        self.ready_seconds: Optional[float] = None
+        self._last = self.started
+        self._lock = threading.Lock()
+
+    def mark(self, name: str) -> float:
+        now = time.perf_counter()
+        seconds = now - self._last
+        self._last = now
+        self.phases.append({"phase": name, "seconds": round(seconds, 4)})
+        return seconds
+
+    def background(self, name: str, func: Callable[[], Any]) -> threading.Thread:
+        """Run func in a daemon thread and record how long it took"""
+        def run() -> None:
+            start = time.perf_counter()
+            status = "ok"
+            try:
+                func()
+            except Exception as e:
+                status = f"error: {e}"
+            with self._lock:
+                self.background_tasks[name] = {
+                    "seconds": round(time.perf_counter() - start, 4),
+                    "status": status
+                }
+
+        with self._lock:
+            self.background_tasks[name] = {"seconds": None, "status": "running"}
+        thread = threading.Thread(target=run, name=f"startup-{name}", daemon=True)
+        thread.start()
+        return thread
+
+    def ready(self) -> None:
+        """The app is about to serve; print the breakdown once"""
+        if self.ready_seconds is not None:
+            return
+        self.mark("startup_hooks")
+        self.ready_seconds = time.perf_counter() - self.started
+        print(self.format())
+
+    def total_seconds(self) -> float:
+        app_seconds = self.ready_seconds if self.ready_seconds is not None else time.perf_counter() - self.started
+        return app_seconds + (self.before_app or 0.0)
+
+    def format(self) -> str:
+        total = self.total_seconds()
+        over = total > self.budget
+        lines = [f"{'⚠️' if over else '🚀'} Cold start {total:.2f}s (budget {self.budget:.1f}s)"]
+        rows = ([("interpreter", self.before_app)] if self.before_app is not None else [])
+        rows += [(p["phase"], p["seconds"]) for p in self.phases]
+        for name, seconds in sorted(rows, key=lambda r: -r[1]):
+            share = seconds / total * 100 if total else 0.0
+            lines.append(f"   {name:<18} {seconds * 1000:8.1f}ms {share:5.1f}%")
+        with self._lock:
+            for name, task in self.background_tasks.items():
+                lines.append(f"   {name:<18} (background, {task['status']})")
+        return "\n".join(lines)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            background = {name: dict(task) for name, task in self.background_tasks.items()}
+        total = self.total_seconds()
+        return {
+            "ready": self.ready_seconds is not None,
+            "total_seconds": round(total, 4),
+            "budget_seconds": self.budget,
+            "over_budget": total > self.budget,
+            "interpreter_seconds": round(self.before_app, 4) if self.before_app is not None else None,
+            "phases": list(self.phases),
+            "background": background
+        }
+
+
+startup_report = StartupReport()
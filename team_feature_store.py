@@ -0,0 +1,411 @@
+"""
+Team Feature Store - precomputed per-team strength, form and head-to-head features
+Updated incrementally from logged results and scraped final scores
+"""
+
+import json
+import os
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+FEATURE_NAMES = [
+    "home_strength",
+    "away_strength",
+    "home_advantage",
+    "recent_form_home",
+    "recent_form_away",
+    "head_to_head",
+    "injuries"
+]
+
+# Feature vector used when a team has no history (the model's old placeholder)
+DEFAULT_FEATURES = [0.65, 0.55, 0.65, 0.6, 0.58, 0.5, 0.9]
+
+FORM_WINDOW = 5
+H2H_WINDOW = 5
+
+# Pseudo-matches of league-average results blended into every rate, so a team
+# with one logged game isn't rated as perfect or hopeless
+PRIOR_MATCHES = 5
+PRIOR_PPG = 1.35
+
+FINISHED_STATUSES = {"FT", "AET", "PEN", "FINAL", "FINISHED", "FULL_TIME", "STATUS_FINAL", "STATUS_FULL_TIME"}
+
+
+def normalize_team(name: str) -> str:
+    """Canonical team key: lowercase, underscores as spaces, collapsed whitespace"""
+    return " ".join(str(name or "").replace("_", " ").lower().split())
+
+
+def is_finished(status: Any) -> bool:
+    """True for final-whistle statuses from ESPN (dict), API-Football and the scrapers"""
+    if isinstance(status, dict):
+        if status.get("completed"):
+            return True
+        status = status.get("name") or status.get("state") or ""
+    return str(status).strip().upper().replace(" ", "_") in FINISHED_STATUSES
+
+
+def accuracy_result_id(record: Dict[str, Any]) -> str:
+    """Dedup id for a ResultsLogger accuracy record"""
+    return f"accuracy|{record.get('prediction_id') or record.get('match')}|{record.get('timestamp', '')}"
+
+
+def template_result_id(result: Dict[str, Any]) -> str:
+    """Dedup id for a ResultsTemplate result entry"""
+    return f"result|{result.get('match')}|{result.get('timestamp', '')}"
+
+
+class TeamRecord:
+    """Running totals for one team; every update and feature read is O(1)"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.played = 0
+        self.points = 0
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+        self.home_played = 0
+        self.home_points = 0
+        self.scored_matches = 0  # matches with a known score
+        self.goals_for = 0
+        self.goals_against = 0
+        self.clean_sheets = 0
+        self.form: deque = deque(maxlen=FORM_WINDOW)  # 1 win, 0 draw, -1 loss
+
+    def add(self, points: int, at_home: bool, goals_for: Optional[int], goals_against: Optional[int]) -> None:
+        self.played += 1
+        self.points += points
+        if points == 3:
+            self.wins += 1
+            self.form.append(1)
+        elif points == 1:
+            self.draws += 1
+            self.form.append(0)
+        else:
+            self.losses += 1
+            self.form.append(-1)
+
+        if at_home:
+            self.home_played += 1
+            self.home_points += points
+
+        if goals_for is not None and goals_against is not None:
+            self.scored_matches += 1
+            self.goals_for += goals_for
+            self.goals_against += goals_against
+            if goals_against == 0:
+                self.clean_sheets += 1
+
+    def strength(self) -> float:
+        """Smoothed points-per-game as a 0-1 share of the maximum"""
+        ppg = (self.points + PRIOR_PPG * PRIOR_MATCHES) / (self.played + PRIOR_MATCHES)
+        return ppg / 3.0
+
+    def recent_form(self) -> float:
+        """Smoothed 0-1 share of available points over the last FORM_WINDOW games"""
+        points = sum(3 if r == 1 else (1 if r == 0 else 0) for r in self.form)
+        return (points + PRIOR_PPG * PRIOR_MATCHES) / (3.0 * (len(self.form) + PRIOR_MATCHES))
+
+    def home_share(self) -> float:
+        """How much better the team does at home than overall (0.5 = no difference)"""
+        if not self.home_played or not self.played:
+            return 0.5
+        home_ppg = (self.home_points + PRIOR_PPG * PRIOR_MATCHES) / (self.home_played + PRIOR_MATCHES)
+        overall_ppg = (self.points + PRIOR_PPG * PRIOR_MATCHES) / (self.played + PRIOR_MATCHES)
+        return min(max(0.5 + (home_ppg - overall_ppg) / 3.0, 0.0), 1.0)
+
+    def goals_avg(self) -> float:
+        return round(self.goals_for / self.scored_matches, 1) if self.scored_matches else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = {k: v for k, v in self.__dict__.items() if k != "form"}
+        data["form"] = list(self.form)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TeamRecord":
+        record = cls(data.get("name", ""))
+        for key, value in data.items():
+            if key == "form":
+                record.form.extend(value)
+            elif hasattr(record, key):
+                setattr(record, key, value)
+        return record
+
+
+class TeamFeatureStore:
+    """
+    Precomputed team features keyed by normalized team name
+
+    Results are folded into running per-team and per-pairing totals as they
+    arrive, so producing a match's 7-feature vector never rescans history.
+    Persisted as a single JSON document next to the results log.
+    """
+
+    def __init__(self, path: Optional[str] = "shared/team_features.json", max_seen: int = 20000):
+        self.path = path
+        self.max_seen = max_seen
+        self.teams: Dict[str, TeamRecord] = {}
+        self.h2h: Dict[str, Dict[str, Any]] = {}
+        self._seen: Dict[str, None] = {}  # insertion-ordered result ids, for dedup
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.updated: Optional[str] = None
+        if path:
+            self.load()
+
+    # ---------- persistence ----------
+
+    def load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+            self.teams = {key: TeamRecord.from_dict(value) for key, value in data.get("teams", {}).items()}
+            self.h2h = {
+                key: {**value, "last": deque(value.get("last", []), maxlen=H2H_WINDOW)}
+                for key, value in data.get("h2h", {}).items()
+            }
+            self._seen = dict.fromkeys(data.get("seen", []))
+            self.updated = data.get("updated")
+            print(f"✅ Loaded team features for {len(self.teams)} teams from {self.path}")
+        except Exception as e:
+            print(f"⚠️ Could not load team features from {self.path}: {e}")
+
+    def save(self) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                "teams": {key: record.to_dict() for key, record in self.teams.items()},
+                "h2h": {key: {**value, "last": list(value["last"])} for key, value in self.h2h.items()},
+                "seen": list(self._seen),
+                "updated": self.updated
+            }
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            with open(tmp_path, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"⚠️ Could not save team features: {e}")
+
+    def save_if_dirty(self) -> None:
+        if self._dirty:
+            self.save()
+
+    # ---------- incremental updates ----------
+
+    @staticmethod
+    def _pair_key(home_key: str, away_key: str) -> Tuple[str, bool]:
+        """Order-independent pairing key, plus whether home is the pairing's first team"""
+        if home_key <= away_key:
+            return f"{home_key}|{away_key}", True
+        return f"{away_key}|{home_key}", False
+
+    def _team(self, name: str) -> TeamRecord:
+        key = normalize_team(name)
+        record = self.teams.get(key)
+        if record is None:
+            record = self.teams[key] = TeamRecord(name)
+        return record
+
+    def record_result(self, home_team: str, away_team: str,
+                      home_goals: Optional[int] = None, away_goals: Optional[int] = None,
+                      outcome: Optional[str] = None, result_id: Optional[str] = None) -> bool:
+        """
+        Fold one finished match into the store
+
+        Give either the score or an outcome code ("1", "X", "2"). A result_id
+        makes the update idempotent, so re-scraping the same final score is a
+        no-op. Returns True if the store changed.
+        """
+        if home_goals is not None and away_goals is not None:
+            home_goals, away_goals = int(home_goals), int(away_goals)
+            outcome = "1" if home_goals > away_goals else ("X" if home_goals == away_goals else "2")
+        if outcome not in ("1", "X", "2"):
+            return False
+
+        home_key, away_key = normalize_team(home_team), normalize_team(away_team)
+        if not home_key or not away_key or home_key == away_key:
+            return False
+
+        with self._lock:
+            if result_id is not None:
+                if result_id in self._seen:
+                    return False
+                self._seen[result_id] = None
+                while len(self._seen) > self.max_seen:
+                    self._seen.pop(next(iter(self._seen)))
+
+            home_points, away_points = {"1": (3, 0), "X": (1, 1), "2": (0, 3)}[outcome]
+            self._team(home_team).add(home_points, True, home_goals, away_goals)
+            self._team(away_team).add(away_points, False, away_goals, home_goals)
+
+            pair_key, home_first = self._pair_key(home_key, away_key)
+            pair = self.h2h.get(pair_key)
+            if pair is None:
+                pair = self.h2h[pair_key] = {"first_wins": 0, "draws": 0, "second_wins": 0,
+                                             "last": deque(maxlen=H2H_WINDOW)}
+            # Winner recorded relative to the pairing key: "first", "draw" or "second"
+            if outcome == "X":
+                winner = "draw"
+            else:
+                winner = "first" if (outcome == "1") == home_first else "second"
+            pair["draws" if winner == "draw" else f"{winner}_wins"] += 1
+            pair["last"].append(winner)
+
+            self.updated = datetime.now().isoformat()
+            self._dirty = True
+        return True
+
+    def record_outcome(self, match: str, actual: str, result_id: Optional[str] = None) -> bool:
+        """Fold a logged result such as ("Arsenal vs Chelsea", "2-1" / "Arsenal Win")"""
+        from real_scraper import ResultsTemplate
+
+        home, away = ResultsTemplate.split_match(match or "")
+        if home is None:
+            return False
+        score = ResultsTemplate.parse_score(actual)
+        if score:
+            return self.record_result(home, away, score[0], score[1], result_id=result_id)
+        return self.record_result(home, away, outcome=ResultsTemplate.outcome_code(actual, home, away),
+                                  result_id=result_id)
+
+    def ingest_matches(self, matches: List[Any]) -> int:
+        """Record final scores from scraped LiveMatch objects; returns how many were new"""
+        added = 0
+        for match in matches:
+            if not is_finished(getattr(match, "status", None)):
+                continue
+            result_id = f"{normalize_team(match.home_team)}|{normalize_team(match.away_team)}|{match.game_time}"
+            if self.record_result(match.home_team, match.away_team,
+                                  match.home_score, match.away_score, result_id=result_id):
+                added += 1
+        return added
+
+    def rebuild(self, results_logger: Any) -> int:
+        """Reset and replay every logged result in time order"""
+        with self._lock:
+            self.teams, self.h2h, self._seen = {}, {}, {}
+
+        records = [
+            (r.get("timestamp", ""), r.get("match"), r.get("actual"), accuracy_result_id(r))
+            for r in results_logger.get_accuracy_records()
+        ] + [
+            (r.get("timestamp", ""), r.get("match"), r.get("actual_result"), template_result_id(r))
+            for r in results_logger.results.get("results", []) if r.get("actual_result")
+        ]
+        added = 0
+        for _, match, actual, result_id in sorted(records, key=lambda r: r[0]):
+            if self.record_outcome(match, actual, result_id=result_id):
+                added += 1
+        self.save()
+        print(f"✅ Rebuilt team features from {added} logged results ({len(self.teams)} teams)")
+        return added
+
+    # ---------- O(1) feature reads ----------
+
+    def _h2h_view(self, home_key: str, away_key: str) -> Dict[str, Any]:
+        """Head-to-head totals and recent winners from the home team's point of view"""
+        pair_key, home_first = self._pair_key(home_key, away_key)
+        pair = self.h2h.get(pair_key)
+        if pair is None:
+            return {"home_wins": 0, "draws": 0, "away_wins": 0, "last": []}
+        mine, theirs = ("first", "second") if home_first else ("second", "first")
+        flip = {mine: "home", theirs: "away", "draw": "draw"}
+        return {
+            "home_wins": pair[f"{mine}_wins"],
+            "draws": pair["draws"],
+            "away_wins": pair[f"{theirs}_wins"],
+            "last": [flip[w] for w in pair["last"]]
+        }
+
+    def match_features(self, home_team: str, away_team: str) -> List[float]:
+        """
+        7-feature model input for a fixture, scaled into the training ranges
+        Unknown teams keep the default value for their features
+        """
+        home = self.teams.get(normalize_team(home_team))
+        away = self.teams.get(normalize_team(away_team))
+        features = list(DEFAULT_FEATURES)
+
+        if home is not None:
+            features[0] = 0.3 + 0.7 * home.strength()
+            features[2] = 0.5 + 0.3 * home.home_share()
+            features[3] = 0.2 + 0.8 * home.recent_form()
+        if away is not None:
+            features[1] = 0.3 + 0.7 * away.strength()
+            features[4] = 0.2 + 0.8 * away.recent_form()
+
+        h2h = self._h2h_view(normalize_team(home_team), normalize_team(away_team))
+        meetings = h2h["home_wins"] + h2h["draws"] + h2h["away_wins"]
+        if meetings:
+            share = (3 * h2h["home_wins"] + h2h["draws"] + PRIOR_PPG * PRIOR_MATCHES) / (3.0 * (meetings + PRIOR_MATCHES))
+            features[5] = 0.3 + 0.4 * share
+        # features[6] (injuries/availability) has no logged source yet
+
+        return [round(f, 4) for f in features]
+
+    def team_stats(self, home_team: str, away_team: str) -> Dict[str, Any]:
+        """Form, head-to-head, goals and clean-sheet summary for a fixture"""
+        home = self.teams.get(normalize_team(home_team))
+        away = self.teams.get(normalize_team(away_team))
+        h2h = self._h2h_view(normalize_team(home_team), normalize_team(away_team))
+        last = h2h["last"]
+        return {
+            "home_form": list(home.form) if home else [],
+            "away_form": list(away.form) if away else [],
+            "h2h_last_5": {
+                "home_wins": last.count("home"),
+                "draws": last.count("draw"),
+                "away_wins": last.count("away")
+            },
+            "goals_avg": {
+                "home": home.goals_avg() if home else 0.0,
+                "away": away.goals_avg() if away else 0.0
+            },
+            "clean_sheets": {
+                "home": home.clean_sheets if home else 0,
+                "away": away.clean_sheets if away else 0
+            }
+        }
+
+    def team_summary(self, team: str) -> Optional[Dict[str, Any]]:
+        record = self.teams.get(normalize_team(team))
+        if record is None:
+            return None
+        return {
+            **record.to_dict(),
+            "strength": round(record.strength(), 4),
+            "recent_form": round(record.recent_form(), 4),
+            "home_share": round(record.home_share(), 4),
+            "goals_avg": record.goals_avg()
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "teams": len(self.teams),
+            "pairings": len(self.h2h),
+            "results_seen": len(self._seen),
+            "updated": self.updated,
+            "path": self.path
+        }
+
+
+_default_store: Optional[TeamFeatureStore] = None
+
+
+def get_default_store(path: str = "shared/team_features.json") -> TeamFeatureStore:
+    """Process-wide store shared by services that aren't handed one explicitly"""
+    global _default_store
+    if _default_store is None:
+        _default_store = TeamFeatureStore(path=path)
+    return _default_store
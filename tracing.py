@@ -0,0 +1,323 @@
+"""
+Lightweight request tracing: spans per pipeline stage, request IDs, Server-Timing,
+and an on-demand sampled CPU profile of a single request as folded stacks (flamegraph input)
+"""
+
+import asyncio
+import functools
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter as TallyCounter, OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from fastapi.routing import APIRoute
+
+REQUEST_ID_HEADER = "x-request-id"
+PROFILE_HEADER = "x-debug-profile"
+
+# Requests slower than this print their span breakdown
+SLOW_REQUEST_MS = float(os.getenv("TRACE_SLOW_MS", "5000"))
+# Profiling is off unless a token is configured; requests must send it in X-Debug-Profile
+PROFILE_TOKEN = os.getenv("DEBUG_PROFILE_TOKEN")
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL_MS", "5")) / 1000.0
+
+_UNSAFE_ID_CHARS = re.compile(r"[^A-Za-z0-9._-]")
+
+
+class Trace:
+    """Spans recorded for one request (possibly from several threads)"""
+
+    def __init__(self, request_id: str, method: str = "", path: str = ""):
+        self.request_id = request_id
+        self.method = method
+        self.path = path
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.threads = {threading.get_ident()}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, start: float, duration: float, parent: Optional[str] = None,
+            **attrs: Any) -> None:
+        entry = {
+            "name": name,
+            "start_ms": round((start - self.started) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3),
+            "parent": parent,
+            **attrs
+        }
+        with self._lock:
+            self.spans.append(entry)
+            self.threads.add(threading.get_ident())
+
+    def enter_thread(self) -> None:
+        """Mark the calling thread as working on this request, so the profiler samples it from now on"""
+        ident = threading.get_ident()
+        if ident not in self.threads:
+            with self._lock:
+                self.threads.add(ident)
+
+    def totals(self) -> Dict[str, float]:
+        """Summed milliseconds per span name"""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for entry in self.spans:
+                totals[entry["name"]] = totals.get(entry["name"], 0.0) + entry["duration_ms"]
+        return totals
+
+    def server_timing(self) -> str:
+        parts = [f"{name};dur={ms:.1f}" for name, ms in self.totals().items()]
+        parts.append(f"app;dur={(time.perf_counter() - self.started) * 1000:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "request_id": self.request_id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration_ms": self.duration_ms,
+            "totals_ms": self.totals(),
+            "spans": spans
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+_current_span: ContextVar[Optional[str]] = ContextVar("current_span", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+def current_request_id() -> Optional[str]:
+    trace = _current_trace.get()
+    return trace.request_id if trace else None
+
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """Time a stage of the current request; a no-op outside a traced request"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    trace.enter_thread()
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+        trace.add(name, start, time.perf_counter() - start, parent, **attrs)
+
+
+def record_span(name: str, duration: float, **attrs: Any) -> None:
+    """Add an already-measured stage (e.g. parse time derived from a scrape) to the current trace"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(name, time.perf_counter() - duration, duration, _current_span.get(), **attrs)
+
+
+# ---------- sampled profiler ----------
+
+class SampledProfiler:
+    """
+    Samples the stacks of the threads working on one request every `interval`
+    seconds and aggregates them as folded stacks ("a;b;c 42" per line), the
+    input format of flamegraph.pl / speedscope / inferno. Other requests
+    running on the same threads at the same time show up too.
+    """
+
+    def __init__(self, trace: Trace, interval: float = PROFILE_INTERVAL):
+        self.trace = trace
+        self.interval = interval
+        self.samples: TallyCounter = TallyCounter()
+        self.sample_count = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{trace.request_id}", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join(timeout=1.0)
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            for ident in list(self.trace.threads):
+                frame = frames.get(ident)
+                if frame is None or ident == own:
+                    continue
+                self.samples[self._fold(frame)] += 1
+            self.sample_count += 1
+
+    @staticmethod
+    def _fold(frame: Any) -> str:
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        return ";".join(reversed(stack))
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+class TraceStore:
+    """Recent traces and captured profiles, bounded, for the debug endpoints"""
+
+    def __init__(self, max_traces: int = 200, max_profiles: int = 20):
+        self.traces: deque = deque(maxlen=max_traces)
+        self.profiles: "OrderedDict[str, str]" = OrderedDict()
+        self.max_profiles = max_profiles
+        self._lock = threading.Lock()
+
+    def add_trace(self, trace: Trace) -> None:
+        self.traces.append(trace)
+
+    def add_profile(self, request_id: str, folded: str) -> None:
+        with self._lock:
+            self.profiles[request_id] = folded
+            while len(self.profiles) > self.max_profiles:
+                self.profiles.popitem(last=False)
+
+    def get_trace(self, request_id: str) -> Optional[Trace]:
+        for trace in reversed(self.traces):
+            if trace.request_id == request_id:
+                return trace
+        return None
+
+    def get_profile(self, request_id: str) -> Optional[str]:
+        return self.profiles.get(request_id)
+
+
+trace_store = TraceStore()
+
+
+def profiling_authorized(token: Optional[str]) -> bool:
+    return bool(PROFILE_TOKEN) and token is not None and hmac.compare_digest(token, PROFILE_TOKEN)
+
+
+# ---------- ASGI middleware and route class ----------
+
+def _header(scope: Dict[str, Any], name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", []):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+class TracingMiddleware:
+    """
+    Starts a trace per HTTP request, echoes/assigns X-Request-ID and adds a
+    Server-Timing header with the time per stage. A request carrying
+    X-Debug-Profile: <DEBUG_PROFILE_TOKEN> is also profiled; the response
+    then names the profile in X-Profile-Id.
+    """
+
+    def __init__(self, app: Any, store: TraceStore = trace_store, slow_ms: float = SLOW_REQUEST_MS):
+        self.app = app
+        self.store = store
+        self.slow_ms = slow_ms
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Keep a caller's ID (for correlating logs across services) if it is header-safe
+        request_id = _UNSAFE_ID_CHARS.sub("", _header(scope, REQUEST_ID_HEADER.encode()) or "")[:64]
+        request_id = request_id or uuid.uuid4().hex[:16]
+        trace = Trace(request_id, scope.get("method", ""), scope.get("path", ""))
+        token = _current_trace.set(trace)
+
+        profiler = None
+        # The debug endpoints take the same header for auth; don't profile those
+        if (not trace.path.startswith("/api/debug/")
+                and profiling_authorized(_header(scope, PROFILE_HEADER.encode()))):
+            profiler = SampledProfiler(trace)
+            profiler.start()
+
+        async def wrapped_send(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-request-id", request_id.encode("latin-1")))
+                headers.append((b"server-timing", trace.server_timing().encode("latin-1")))
+                if profiler is not None:
+                    headers.append((b"x-profile-id", request_id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            _current_trace.reset(token)
+            trace.duration_ms = round((time.perf_counter() - trace.started) * 1000, 3)
+            self.store.add_trace(trace)
+            if profiler is not None:
+                profiler.stop()
+                self.store.add_profile(request_id, profiler.folded())
+                print(f"🔬 Profiled {trace.method} {trace.path} [{request_id}]: "
+                      f"{profiler.sample_count} samples")
+            if trace.duration_ms >= self.slow_ms:
+                breakdown = ", ".join(f"{name}={ms:.0f}ms" for name, ms in trace.totals().items())
+                print(f"🐢 Slow request {trace.method} {trace.path} [{request_id}] "
+                      f"{trace.duration_ms:.0f}ms: {breakdown}")
+
+
+class TracedRoute(APIRoute):
+    """
+    APIRoute splitting each request into an "endpoint" span (the handler
+    itself) and a "serialize" span (validation and JSON rendering after it)
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any):
+        super().__init__(path, self._wrap_endpoint(endpoint), **kwargs)
+
+    @staticmethod
+    def _wrap_endpoint(endpoint: Callable[..., Any]) -> Callable[..., Any]:
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span("endpoint"):
+                    return await endpoint(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(endpoint)
+        def sync_wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span("endpoint"):
+                return endpoint(*args, **kwargs)
+        return sync_wrapper
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def traced_handler(request: Any) -> Any:
+            trace = _current_trace.get()
+            if trace is None:
+                return await handler(request)
+            start = time.perf_counter()
+            response = await handler(request)
+            endpoint_ms = sum(s["duration_ms"] for s in trace.spans
+                              if s["name"] == "endpoint" and s["start_ms"] >= (start - trace.started) * 1000)
+            serialize = max(0.0, time.perf_counter() - start - endpoint_ms / 1000)
+            trace.add("serialize", time.perf_counter() - serialize, serialize)
+            return response
+
+        return traced_handler
@@ -1,65 +1,323 @@
 import numpy as np
+import os
 import pickle
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
 from sklearn.ensemble import RandomForestClassifier
 from sklearn.preprocessing import StandardScaler
-from sklearn.model_selection import train_test_split
+from sklearn.model_selection import StratifiedKFold, train_test_split
 import logging
 
+from src.ml.model_registry import ModelRegistry, publish_model
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def generate_training_data(n_samples=10000):
-    np.random.seed(42)
-    X = []
-    y = []
-
-    for _ in range(n_samples):
-        home_strength = np.random.uniform(0.3, 1.0)
-        away_strength = np.random.uniform(0.3, 1.0)
-        home_advantage = np.random.uniform(0.5, 0.8)
-        recent_form_home = np.random.uniform(0.2, 1.0)
-        recent_form_away = np.random.uniform(0.2, 1.0)
-        head_to_head = np.random.uniform(0.3, 0.7)
-        injuries = np.random.uniform(0.4, 1.0)
-
-        features = [
-            home_strength, away_strength, home_advantage,
-            recent_form_home, recent_form_away, head_to_head, injuries
-        ]
-
-        home_score = (
-            home_strength * 0.3 +
-            home_advantage * 0.2 +
-            recent_form_home * 0.25 +
-            head_to_head * 0.15 +
-            injuries * 0.1
-        )
+FEATURE_NAMES = [
+    "home_strength",
+    "away_strength",
+    "home_advantage",
+    "recent_form_home",
+    "recent_form_away",
+    "head_to_head",
+    "injuries"
+]
+
+# (low, high) sampling range per feature, in FEATURE_NAMES order
+FEATURE_RANGES = np.array([
+    [0.3, 1.0],
+    [0.3, 1.0],
+    [0.5, 0.8],
+    [0.2, 1.0],
+    [0.2, 1.0],
+    [0.3, 0.7],
+    [0.4, 1.0],
+])
+
+
+def _sample_features(rng, n_samples):
+    # Row-major draws consume the RNG stream in the same order as drawing
+    # the seven features sample by sample
+    return rng.uniform(FEATURE_RANGES[:, 0], FEATURE_RANGES[:, 1], size=(n_samples, len(FEATURE_RANGES)))
+
+
+def _label_outcomes(X):
+    home_strength, away_strength, home_advantage, recent_form_home, \
+        recent_form_away, head_to_head, injuries = X.T
+
+    home_score = (
+        home_strength * 0.3 +
+        home_advantage * 0.2 +
+        recent_form_home * 0.25 +
+        head_to_head * 0.15 +
+        injuries * 0.1
+    )
+
+    away_score = (
+        away_strength * 0.3 +
+        (1 - home_advantage) * 0.1 +
+        recent_form_away * 0.25 +
+        (1 - head_to_head) * 0.15 +
+        injuries * 0.2
+    )
 
-        away_score = (
-            away_strength * 0.3 +
-            (1 - home_advantage) * 0.1 +
-            recent_form_away * 0.25 +
-            (1 - head_to_head) * 0.15 +
-            injuries * 0.2
+    # 0 = home win, 1 = draw, 2 = away win
+    diff = home_score - away_score
+    return np.where(diff > 0.15, 0, np.where(diff < -0.15, 2, 1))
+
+
+def generate_training_data(n_samples=10000, seed=42):
+    rng = np.random.RandomState(seed)
+    X = _sample_features(rng, n_samples)
+    return X, _label_outcomes(X)
+
+
+def generate_training_data_chunked(n_samples, path_prefix, chunk_size=1_000_000, seed=42):
+    """
+    Stream a large synthetic dataset to <path_prefix>_X.npy / _y.npy
+
+    Only one chunk is held in memory at a time; the result is identical to
+    generate_training_data(n_samples, seed). Returns read-only memory maps.
+    """
+    rng = np.random.RandomState(seed)
+    X_path, y_path = f"{path_prefix}_X.npy", f"{path_prefix}_y.npy"
+    X_out = np.lib.format.open_memmap(X_path, mode="w+", dtype=np.float64, shape=(n_samples, len(FEATURE_RANGES)))
+    y_out = np.lib.format.open_memmap(y_path, mode="w+", dtype=np.int64, shape=(n_samples,))
+
+    for start in range(0, n_samples, chunk_size):
+        stop = min(start + chunk_size, n_samples)
+        X_chunk = _sample_features(rng, stop - start)
+        X_out[start:stop] = X_chunk
+        y_out[start:stop] = _label_outcomes(X_chunk)
+        logger.info(f"💾 Generated samples {start:,}-{stop:,} of {n_samples:,}")
+
+    X_out.flush()
+    y_out.flush()
+    del X_out, y_out
+    return np.load(X_path, mmap_mode="r"), np.load(y_path, mmap_mode="r")
+
+
+def _build_model_data(model, scaler, accuracy, **extra):
+    import sklearn
+    return {
+        "model": model,
+        "scaler": scaler,
+        "feature_names": FEATURE_NAMES,
+        "accuracy": accuracy,
+        "version": "MagajiCo-v2.2",
+        "sklearn_version": sklearn.__version__,
+        "trained_date": np.datetime64('now').astype(str),
+        **extra
+    }
+
+
+# ========== LABELLED OUTCOMES FROM THE RESULTS LOG ==========
+
+OUTCOME_LABELS = {"1": 0, "X": 1, "2": 2}
+
+
+def _match_key(match):
+    from real_scraper import ResultsTemplate
+    home, away = ResultsTemplate.split_match(match or "")
+    if home is None:
+        return None
+    return (home.lower().replace("_", " "), away.lower().replace("_", " "))
+
+
+def load_outcome_dataset(results_logger=None):
+    """
+    Join logged actual results to the features their prediction was made on
+
+    Each accuracy record is matched (by home/away team) to the latest logged
+    prediction for that fixture made at or before the result was recorded.
+    Records whose result cannot be read as home/draw/away, or that have no
+    logged features, are skipped. Returns (X, y) with y in model label order.
+    """
+    from real_scraper import ResultsLogger, ResultsTemplate
+    results_logger = results_logger or ResultsLogger()
+
+    features_by_match = {}
+    predictions = results_logger.get_recent(count=100000, log_type="prediction")
+    for entry in sorted(predictions, key=lambda x: x.get("timestamp", "")):
+        features = entry.get("features_used") or {}
+        key = _match_key(entry.get("match"))
+        if key is None or not all(name in features for name in FEATURE_NAMES):
+            continue
+        features_by_match.setdefault(key, []).append(
+            (entry.get("timestamp", ""), [float(features[name]) for name in FEATURE_NAMES])
         )
 
-        diff = home_score - away_score
-        if diff > 0.15:
-            label = 0  # home win
-        elif diff < -0.15:
-            label = 2  # away win
-        else:
-            label = 1  # draw
+    X, y = [], []
+    for record in results_logger.get_accuracy_records():
+        key = _match_key(record.get("match"))
+        home, away = ResultsTemplate.split_match(record.get("match") or "")
+        label = OUTCOME_LABELS.get(ResultsTemplate.outcome_code(record.get("actual"), home, away))
+        if label is None:
+            continue
 
-        X.append(features)
+        features = record.get("features_used")
+        if features and all(name in features for name in FEATURE_NAMES):
+            row = [float(features[name]) for name in FEATURE_NAMES]
+        elif key in features_by_match:
+            candidates = features_by_match[key]
+            earlier = [c for c in candidates if c[0] <= record.get("timestamp", "")]
+            row = (earlier or candidates)[-1][1]
+        else:
+            continue
+        X.append(row)
         y.append(label)
 
-    return np.array(X), np.array(y)
+    logger.info(f"📚 Loaded {len(X)} labelled outcomes from the results log")
+    return np.asarray(X, dtype=np.float64).reshape(-1, len(FEATURE_NAMES)), np.asarray(y, dtype=np.int64)
+
+
+# ========== PARALLEL HYPERPARAMETER SEARCH ==========
+
+PARAM_GRID = {
+    "n_estimators": [50, 100, 200],
+    "max_depth": [6, 10, 14, None]
+}
+
+_search_data = {}
+
+
+def _init_search_worker(X, y, sample_weight):
+    # The dataset is shipped to each worker once, not once per candidate
+    _search_data["X"], _search_data["y"], _search_data["w"] = X, y, sample_weight
 
-def train_model():
+
+def _evaluate_params(args):
+    params, cv, seed = args
+    X, y, w = _search_data["X"], _search_data["y"], _search_data["w"]
+    scores = []
+    for train_idx, test_idx in StratifiedKFold(n_splits=cv, shuffle=True, random_state=seed).split(X, y):
+        model = RandomForestClassifier(**params, random_state=seed, n_jobs=1)
+        model.fit(X[train_idx], y[train_idx], sample_weight=None if w is None else w[train_idx])
+        scores.append(model.score(X[test_idx], y[test_idx]))
+    return params, float(np.mean(scores))
+
+
+def hyperparameter_search(X, y, sample_weight=None, param_grid=None, cv=3, max_workers=None, seed=42):
+    """
+    Cross-validate every n_estimators/max_depth combination in parallel
+
+    Each candidate is fitted single-threaded in its own worker process so
+    candidates run concurrently across cores. Returns (best_params, results)
+    with results sorted best-first.
+    """
+    param_grid = param_grid or PARAM_GRID
+    candidates = [
+        dict(zip(param_grid.keys(), values)) for values in product(*param_grid.values())
+    ]
+    max_workers = max_workers or min(len(candidates), os.cpu_count() or 1)
+    logger.info(f"🔍 Searching {len(candidates)} candidates with {max_workers} workers ({cv}-fold CV)")
+
+    with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_search_worker,
+                             initargs=(X, y, sample_weight)) as pool:
+        results = list(pool.map(_evaluate_params, [(params, cv, seed) for params in candidates]))
+
+    results.sort(key=lambda r: r[1], reverse=True)
+    for params, score in results:
+        logger.info(f"   {params} -> {score:.4f}")
+    return results[0][0], [{"params": p, "cv_accuracy": round(s, 4)} for p, s in results]
+
+
+def _training_set(n_samples, X_real, y_real, real_weight, seed=42):
+    X, y = generate_training_data(n_samples, seed=seed)
+    weights = np.ones(len(X))
+    if len(X_real):
+        X = np.vstack([X, X_real])
+        y = np.concatenate([y, y_real])
+        weights = np.concatenate([weights, np.full(len(X_real), real_weight)])
+    return X, y, weights
+
+
+def train_with_search(n_samples=10000, max_workers=None, real_weight=5.0, results_logger=None):
+    """
+    Retrain from scratch on synthetic data plus logged outcomes, picking
+    n_estimators/max_depth by parallel cross-validated search
+    """
+    X_real, y_real = load_outcome_dataset(results_logger)
+    X, y, weights = _training_set(n_samples, X_real, y_real, real_weight)
+
+    X_train, X_test, y_train, y_test, w_train, _ = train_test_split(
+        X, y, weights, test_size=0.2, random_state=42
+    )
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train)
+    X_test_scaled = scaler.transform(X_test)
+
+    best_params, search_results = hyperparameter_search(
+        X_train_scaled, y_train, sample_weight=w_train, max_workers=max_workers
+    )
+    logger.info(f"🏆 Best parameters: {best_params}")
+
+    model = RandomForestClassifier(**best_params, random_state=42, n_jobs=-1)
+    model.fit(X_train_scaled, y_train, sample_weight=w_train)
+    test_score = model.score(X_test_scaled, y_test)
+    logger.info(f"📊 Test accuracy: {test_score:.3f}")
+
+    model_data = _build_model_data(model, scaler, test_score, training={
+        "mode": "search",
+        "params": best_params,
+        "search": search_results,
+        "synthetic_samples": n_samples,
+        "real_outcomes": len(X_real)
+    })
+    version = publish_model(model_data, root="shared/models")
+    return model, scaler, test_score, version
+
+
+def warm_start_retrain(extra_trees=20, anchor_samples=2000, real_weight=5.0,
+                       registry_root="shared/models", legacy_path="model_data.pkl",
+                       results_logger=None):
+    """
+    Grow the active model with `extra_trees` new trees fitted on logged outcomes
+
+    Existing trees and the fitted scaler are kept as-is, so this is far cheaper
+    than a full retrain. New trees are fitted on the real outcomes (weighted by
+    `real_weight`) mixed with a small synthetic anchor sample, which keeps all
+    three classes present and stops the new trees over-fitting a short log.
+    """
+    X_real, y_real = load_outcome_dataset(results_logger)
+    if not len(X_real):
+        logger.warning("⚠️ No labelled outcomes to learn from - skipping warm-start retrain")
+        return None
+
+    current = ModelRegistry(root=registry_root, legacy_path=legacy_path).reload()
+    if current is None or current.sklearn_model is None:
+        raise RuntimeError("No trained model to warm-start from - run train_model() first")
+
+    model = pickle.loads(pickle.dumps(current.sklearn_model))
+    scaler = current.scaler
+    previous_trees = model.n_estimators
+
+    X, y, weights = _training_set(anchor_samples, X_real, y_real, real_weight, seed=previous_trees)
+    model.set_params(warm_start=True, n_estimators=previous_trees + extra_trees)
+    logger.info(f"🌱 Growing {previous_trees} -> {model.n_estimators} trees on {len(X_real)} real outcomes")
+    model.fit(scaler.transform(X), y, sample_weight=weights)
+    model.set_params(warm_start=False)
+
+    X_test, y_test = generate_training_data(2000, seed=7)
+    test_score = model.score(scaler.transform(X_test), y_test)
+    real_score = model.score(scaler.transform(X_real), y_real)
+    logger.info(f"📊 Synthetic hold-out accuracy: {test_score:.3f}, logged outcomes accuracy: {real_score:.3f}")
+
+    model_data = _build_model_data(model, scaler, test_score, training={
+        "mode": "warm_start",
+        "base_version": current.version,
+        "added_trees": extra_trees,
+        "real_outcomes": len(X_real),
+        "real_outcome_accuracy": real_score
+    })
+    version = publish_model(model_data, root=registry_root)
+    return model, scaler, test_score, version
+
+
+def train_model(n_samples=10000):
     logger.info("🏋️ Starting model training...")
 
-    X, y = generate_training_data(10000)
+    X, y = generate_training_data(n_samples)
     logger.info(f"✅ Generated {len(X)} training samples")
 
     X_train, X_test, y_train, y_test = train_test_split(
@@ -86,32 +344,33 @@ def train_model():
     logger.info(f"📊 Training accuracy: {train_score:.3f}")
     logger.info(f"📊 Test accuracy: {test_score:.3f}")
 
-    import sklearn
-    feature_names = [
-        "home_strength",
-        "away_strength",
-        "home_advantage",
-        "recent_form_home",
-        "recent_form_away",
-        "head_to_head",
-        "injuries"
-    ]
-    
-    model_data = {
-        "model": model,
-        "scaler": scaler,
-        "feature_names": feature_names,
-        "accuracy": test_score,
-        "version": "MagajiCo-v2.2",
-        "sklearn_version": sklearn.__version__,
-        "trained_date": np.datetime64('now').astype(str)
-    }
+    model_data = _build_model_data(model, scaler, test_score)
 
     with open("model_data.pkl", "wb") as f:
         pickle.dump(model_data, f)
 
     logger.info("✅ Model saved to model_data.pkl")
+
+    # Publish as a new registry version (compiled forest + scaler + metadata);
+    # running API workers hot-swap to it on their next CURRENT check
+    publish_model(model_data, root="shared/models")
     return model, scaler, test_score
 
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train and publish the match outcome model")
+    parser.add_argument("--samples", type=int, default=10000, help="Synthetic training samples")
+    parser.add_argument("--search", action="store_true",
+                        help="Parallel n_estimators/max_depth search, training on logged outcomes too")
+    parser.add_argument("--warm-start", type=int, metavar="TREES", default=0,
+                        help="Add TREES trees to the active model, fitted on logged outcomes")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes for --search")
+    args = parser.parse_args()
+
+    if args.warm_start:
+        warm_start_retrain(extra_trees=args.warm_start)
+    elif args.search:
+        train_with_search(n_samples=args.samples, max_workers=args.workers)
+    else:
+        train_model(n_samples=args.samples)
\ No newline at end of file
@@ -0,0 +1,23 @@
+"""
+Upstream URL override - point every scraper at a stand-in server (load tests, offline runs)
+UPSTREAM_BASE_URL=http://127.0.0.1:9100 turns https://www.statarea.com/predictions
+into http://127.0.0.1:9100/www.statarea.com/predictions
+"""
+
+import os
+from typing import Optional
+from urllib.parse import urlsplit
+
+UPSTREAM_BASE_URL = os.getenv("UPSTREAM_BASE_URL")
+
+
+def resolve_url(url: str, base_url: Optional[str] = None) -> str:
+    """The URL to actually request: unchanged unless an upstream base URL is configured"""
+    base = base_url if base_url is not None else UPSTREAM_BASE_URL
+    if not base:
+        return url
+    parts = urlsplit(url)
+    if not parts.netloc:
+        return url
+    rewritten = f"{base.rstrip('/')}/{parts.netloc}{parts.path or '/'}"
+    return f"{rewritten}?{parts.query}" if parts.query else rewritten
@@ -0,0 +1,73 @@
+"""
+Warm-up after startup - prime the model, first scrapes and connections in the
+background, and report readiness only once that is done (for /api/ready)
+"""
+
+import asyncio
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.concurrency import run_in_threadpool
+
+# Seconds any one step may take before it is abandoned and the next one starts
+WARMUP_STEP_TIMEOUT = float(os.getenv("WARMUP_STEP_TIMEOUT", "30"))
+
+
+class WarmUp:
+    """
+    Runs named blocking steps one after another in the threadpool. A failed
+    or timed-out step is reported but doesn't block readiness: the worker
+    can still serve, it just pays that cost on a later request.
+    """
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], Any]]], step_timeout: float = WARMUP_STEP_TIMEOUT):
+        self.steps = steps
+        self.step_timeout = step_timeout
+        self.results: Dict[str, Dict[str, Any]] = {name: {"status": "pending"} for name, _ in steps}
+        self.ready = False
+        self.started_at: Optional[float] = None
+        self.seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def run(self) -> None:
+        self.started_at = time.time()
+        start = time.perf_counter()
+        for name, func in self.steps:
+            self.results[name] = {"status": "running"}
+            step_start = time.perf_counter()
+            try:
+                detail = await asyncio.wait_for(run_in_threadpool(func), timeout=self.step_timeout)
+                result: Dict[str, Any] = {"status": "ok"}
+                if detail is not None:
+                    result["detail"] = detail
+            except asyncio.TimeoutError:
+                result = {"status": "timeout"}
+            except Exception as e:
+                result = {"status": "error", "error": str(e)}
+            result["seconds"] = round(time.perf_counter() - step_start, 4)
+            self.results[name] = result
+        self.seconds = round(time.perf_counter() - start, 4)
+        self.ready = True
+        failed = [name for name, result in self.results.items() if result["status"] != "ok"]
+        print(f"🔥 Warm-up done in {self.seconds:.2f}s" + (f" (not warmed: {', '.join(failed)})" if failed else ""))
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "seconds": self.seconds,
+            "steps": {name: dict(result) for name, result in self.results.items()}
+        }